@@ -44,22 +44,24 @@ class HistorialComprasCliente:
             messagebox.showerror("Error", "Debe ingresar el nombre del cliente")
             return
 
-        ventas_cliente = Venta.filtrar_por_cliente(nombre)
-
         if desde_str and hasta_str:
             try:
                 desde = datetime.strptime(desde_str, "%d/%m/%Y").date()
                 hasta = datetime.strptime(hasta_str, "%d/%m/%Y").date()
-                ventas_cliente = [v for v in ventas_cliente if desde <= v.fecha_venta.date() <= hasta]
             except ValueError:
                 messagebox.showerror("Error", "Formato de fecha inválido")
                 return
+            # Solo se recorren las ventas del rango (búsqueda binaria sobre el índice por fecha)
+            termino = nombre.lower()
+            ventas_cliente = [v for v in Venta.en_rango(desde, hasta) if termino in v.cliente.lower()]
+        else:
+            ventas_cliente = Venta.filtrar_por_cliente(nombre)
 
         if not ventas_cliente:
             self.resultado.insert(tk.END, "No hay compras registradas para este cliente.")
             return
 
-        for i, venta in enumerate(ventas_cliente, 1):
-            self.resultado.insert(tk.END, f"\n--- Compra #{i} ---\n")
+        for venta in ventas_cliente:
+            self.resultado.insert(tk.END, f"\n--- Compra #{venta.id} ---\n")
             self.resultado.insert(tk.END, str(venta))
             self.resultado.insert(tk.END, "\n" + ("-" * 80) + "\n")
\ No newline at end of file
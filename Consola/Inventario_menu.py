@@ -15,6 +15,7 @@ class MenuInventario:
             print("5. Crear nuevo producto")
             print("6. Ver productos próximos a agotarse")
             print("7. Cambiar umbral de stock bajo")
+            print("8. Ver productos vencidos o próximos a vencer")
             print("0. Volver")
             
             cant, prod = self.inventario.listar_productos_bajos(ptr=False)
@@ -40,6 +41,8 @@ class MenuInventario:
             elif opcion == "7":
                 nuevo_umbral = input("Ingrese el nuevo umbral de stock bajo: ")
                 self.inventario.cambiar_umbral_stock_bajo(nuevo_umbral)
+            elif opcion == "8":
+                self.inventario.listar_productos_por_vencer()
             elif opcion == "0":
                 break
             else:
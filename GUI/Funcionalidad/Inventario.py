@@ -4,20 +4,36 @@ Inventory management component for AgroVet Plus application.
 
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog
+from ..background import background_executor
 from ..configuracion import COLOR_PALETTE, ICONS
+from HU.AlertasStock import AlertasStockManager
+from HU.IndiceBusqueda import normalizar_texto
+from .tablaVirtual import VirtualTreeview
 
 
 class InventoryComponent:
     """Componente para la gestión del inventario."""
     
+    # Opciones del buscador -> campo del índice de búsqueda (None = todos)
+    SEARCH_FIELDS = {
+        "Nombre": "nombre",
+        "Código": "codigo",
+        "Categoría": "categoria",
+        "Descripción": "descripcion",
+        "Todos": None,
+    }
+    
     def __init__(self, parent, inventario, refresh_callback=None):
         self.parent = parent
         self.inventario = inventario
         self.refresh_callback = refresh_callback
         self.colors = COLOR_PALETTE
         self.products_tree = None
+        self.products_table = None  # Vista virtualizada sobre products_tree
         self.search_entry = None
         self.search_type = None
+        # Sigue los cambios de stock desde el inicio, no solo con la ventana de alertas abierta
+        self.alertas_stock = AlertasStockManager(inventario)
         
     def create_inventory_tab(self, notebook):
         """Crear la pestaña de inventario."""
@@ -49,7 +65,7 @@ class InventoryComponent:
         
         ttk.Label(search_controls, text="Buscar por:").pack(side='left')
         
-        self.search_type = ttk.Combobox(search_controls, values=["Código", "Nombre", "Categoría"], 
+        self.search_type = ttk.Combobox(search_controls, values=list(self.SEARCH_FIELDS), 
                                        state="readonly", width=12)
         self.search_type.pack(side='left', padx=(5, 10))
         self.search_type.set("Nombre")
@@ -102,10 +118,29 @@ class InventoryComponent:
         self.products_tree.column('Stock', width=80, anchor='center')
         self.products_tree.column('Estado', width=100, anchor='center')
         
-        # Scrollbars
-        v_scrollbar = ttk.Scrollbar(table_frame, orient='vertical', command=self.products_tree.yview)
+        # Scrollbars (la vertical recorre el modelo completo, no solo las filas materializadas)
+        v_scrollbar = ttk.Scrollbar(table_frame, orient='vertical')
         h_scrollbar = ttk.Scrollbar(table_frame, orient='horizontal', command=self.products_tree.xview)
-        self.products_tree.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
+        self.products_tree.configure(xscrollcommand=h_scrollbar.set)
+        
+        # Configurar colores por estado
+        self.products_tree.tag_configure('agotado', background='#ffebee', foreground='#c62828')
+        self.products_tree.tag_configure('stock_bajo', background='#fff8e1', foreground='#f57c00')
+        self.products_tree.tag_configure('disponible', background='#e8f5e8', foreground='#2e7d32')
+        
+        # Solo se materializan las filas visibles; ordenar al pulsar un encabezado
+        self.products_table = VirtualTreeview(
+            self.products_tree, v_scrollbar,
+            clave=lambda p: str(p.get_codigo()),
+            fila=self._product_row,
+            claves_orden={
+                'Código': lambda p: p.get_codigo(),
+                'Nombre': lambda p: normalizar_texto(p.get_nombre()),
+                'Categoría': lambda p: normalizar_texto(p.get_categoria()),
+                'Precio': lambda p: p.get_precio(),
+                'Stock': lambda p: p.get_cantidad(),
+                'Estado': lambda p: p.get_cantidad(),
+            })
         
         # Empaquetar
         self.products_tree.pack(side='left', fill='both', expand=True)
@@ -115,42 +150,40 @@ class InventoryComponent:
         # Cargar productos
         self.load_products_table()
         
-    def load_products_table(self, productos=None):
-        """Cargar productos en la tabla."""
-        # Limpiar tabla
-        for item in self.products_tree.get_children():
-            self.products_tree.delete(item)
+    def load_products_table(self, productos=None, reiniciar=True):
+        """Cargar productos en la tabla.
         
+        Solo se dibujan las filas visibles y, entre refrescos, solo cambian
+        las filas (por código) cuyos datos cambiaron. Con ``reiniciar=False``
+        se conserva la posición de desplazamiento.
+        """
         # Usar todos los productos si no se especifica una lista
         if productos is None:
             productos = self.inventario.productos
-        
-        # Cargar productos
-        for producto in productos:
-            # Determinar estado
-            if producto.get_cantidad() == 0:
-                estado = "AGOTADO"
-                tags = ('agotado',)
-            elif producto.get_cantidad() < 5:
-                estado = "STOCK BAJO"
-                tags = ('stock_bajo',)
-            else:
-                estado = "DISPONIBLE"
-                tags = ('disponible',)
-            
-            self.products_tree.insert('', 'end', values=(
-                producto.get_codigo(),
-                producto.get_nombre(),
-                producto.get_categoria(),
-                f"${producto.get_precio():,.0f}",
-                producto.get_cantidad(),
-                estado
-            ), tags=tags)
-        
-        # Configurar colores por estado
-        self.products_tree.tag_configure('agotado', background='#ffebee', foreground='#c62828')
-        self.products_tree.tag_configure('stock_bajo', background='#fff8e1', foreground='#f57c00')
-        self.products_tree.tag_configure('disponible', background='#e8f5e8', foreground='#2e7d32')
+        self.products_table.set_items(productos, reiniciar=reiniciar)
+    
+    @staticmethod
+    def _product_row(producto):
+        """Valores y tags de la fila de un producto."""
+        # Determinar estado
+        if producto.get_cantidad() == 0:
+            estado = "AGOTADO"
+            tags = ('agotado',)
+        elif producto.get_cantidad() < 5:
+            estado = "STOCK BAJO"
+            tags = ('stock_bajo',)
+        else:
+            estado = "DISPONIBLE"
+            tags = ('disponible',)
+        
+        return (
+            producto.get_codigo(),
+            producto.get_nombre(),
+            producto.get_categoria(),
+            f"${producto.get_precio():,.0f}",
+            producto.get_cantidad(),
+            estado
+        ), tags
     
     def create_inventory_buttons(self, parent):
         """Crear botones de acción del inventario."""
@@ -169,8 +202,9 @@ class InventoryComponent:
                   command=self.show_stock_history).pack(side='left', padx=(0, 10))
         
                 
-        ttk.Button(buttons_frame, text=f"{ICONS['update']} Actualizar", 
-                  command=self.refresh_inventory).pack(side='right')
+        self.refresh_button = ttk.Button(buttons_frame, text=f"{ICONS['update']} Actualizar", 
+                                         command=self.refresh_inventory)
+        self.refresh_button.pack(side='right')
     
     def on_search(self, event=None):
         """Evento de búsqueda en tiempo real."""
@@ -180,27 +214,15 @@ class InventoryComponent:
             self.show_all_products()
     
     def search_products(self):
-        """Buscar productos según criterio."""
-        search_term = self.search_entry.get().lower()
-        search_type = self.search_type.get()
+        """Buscar productos según criterio (resultados ordenados por relevancia)."""
+        search_term = self.search_entry.get().strip()
+        campo = self.SEARCH_FIELDS.get(self.search_type.get())
         
         if not search_term:
             self.show_all_products()
             return
         
-        filtered_products = []
-        
-        for producto in self.inventario.productos:
-            if search_type == "Código":
-                if search_term in str(producto.get_codigo()):
-                    filtered_products.append(producto)
-            elif search_type == "Nombre":
-                if search_term in producto.get_nombre().lower():
-                    filtered_products.append(producto)
-            elif search_type == "Categoría":
-                if search_term in producto.get_categoria().lower():
-                    filtered_products.append(producto)
-        
+        filtered_products = self.inventario.buscar_productos(search_term, campo)
         self.load_products_table(filtered_products)
     
     def show_all_products(self):
@@ -209,12 +231,25 @@ class InventoryComponent:
         self.load_products_table()
     
     def refresh_inventory(self):
-        """Refrescar inventario."""
-        self.inventario.cargar_desde_json()
-        self.load_products_table()
-        if self.refresh_callback:
-            self.refresh_callback()
-        messagebox.showinfo("Actualizado", "Inventario actualizado correctamente")
+        """Refrescar inventario (el archivo se lee en segundo plano)."""
+        def aplicar(registros):
+            self.inventario.aplicar_productos(registros)
+            self.refresh_products_view()
+            if self.refresh_callback:
+                self.refresh_callback()
+            messagebox.showinfo("Actualizado", "Inventario actualizado correctamente")
+        
+        background_executor.submit(self.products_tree, self.inventario.leer_productos,
+                                   on_success=aplicar, busy=self.refresh_button, serial="productos")
+    
+    def refresh_products_view(self):
+        """Volver a aplicar la búsqueda actual conservando la posición (solo cambian las filas modificadas)."""
+        search_term = self.search_entry.get().strip() if self.search_entry else ""
+        if search_term:
+            campo = self.SEARCH_FIELDS.get(self.search_type.get())
+            self.load_products_table(self.inventario.buscar_productos(search_term, campo), reiniciar=False)
+        else:
+            self.load_products_table(reiniciar=False)
     
     def open_add_product_window(self):
         """Abrir ventana para agregar producto."""
@@ -223,13 +258,17 @@ class InventoryComponent:
     
     def open_update_stock_window(self):
         """Abrir ventana para actualizar stock."""
-        selected = self.products_tree.selection()
+        selected = self.products_table.seleccion()
         if not selected:
             messagebox.showwarning("Selección requerida", "Por favor seleccione un producto")
             return
+        if len(selected) > 1:
+            # La selección no tiene orden: no se puede saber cuál de los productos se quiso actualizar
+            messagebox.showwarning("Selección múltiple", "Seleccione un solo producto para actualizar su stock")
+            return
         
-        item = self.products_tree.item(selected[0])
-        codigo = item['values'][0]
+        # El iid de cada fila es el código del producto
+        codigo = int(selected[0])
         from .dialogs import UpdateStockWindow
         UpdateStockWindow(self.parent, self.inventario, codigo, self.refresh_inventory)
     
@@ -260,4 +299,4 @@ class InventoryComponent:
     def open_alertas_stock(self):
         """Abrir ventana de alertas de stock bajo."""
         from .alertasStock import AlertasStockGUI
-        AlertasStockGUI(self.parent, self.inventario).abrir()
+        AlertasStockGUI(self.parent, self.inventario, self.alertas_stock).abrir()
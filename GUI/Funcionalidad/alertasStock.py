@@ -9,13 +9,15 @@ from typing import List
 from ..configuracion import COLOR_PALETTE, FONTS, ICONS
 from HU.AlertasStock import AlertasStockManager
 from HU.Inventario import Inventario
+from HU.MarcaTiempo import parsear
 
 class AlertasStockGUI:
-    def __init__(self, parent, inventario: Inventario):
+    def __init__(self, parent, inventario: Inventario, manager: AlertasStockManager = None):
         self.parent = parent
         self.colors = COLOR_PALETTE
         self.inventario = inventario
-        self.manager = AlertasStockManager(inventario)
+        # El gestor debe vivir con la aplicación para recibir los cambios de stock
+        self.manager = manager or AlertasStockManager(inventario)
         self.window = None
 
     # ------------ Ventana principal ------------
@@ -51,13 +53,13 @@ class AlertasStockGUI:
         main.pack(fill='both', expand=True, padx=20, pady=20)
 
         # Tabla de alertas
-        columns = ("Código", "Producto", "Stock", "Umbral")
+        columns = ("Código", "Producto", "Stock", "Umbral", "Desde")
         self.tree = ttk.Treeview(main, columns=columns, show='headings', height=15)
         for col in columns:
             self.tree.heading(col, text=col)
-            anchor = 'center' if col in ("Código", "Stock", "Umbral") else 'w'
+            anchor = 'center' if col in ("Código", "Stock", "Umbral", "Desde") else 'w'
             self.tree.column(col, anchor=anchor, width=120)
-        self.tree.column("Producto", width=350)
+        self.tree.column("Producto", width=300)
         vsb = ttk.Scrollbar(main, orient='vertical', command=self.tree.yview)
         self.tree.configure(yscrollcommand=vsb.set)
         self.tree.pack(side='left', fill='both', expand=True)
@@ -72,7 +74,8 @@ class AlertasStockGUI:
         for item in self.tree.get_children():
             self.tree.delete(item)
         for alerta in self.manager.exportar_alertas_actuales():
-            self.tree.insert('', 'end', values=(alerta['codigo'], alerta['nombre'], alerta['stock'], alerta['umbral']))
+            desde = parsear(alerta['desde']).strftime('%d/%m/%Y %H:%M') if alerta['desde'] else '—'
+            self.tree.insert('', 'end', values=(alerta['codigo'], alerta['nombre'], alerta['stock'], alerta['umbral'], desde))
 
     # ------------ Configurar umbral -------------
     def _abrir_dialogo_umbral(self):
@@ -3,6 +3,7 @@ Componente gráfico para consulta de historial clínico - Rol Veterinario
 Interfaz gráfica que usa la lógica de negocio de HU/ConsultaHistorialClinico.py
 """
 
+import time
 import tkinter as tk
 from tkinter import ttk, messagebox
 from typing import Optional
@@ -14,12 +15,21 @@ from HU.ConsultaHistorialClinico import ConsultaHistorialClinico
 class ConsultaHistorialVeterinarioGUI:
     """Interfaz gráfica para consultar historial clínico completo del cliente."""
     
+    # Pausa de escritura (ms) antes de lanzar la búsqueda en tiempo real
+    DEBOUNCE_MS = 250
+    
     def __init__(self, parent_window):
         self.parent = parent_window
         self.colors = COLOR_PALETTE
         self.window = None
         self.consulta_hu = None
         self.cliente_seleccionado = None
+        self._busqueda_pendiente = None  # id de ``after`` de la búsqueda programada
+        self._termino_aplicado = None
+        # Pulsaciones recibidas, búsquedas canceladas/descartadas por obsoletas y
+        # latencia (desde la última tecla hasta mostrar resultados)
+        self.estadisticas_busqueda = {'pulsaciones': 0, 'canceladas': 0, 'descartadas': 0,
+                                      'ejecutadas': 0, 'latencia_ms': 0.0}
         
     def abrir_consulta_historial(self):
         """Abrir ventana de consulta de historial clínico."""
@@ -107,6 +117,7 @@ class ConsultaHistorialVeterinarioGUI:
                                    bd=1)
         self.search_entry.pack(side='left', padx=(0, 10))
         self.search_entry.bind('<KeyRelease>', self.buscar_en_tiempo_real)
+        self.search_entry.bind('<Destroy>', lambda e: self._cancelar_busqueda_pendiente())
         
         # Botones
         tk.Button(search_content,
@@ -184,16 +195,18 @@ class ConsultaHistorialVeterinarioGUI:
         
         # Lista de consultas
         self.tree_consultas = ttk.Treeview(consultas_frame,
-                                         columns=('Fecha', 'Mascota', 'Diagnóstico', 'Tratamiento'),
+                                         columns=('ID', 'Fecha', 'Mascota', 'Diagnóstico', 'Tratamiento'),
                                          show='headings',
                                          height=12)
         
         # Configurar columnas
+        self.tree_consultas.heading('ID', text='N.°')
         self.tree_consultas.heading('Fecha', text='Fecha')
         self.tree_consultas.heading('Mascota', text='Mascota')
         self.tree_consultas.heading('Diagnóstico', text='Diagnóstico')
         self.tree_consultas.heading('Tratamiento', text='Tratamiento')
         
+        self.tree_consultas.column('ID', width=60, anchor='center')
         self.tree_consultas.column('Fecha', width=120, anchor='center')
         self.tree_consultas.column('Mascota', width=150)
         self.tree_consultas.column('Diagnóstico', width=200)
@@ -217,16 +230,18 @@ class ConsultaHistorialVeterinarioGUI:
         
         # Lista de compras
         self.tree_compras = ttk.Treeview(compras_frame,
-                                       columns=('Fecha', 'Productos', 'Total', 'Forma_Pago'),
+                                       columns=('ID', 'Fecha', 'Productos', 'Total', 'Forma_Pago'),
                                        show='headings',
                                        height=12)
         
         # Configurar columnas
+        self.tree_compras.heading('ID', text='N.°')
         self.tree_compras.heading('Fecha', text='Fecha')
         self.tree_compras.heading('Productos', text='Productos')
         self.tree_compras.heading('Total', text='Total')
         self.tree_compras.heading('Forma_Pago', text='Forma de Pago')
         
+        self.tree_compras.column('ID', width=60, anchor='center')
         self.tree_compras.column('Fecha', width=150, anchor='center')
         self.tree_compras.column('Productos', width=300)
         self.tree_compras.column('Total', width=100, anchor='e')
@@ -273,6 +288,7 @@ class ConsultaHistorialVeterinarioGUI:
             
             # Actualizar combobox
             self.cliente_combo['values'] = clientes
+            self._termino_aplicado = ""
             
             if not clientes:
                 self.mostrar_mensaje_sin_datos()
@@ -281,12 +297,44 @@ class ConsultaHistorialVeterinarioGUI:
             messagebox.showerror("Error", f"Error al cargar datos: {str(e)}")
             
     def buscar_en_tiempo_real(self, event=None):
-        """Búsqueda en tiempo real mientras el usuario escribe."""
+        """Búsqueda en tiempo real mientras el usuario escribe.
+        
+        Cada pulsación reprograma la búsqueda; solo se ejecuta cuando el
+        usuario deja de escribir durante ``DEBOUNCE_MS``.
+        """
+        self.estadisticas_busqueda['pulsaciones'] += 1
         termino = self.search_entry.get().lower().strip()
+        if self._cancelar_busqueda_pendiente():
+            self.estadisticas_busqueda['canceladas'] += 1
+        if termino == self._termino_aplicado:
+            # Teclas que no cambian el texto (flechas, Shift...)
+            return
+        self._busqueda_pendiente = self.window.after(
+            self.DEBOUNCE_MS, self._ejecutar_busqueda, termino, time.perf_counter())
+        
+    def _cancelar_busqueda_pendiente(self):
+        """Cancelar la búsqueda programada, si la hay. Retorna True si se canceló."""
+        if self._busqueda_pendiente is None:
+            return False
+        self.window.after_cancel(self._busqueda_pendiente)
+        self._busqueda_pendiente = None
+        return True
+        
+    def _ejecutar_busqueda(self, termino, inicio):
+        """Ejecutar la búsqueda programada si su término sigue vigente."""
+        self._busqueda_pendiente = None
+        if termino != self.search_entry.get().lower().strip():
+            self.estadisticas_busqueda['descartadas'] += 1
+            return
         if len(termino) >= 2:
             self.filtrar_clientes(termino)
         elif len(termino) == 0:
             self.cargar_datos_iniciales()
+        else:
+            return
+        self._termino_aplicado = termino
+        self.estadisticas_busqueda['ejecutadas'] += 1
+        self.estadisticas_busqueda['latencia_ms'] = (time.perf_counter() - inicio) * 1000
             
     def filtrar_clientes(self, termino):
         """Filtrar clientes por término de búsqueda."""
@@ -304,7 +352,9 @@ class ConsultaHistorialVeterinarioGUI:
             messagebox.showwarning("Búsqueda", "Ingrese un nombre para buscar")
             return
         
+        self._cancelar_busqueda_pendiente()
         self.filtrar_clientes(termino.lower())
+        self._termino_aplicado = termino.lower()
         
     def mostrar_todos_clientes(self):
         """Mostrar todos los clientes disponibles."""
@@ -349,7 +399,9 @@ class ConsultaHistorialVeterinarioGUI:
         consultas = self.consulta_hu.procesar_consultas_medicas(historiales_cliente)
         
         for consulta in consultas:
-            self.tree_consultas.insert('', 'end', values=(
+            # El id del registro identifica la fila
+            self.tree_consultas.insert('', 'end', iid=str(consulta['id']), values=(
+                consulta['id'],
                 consulta['fecha_completa'],
                 consulta['mascota'],
                 consulta['diagnostico'],
@@ -369,7 +421,9 @@ class ConsultaHistorialVeterinarioGUI:
         compras = self.consulta_hu.procesar_compras_cliente(compras_cliente)
         
         for compra in compras:
-            self.tree_compras.insert('', 'end', values=(
+            # El id de la venta identifica la fila
+            self.tree_compras.insert('', 'end', iid=str(compra['id']), values=(
+                compra['id'],
                 compra['fecha'],
                 compra['productos'],
                 compra['total_formateado'],
@@ -397,11 +451,12 @@ class ConsultaHistorialVeterinarioGUI:
         if not selection:
             return
         
-        item = self.tree_consultas.item(selection[0])
-        valores = item['values']
+        detalle = self.consulta_hu.buscar_detalle_consulta_especifica(selection[0])
+        if detalle is None:
+            return
         
         # Crear ventana de detalle
-        self.mostrar_detalle_consulta(valores)
+        self.mostrar_detalle_consulta(detalle)
         
     def ver_detalle_compra(self, event):
         """Ver detalle de compra específica."""
@@ -409,13 +464,14 @@ class ConsultaHistorialVeterinarioGUI:
         if not selection:
             return
         
-        item = self.tree_compras.item(selection[0])
-        valores = item['values']
+        detalle = self.consulta_hu.buscar_detalle_compra_especifica(selection[0])
+        if detalle is None:
+            return
         
         # Crear ventana de detalle
-        self.mostrar_detalle_compra(valores)
+        self.mostrar_detalle_compra(detalle)
         
-    def mostrar_detalle_consulta(self, valores):
+    def mostrar_detalle_consulta(self, detalle):
         """Mostrar ventana con detalle de consulta."""
         detalle_window = tk.Toplevel(self.window)
         detalle_window.title("🏥 Detalle de Consulta")
@@ -426,13 +482,18 @@ class ConsultaHistorialVeterinarioGUI:
         content = tk.Text(detalle_window, font=FONTS['text'], wrap='word', padx=10, pady=10)
         content.pack(fill='both', expand=True)
         
-        detalle_texto = f"""🏥 DETALLE DE CONSULTA MÉDICA
+        dato = lambda campo: detalle[campo] or '—'
+        detalle_texto = f"""🏥 DETALLE DE CONSULTA MÉDICA N.° {detalle['id']}
 {'='*40}
 
-📅 Fecha y Hora: {valores[0]}
-🐾 Mascota: {valores[1]}
-🩺 Diagnóstico: {valores[2]}
-💊 Tratamiento: {valores[3]}
+📅 Fecha y Hora: {detalle['fecha']} {detalle['hora']}
+👤 Cliente: {detalle['cliente']} (ID: {detalle['id_cliente']})
+🐾 Mascota: {detalle['mascota']}
+   Especie: {dato('especie')} | Raza: {dato('raza')}
+   Edad: {dato('edad')} | Género: {dato('genero')}
+🩺 Diagnóstico: {detalle['diagnostico']}
+💊 Tratamiento: {detalle['tratamiento']}
+📝 Comentarios: {dato('comentarios')}
 
 {'='*40}
 👨‍⚕️ Dr. Veterinario - AgroVet Plus
@@ -441,7 +502,7 @@ class ConsultaHistorialVeterinarioGUI:
         content.insert(tk.END, detalle_texto)
         content.config(state='disabled')
         
-    def mostrar_detalle_compra(self, valores):
+    def mostrar_detalle_compra(self, detalle):
         """Mostrar ventana con detalle de compra."""
         detalle_window = tk.Toplevel(self.window)
         detalle_window.title("🛒 Detalle de Compra")
@@ -452,13 +513,17 @@ class ConsultaHistorialVeterinarioGUI:
         content = tk.Text(detalle_window, font=FONTS['text'], wrap='word', padx=10, pady=10)
         content.pack(fill='both', expand=True)
         
-        detalle_texto = f"""🛒 DETALLE DE COMPRA
+        productos = "\n".join(f"   • {p['nombre']} x{p['cantidad']} @ ${p['precio_unitario']:,}"
+                              for p in detalle['productos'])
+        detalle_texto = f"""🛒 DETALLE DE COMPRA N.° {detalle['id']}
 {'='*40}
 
-📅 Fecha: {valores[0]}
-📦 Productos: {valores[1]}
-💰 Total: {valores[2]}
-💳 Forma de Pago: {valores[3]}
+👤 Cliente: {detalle['cliente']}
+📅 Fecha: {detalle['fecha']}
+📦 Productos:
+{productos}
+💰 Total: ${detalle['total']:,}
+💳 Forma de Pago: {detalle['forma_pago']}
 
 {'='*40}
 🏪 AgroVet Plus - Sistema de Ventas
@@ -1,6 +1,8 @@
 import tkinter as tk
 from tkinter import ttk
 import json
+from db import get_repository
+from ..background import background_executor
 from ..configuracion import COLOR_PALETTE, ICONS
 
 class ConsultasComponent:
@@ -12,9 +14,8 @@ class ConsultasComponent:
 
     def _load_consultas(self):
         try:
-            with open("db/solicitudes.json", "r", encoding="utf-8") as f:
-                datos = json.load(f)
-        except (FileNotFoundError, json.decoder.JSONDecodeError):
+            datos = get_repository("solicitudes").load_all()
+        except json.decoder.JSONDecodeError:
             datos = []
         return [d for d in datos if d.get('tipo') == 'consulta']
 
@@ -30,7 +31,11 @@ class ConsultasComponent:
         self.refresh()
 
     def refresh(self):
-        consultas = self._load_consultas()
+        """Recargar las consultas (la lectura del archivo se hace en segundo plano)."""
+        background_executor.submit(self.tree, self._load_consultas, on_success=self._show_consultas,
+                                   serial="solicitudes")
+
+    def _show_consultas(self, consultas):
         for item in self.tree.get_children():
             self.tree.delete(item)
         for c in consultas:
@@ -15,9 +15,17 @@ class DashboardComponent:
         self.inventario = inventario
         self.rol_usuario = rol_usuario  # Información del rol para mostrar en UI
         self.colors = COLOR_PALETTE
+        # Widgets enlazados a las métricas del inventario, y últimos valores mostrados
+        self.metricas = inventario.metricas
+        self._widgets = {}
+        self._mostrados = {}
+        self._actualizacion_pendiente = False
+        self.metricas.suscribir(self._metricas_cambiaron)
         
     def create_dashboard_tab(self, notebook, index=None):
         """Crear la pestaña del dashboard."""
+        self._widgets = {}
+        self._mostrados = {}
         # Crear estilo para fondo homogéneo
         style = ttk.Style()
         style.configure('Dashboard.TFrame', background=self.colors['light_gray'])
@@ -99,27 +107,26 @@ class DashboardComponent:
         cards_frame = ttk.Frame(parent)
         cards_frame.pack(fill='x', pady=(0, 20))
         
-        # Calcular estadísticas
-        total_productos = len(self.inventario.productos)
-        productos_agotados = len([p for p in self.inventario.productos if p.get_cantidad() == 0])
-        stock_bajo = len([p for p in self.inventario.productos if 0 < p.get_cantidad() < 5])
-        valor_total = sum([p.get_precio() * p.get_cantidad() for p in self.inventario.productos])
+        valores = self.metricas.valores()
         
         # Card 1: Total productos
-        self.create_stat_card(cards_frame, "Total Productos", str(total_productos), 
-                             "🏪", self.colors['primary'], 0, 0)
+        self._widgets['total_productos'] = self.create_stat_card(
+            cards_frame, "Total Productos", "", "🏪", self.colors['primary'], 0, 0)
         
         # Card 2: Productos agotados
-        self.create_stat_card(cards_frame, "Agotados", str(productos_agotados), 
-                             ICONS['error'], self.colors['danger'], 0, 1)
+        self._widgets['agotados'] = self.create_stat_card(
+            cards_frame, "Agotados", "", ICONS['error'], self.colors['danger'], 0, 1)
         
         # Card 3: Stock bajo
-        self.create_stat_card(cards_frame, "Stock Bajo", str(stock_bajo), 
-                             ICONS['warning'], self.colors['accent'], 0, 2)
+        self._widgets['bajo_stock'] = self.create_stat_card(
+            cards_frame, "Stock Bajo", "", ICONS['warning'], self.colors['accent'], 0, 2)
         
         # Card 4: Valor total inventario
-        self.create_stat_card(cards_frame, "Valor Total", f"${valor_total:,.0f}", 
-                             "💰", self.colors['success'], 0, 3)
+        self._widgets['valor_total'] = self.create_stat_card(
+            cards_frame, "Valor Total", "", "💰", self.colors['success'], 0, 3)
+        
+        for clave in ('total_productos', 'agotados', 'bajo_stock', 'valor_total'):
+            self._mostrar(clave, valores[clave])
         
     def create_stat_card(self, parent, title, value, icon, color, row, col):
         """Crear una tarjeta de estadística individual."""
@@ -146,23 +153,28 @@ class DashboardComponent:
                               bg=color, fg=self.colors['white'])
         title_label.pack()
         
+        return value_label
+        
     def create_low_stock_section(self, parent):
         """Crear sección de productos con stock bajo."""
         low_stock_frame = ttk.LabelFrame(parent, text=f"{ICONS['warning']} Productos con Stock Bajo (< 5 unidades)")
         low_stock_frame.pack(fill='x', padx=20, pady=10)
         
-        # Lista de productos con stock bajo
-        productos_bajo_stock = [p for p in self.inventario.productos if 0 < p.get_cantidad() < 5]
-        
-        if productos_bajo_stock:
-            for producto in productos_bajo_stock[:5]:  # Mostrar solo los primeros 5
+        # Lista de productos con stock bajo (los primeros 5), enlazada a las métricas
+        self._widgets['productos_bajo_stock'] = low_stock_frame
+        self._mostrar('productos_bajo_stock', self.metricas.valores()['productos_bajo_stock'])
+    
+    def _render_low_stock(self, low_stock_frame, productos):
+        """Dibujar la lista de stock bajo a partir de tuplas (nombre, cantidad)."""
+        if productos:
+            for nombre, cantidad in productos:
                 product_frame = tk.Frame(low_stock_frame, bg=self.colors['white'])
                 product_frame.pack(fill='x', padx=10, pady=5)
                 
-                tk.Label(product_frame, text=f"{ICONS['inventory']} {producto.get_nombre()}", 
+                tk.Label(product_frame, text=f"{ICONS['inventory']} {nombre}", 
                         font=('Arial', 11, 'bold'), bg=self.colors['white']).pack(side='left')
                 
-                tk.Label(product_frame, text=f"Stock: {producto.get_cantidad()}", 
+                tk.Label(product_frame, text=f"Stock: {cantidad}", 
                         font=('Arial', 10), bg=self.colors['white'], 
                         fg=self.colors['danger']).pack(side='right')
         else:
@@ -172,34 +184,58 @@ class DashboardComponent:
     
     def create_expiring_products_section(self, parent):
         """Crear sección de productos próximos a vencer."""
-        from datetime import datetime, timedelta
-
         expiring_frame = ttk.LabelFrame(parent, text="📅 Productos Próximos a Vencer (≤ 60 días)")
         expiring_frame.pack(fill='x', padx=20, pady=10)
 
-        dias_umbral = 60
-        productos_por_vencer = []
-        hoy = datetime.now().date()
-
-        for producto in self.inventario.productos:
-            try:
-                fecha_v = datetime.strptime(producto.get_fecha_vencimiento(), "%d/%m/%Y").date()
-                dias_restantes = (fecha_v - hoy).days
-                if 0 <= dias_restantes <= dias_umbral:
-                    productos_por_vencer.append((producto, dias_restantes))
-            except Exception:
-                # Si la fecha está mal formateada, ignorar producto
-                continue
-
-        # Ordenar por días restantes ascendente
-        productos_por_vencer.sort(key=lambda x: x[1])
+        # Primeros 5 por días restantes (las fechas mal formateadas se ignoran)
+        self._widgets['proximos_a_vencer'] = expiring_frame
+        self._mostrar('proximos_a_vencer', self.metricas.valores()['proximos_a_vencer'])
 
+    def _render_expiring(self, expiring_frame, productos_por_vencer):
+        """Dibujar la lista de vencimientos a partir de tuplas (nombre, días restantes)."""
         if productos_por_vencer:
-            for producto, dias in productos_por_vencer[:5]:  # Mostrar primeros 5
+            for nombre, dias in productos_por_vencer:
                 prod_frame = tk.Frame(expiring_frame, bg=self.colors['white'])
                 prod_frame.pack(fill='x', padx=10, pady=4)
 
-                tk.Label(prod_frame, text=f"{producto.get_nombre()}", font=('Arial', 11, 'bold'), bg=self.colors['white']).pack(side='left')
+                tk.Label(prod_frame, text=f"{nombre}", font=('Arial', 11, 'bold'), bg=self.colors['white']).pack(side='left')
                 tk.Label(prod_frame, text=f"Vence en {dias} día(s)", font=('Arial', 10), bg=self.colors['white'], fg=self.colors['danger' if dias<=15 else 'accent']).pack(side='right')
         else:
             tk.Label(expiring_frame, text="✅ No hay productos próximos a vencer", font=('Arial', 11), bg=self.colors['white'], fg=self.colors['success']).pack(pady=10)
+
+    # ---------------- Actualización incremental ----------------
+    def _metricas_cambiaron(self):
+        """Agrupar los cambios de métricas (p. ej. las líneas de una venta) en una sola actualización."""
+        if self._actualizacion_pendiente or not self._widgets:
+            return
+        self._actualizacion_pendiente = True
+        try:
+            self.parent.after_idle(self.actualizar)
+        except tk.TclError:
+            # La ventana ya se cerró
+            self._actualizacion_pendiente = False
+
+    def actualizar(self):
+        """Aplicar los valores actuales de las métricas, modificando solo los widgets que cambiaron."""
+        self._actualizacion_pendiente = False
+        for clave, valor in self.metricas.valores().items():
+            try:
+                self._mostrar(clave, valor)
+            except tk.TclError:
+                # Widget destruido (se cerró la pestaña o la ventana)
+                self._widgets.pop(clave, None)
+
+    def _mostrar(self, clave, valor):
+        widget = self._widgets.get(clave)
+        if widget is None or self._mostrados.get(clave) == valor:
+            return
+        if clave == 'productos_bajo_stock' or clave == 'proximos_a_vencer':
+            for hijo in widget.winfo_children():
+                hijo.destroy()
+            render = self._render_low_stock if clave == 'productos_bajo_stock' else self._render_expiring
+            render(widget, valor)
+        elif clave == 'valor_total':
+            widget.config(text=f"${valor:,.0f}")
+        else:
+            widget.config(text=str(valor))
+        self._mostrados[clave] = valor
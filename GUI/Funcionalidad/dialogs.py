@@ -13,8 +13,10 @@ try:
 except ImportError:
     DateEntry = None  # Fallback a Entry si no está instalado
 
+from db import get_repository
 from HU.HistoriaClinica import HistoriaClinica
 from HU.Producto import Producto
+from ..background import background_executor
 from ..configuracion import COLOR_PALETTE, ICONS, FONTS
 
 
@@ -260,6 +262,9 @@ class UpdateStockWindow(BaseDialog):
 class HistoryWindow(BaseDialog):
     """Ventana para visualizar el historial de movimientos de stock."""
     
+    # Cantidad de movimientos recientes a mostrar (se leen desde el final de la bitácora)
+    MAX_MOVIMIENTOS = 500
+    
     def __init__(self, parent, inventario):
         super().__init__(parent, "Historial de Movimientos", "800x600")
         self.inventario = inventario
@@ -294,32 +299,27 @@ class HistoryWindow(BaseDialog):
     
     def load_history(self):
         """Cargar el historial de movimientos."""
-        try:
-            with open("db/historial_stock.json", "r") as archivo:
-                historial = json.load(archivo)
-                
-                if not historial:
-                    self.text_area.insert(tk.END, "No hay movimientos registrados.")
-                    return
-                
-                self.text_area.insert(tk.END, "=== HISTORIAL DE MOVIMIENTOS DE STOCK ===\n\n")
-                
-                for registro in reversed(historial):  # Mostrar más recientes primero
-                    self.text_area.insert(tk.END, f"Fecha: {registro['fecha']}\n")
-                    self.text_area.insert(tk.END, f"Producto: {registro['nombre_producto']}\n")
-                    self.text_area.insert(tk.END, f"Cambio: {registro['stock_anterior']} → {registro['nuevo_stock']}\n")
-                    self.text_area.insert(tk.END, f"Motivo: {registro['motivo']}\n")
-                    self.text_area.insert(tk.END, "-" * 50 + "\n\n")
-                    
-        except FileNotFoundError:
-            self.text_area.insert(tk.END, "No hay historial de movimientos registrado.")
+        historial = self.inventario.obtener_historial_stock(limite=self.MAX_MOVIMIENTOS)
+        if not historial:
+            self.text_area.insert(tk.END, "No hay movimientos registrados.")
+            return
+        
+        self.text_area.insert(tk.END, "=== HISTORIAL DE MOVIMIENTOS DE STOCK ===\n")
+        self.text_area.insert(tk.END, f"(últimos {len(historial)} movimientos)\n\n")
+        
+        for registro in reversed(historial):  # Mostrar más recientes primero
+            self.text_area.insert(tk.END, f"Fecha: {registro['fecha']}\n")
+            self.text_area.insert(tk.END, f"Producto: {registro['nombre_producto']}\n")
+            self.text_area.insert(tk.END, f"Cambio: {registro['stock_anterior']} → {registro['nuevo_stock']}\n")
+            self.text_area.insert(tk.END, f"Motivo: {registro['motivo']}\n")
+            self.text_area.insert(tk.END, "-" * 50 + "\n\n")
 
 
 class ClinicalEntryWindow(BaseDialog):
     """Ventana para registrar o actualizar un historial clínico."""
     
     def __init__(self, parent, callback, auto_id=False):
-        super().__init__(parent, "Registrar/Actualizar Historial Clínico", "450x550")
+        super().__init__(parent, "Registrar/Actualizar Historial Clínico", "450x700")
         self.callback = callback
         self.auto_id = auto_id
         self.entries = {}
@@ -340,7 +340,8 @@ class ClinicalEntryWindow(BaseDialog):
         form_frame = tk.Frame(self.window, bg=self.colors['light_gray'])
         form_frame.pack(fill='both', expand=True, padx=20, pady=20)
         
-        labels = ["ID Cliente:", "Nombre Cliente:", "Nombre Mascota:", 
+        labels = ["ID Cliente:", "Nombre Cliente:", "Nombre Mascota:",
+                  "Especie (opcional):", "Raza (opcional):", "Edad (opcional):", "Género (opcional):",
                   "Diagnóstico:", "Tratamiento:", "Comentarios (opcional):"]
         
         for i, lbl in enumerate(labels):
@@ -357,9 +358,8 @@ class ClinicalEntryWindow(BaseDialog):
             self.entries[lbl] = ent
 
         if self.auto_id:
-            from HU.HistoriaClinica import HistoriaClinica
-            next_id = HistoriaClinica.get_next_id()
-            self.entries["ID Cliente:"].insert(0, str(next_id))
+            # El ID se reserva al guardar: abrir y cancelar no consume IDs de la secuencia
+            self.entries["ID Cliente:"].insert(0, "Se asigna al guardar")
             self.entries["ID Cliente:"].config(state='disabled')
         
         # Botones
@@ -370,9 +370,10 @@ class ClinicalEntryWindow(BaseDialog):
         buttons_frame = tk.Frame(self.window, bg=self.colors['light_gray'])
         buttons_frame.pack(fill='x', pady=10)
         
-        tk.Button(buttons_frame, text=f"{ICONS['save']} Guardar", command=self.save, 
-                 bg=self.colors['success'], fg=self.colors['white'], font=('Arial', 11, 'bold'), 
-                 relief='flat').pack(side='left', padx=10)
+        self.save_button = tk.Button(buttons_frame, text=f"{ICONS['save']} Guardar", command=self.save, 
+                                     bg=self.colors['success'], fg=self.colors['white'], font=('Arial', 11, 'bold'), 
+                                     relief='flat')
+        self.save_button.pack(side='left', padx=10)
         
         tk.Button(buttons_frame, text=f"{ICONS['cancel']} Cancelar", command=self.window.destroy, 
                  bg=self.colors['danger'], fg=self.colors['white'], font=('Arial', 11, 'bold'), 
@@ -382,7 +383,7 @@ class ClinicalEntryWindow(BaseDialog):
         """Guardar el registro clínico."""
         try:
             id_cliente = self.entries["ID Cliente:"].get().strip()
-            if not id_cliente.isdigit(): 
+            if not self.auto_id and not id_cliente.isdigit():
                 raise ValueError("ID debe ser numérico")
             
             nombre = self.entries["Nombre Cliente:"].get().strip()
@@ -390,6 +391,12 @@ class ClinicalEntryWindow(BaseDialog):
             diag = self.entries["Diagnóstico:"].get().strip()
             trat = self.entries["Tratamiento:"].get().strip()
             coment = self.entries["Comentarios (opcional):"].get("1.0", tk.END).strip()
+            datos_mascota = {
+                "especie": self.entries["Especie (opcional):"].get().strip(),
+                "raza": self.entries["Raza (opcional):"].get().strip(),
+                "edad": self.entries["Edad (opcional):"].get().strip(),
+                "genero": self.entries["Género (opcional):"].get().strip(),
+            }
 
             # Validaciones HU09
             if not nombre:
@@ -403,24 +410,38 @@ class ClinicalEntryWindow(BaseDialog):
             
             # Si es un nuevo historial (ID automático), crearlo directamente
             if self.auto_id:
-                hist = HistoriaClinica(id_cliente, nombre, mascota)
+                id_cliente = str(HistoriaClinica.get_next_id())
+                hist = HistoriaClinica(id_cliente, nombre, mascota, **datos_mascota)
                 HistoriaClinica.historiales.append(hist)  # Añadir explícitamente a la lista
             else:
-                # Si se actualiza, buscar y, si no existe, preguntar para crearlo
-                hist = HistoriaClinica.buscar_historial(id_cliente)
+                # Si se actualiza, buscar (primero por cliente y mascota) y, si no existe, preguntar para crearlo.
+                # Se guarda un historial por ID de cliente, así que no se crea otro para una mascota distinta.
+                hist = HistoriaClinica.buscar_historial(id_cliente, mascota)
+                if hist:
+                    hist.actualizar_mascota(**datos_mascota)
+                else:
+                    hist = HistoriaClinica.buscar_historial(id_cliente)
                 if not hist:
                     if messagebox.askyesno("Nuevo Historial", "ID no existente. ¿Desea crear un nuevo historial para este cliente?"):
-                        hist = HistoriaClinica(id_cliente, nombre, mascota)
+                        hist = HistoriaClinica(id_cliente, nombre, mascota, **datos_mascota)
                         HistoriaClinica.historiales.append(hist)  # Añadir explícitamente a la lista
                     else:
                         return
             
-            # Registrar diagnóstico
+            # Registrar diagnóstico (en memoria) y guardar en segundo plano
             hist.registrar_diagnostico(diag, trat, coment)
-            HistoriaClinica.guardar_historiales()
-            messagebox.showinfo("Éxito", "Registro clínico guardado correctamente")
-            self.callback()
-            self.window.destroy()
+            datos = [h.to_dict() for h in HistoriaClinica.historiales]
+            
+            def guardado(_):
+                mensaje = "Registro clínico guardado correctamente"
+                if self.auto_id:
+                    mensaje += f" (ID de cliente: {id_cliente})"
+                messagebox.showinfo("Éxito", mensaje)
+                self.callback()
+                self.window.destroy()
+            
+            background_executor.submit(self.window, get_repository("historiales").save_all, datos,
+                                       on_success=guardado, busy=self.save_button, serial="historiales")
             
         except Exception as e:
             messagebox.showerror("Error", str(e))
@@ -433,12 +454,16 @@ class PurchaseHistoryWindow(BaseDialog):
         super().__init__(parent, "Historial de Compras del Cliente", "800x650")
         from HU.Venta import Venta  # Importación diferida para evitar ciclos
         self.Venta = Venta
-        # Cargar las ventas desde archivo (en caso de no estar cargadas)
-        try:
-            self.Venta.cargar_desde_json()
-        except Exception:
-            pass
         self.create_widgets()
+        # Cargar las ventas desde archivo en segundo plano (la lista de clientes se llena al terminar)
+        background_executor.submit(self.window, self.Venta.leer_ventas,
+                                   on_success=self._on_ventas_cargadas, on_error=lambda e: None,
+                                   busy=self.search_button, serial="ventas")
+
+    def _on_ventas_cargadas(self, datos):
+        self.Venta.cargar_desde_json(datos=datos)
+        if self.window.winfo_exists():
+            self._refresh_client_list()
 
     def create_widgets(self):
         frm = tk.Frame(self.window, bg=self.colors['light_gray'])
@@ -467,13 +492,14 @@ class PurchaseHistoryWindow(BaseDialog):
             self.fin_entry = tk.Entry(form, width=15)
         self.fin_entry.grid(row=2, column=1, sticky='w', padx=5, pady=5)
 
-        tk.Button(form, text=f"{ICONS['search']} Buscar", bg=self.colors['primary'], fg=self.colors['white'], command=self.search).grid(row=3, column=0, columnspan=2, pady=10)
+        self.search_button = tk.Button(form, text=f"{ICONS['search']} Buscar", bg=self.colors['primary'], fg=self.colors['white'], command=self.search)
+        self.search_button.grid(row=3, column=0, columnspan=2, pady=10)
 
         # --------- Tabla de resultados ---------
         table_frame = ttk.Frame(frm)
         table_frame.pack(fill='both', expand=True)
 
-        columns = ("Fecha", "Total", "Forma Pago")
+        columns = ("N.°", "Fecha", "Total", "Forma Pago")
         self.tree = ttk.Treeview(table_frame, columns=columns, show='headings', height=12)
         for col in columns:
             self.tree.heading(col, text=col)
@@ -513,23 +539,22 @@ class PurchaseHistoryWindow(BaseDialog):
         if not nombre:
             messagebox.showerror("Error", "Debe seleccionar un cliente")
             return
-        ventas_cliente = self.Venta.filtrar_por_cliente(nombre)
-
         # Filtro por fechas
         inicio_str = self._get_date_str(self.inicio_entry)
         fin_str = self._get_date_str(self.fin_entry)
 
+        inicio = fin = None
         if inicio_str and fin_str:
             try:
                 inicio = datetime.strptime(inicio_str, "%d/%m/%Y").date()
                 fin = datetime.strptime(fin_str, "%d/%m/%Y").date()
-                ventas_cliente = [v for v in ventas_cliente if inicio <= v.fecha_venta.date() <= fin]
             except ValueError:
                 messagebox.showerror("Error", "Formato de fecha inválido")
                 return
 
-        # Ordenar por fecha descendente
-        ventas_cliente.sort(key=lambda v: v.fecha_venta, reverse=True)
+        # El índice por fecha del cliente ya está en orden cronológico: invertir para descendente
+        ventas_cliente = self.Venta.en_rango(inicio, fin, cliente=nombre)
+        ventas_cliente.reverse()
 
         self._load_table(ventas_cliente)
 
@@ -551,24 +576,26 @@ class PurchaseHistoryWindow(BaseDialog):
         if not ventas:
             messagebox.showinfo("Sin resultados", "No hay compras registradas para los criterios dados.")
             return
-        for idx, v in enumerate(ventas, 1):
+        for v in ventas:
             fecha_str = v.fecha_venta.strftime("%d/%m/%Y %H:%M:%S")
-            self.tree.insert('', 'end', iid=str(idx), values=(fecha_str, f"${v.total():,.0f}", v.forma_pago), tags=(idx,))
-        # Guardar referencia para detalle
-        self._ventas_mostradas = ventas
+            # El id de la venta identifica la fila: detalle, edición y anulación la buscan por él
+            self.tree.insert('', 'end', iid=str(v.id), values=(v.id, fecha_str, f"${v.total():,.0f}", v.forma_pago))
+
+    def _selected_sale(self):
+        """Venta de la fila seleccionada, o ``None``."""
+        sel = self.tree.selection()
+        return self.Venta.por_id(int(sel[0])) if sel else None
 
     def _on_double_click(self, event):
-        item_id = self.tree.selection()
-        if not item_id:
+        venta = self._selected_sale()
+        if venta is None:
             return
-        index = int(item_id[0]) - 1
-        venta = self._ventas_mostradas[index]
         self._show_detail_window(venta)
 
     def _show_detail_window(self, venta):
         """Muestra un Toplevel con el detalle de la venta."""
         win = tk.Toplevel(self.window)
-        win.title("Detalle de Compra")
+        win.title(f"Detalle de Compra N.° {venta.id}")
         win.geometry("500x400")
         text = tk.Text(win, bg=self.colors['white'], fg=self.colors['dark_gray'])
         text.pack(fill='both', expand=True)
@@ -578,42 +605,27 @@ class PurchaseHistoryWindow(BaseDialog):
     # Method to delete selected sale
     def _delete_selected_sale(self):
         """Anula la venta seleccionada y revierte el inventario."""
-        sel = self.tree.selection()
-        if not sel:
+        venta = self._selected_sale()
+        if venta is None:
             messagebox.showerror("Error", "Seleccione una venta para anular")
             return
-        idx = int(sel[0]) - 1
-        venta = self._ventas_mostradas[idx]
         confirm = messagebox.askyesno("Confirmar Anulación", "¿Desea anular la venta seleccionada?")
         if not confirm:
             return
-        # Revertir inventario
-        for producto, cantidad in venta.productos_vendidos:
-            producto.set_cantidad(producto.get_cantidad() + cantidad)
-            producto.set_disponibilidad(True)
-        # Eliminar venta de la lista (remover instancia correcta)
+        # Eliminar la venta de la lista global y revertir inventario
         try:
-            # Eliminar la venta seleccionada de la lista global
-            self.Venta.ventas.remove(venta)
-            # Guardar cambios en JSON
-            self.Venta.guardar_en_json()
+            venta.anular()
         except ValueError as e:
             print(f"Error al anular venta: {e}")
-        messagebox.showinfo("Venta Anulada", "La venta ha sido anulada correctamente")
-        # Refrescar tabla de resultados
-        try:
-            self.search()
-        except:
-            pass
+        # Guardar cambios en segundo plano
+        self._save_sales("Venta Anulada", "La venta ha sido anulada correctamente")
     
     def _edit_selected_sale(self):
         """Edita la venta seleccionada mediante diálogos y guarda los cambios."""
-        sel = self.tree.selection()
-        if not sel:
+        venta = self._selected_sale()
+        if venta is None:
             messagebox.showerror("Error", "Seleccione una venta para editar")
             return
-        idx = int(sel[0]) - 1
-        venta = self._ventas_mostradas[idx]
         # Editar cliente
         nuevo_cliente = simpledialog.askstring("Editar Cliente", "Nombre del cliente:", initialvalue=venta.cliente, parent=self.window)
         if nuevo_cliente is None:
@@ -622,19 +634,24 @@ class PurchaseHistoryWindow(BaseDialog):
         nuevo_pago = simpledialog.askstring("Editar Forma de Pago", "Forma de pago (efectivo, tarjeta):", initialvalue=venta.forma_pago, parent=self.window)
         if nuevo_pago is None:
             return
-        venta.cliente = nuevo_cliente.strip()
-        venta.forma_pago = nuevo_pago.strip().lower()
-        # Guardar cambios en JSON
-        try:
-            self.Venta.guardar_en_json()
-        except Exception as e:
-            print(f"Error al guardar venta editada: {e}")
-        messagebox.showinfo("Venta Actualizada", "La venta ha sido editada correctamente")
-        # Refrescar tabla de resultados
-        try:
-            self.search()
-        except:
-            pass
+        venta.modificar(cliente=nuevo_cliente.strip(), forma_pago=nuevo_pago.strip().lower())
+        # Guardar cambios en segundo plano
+        self._save_sales("Venta Actualizada", "La venta ha sido editada correctamente")
+
+    def _save_sales(self, titulo, mensaje):
+        """Guardar todas las ventas en segundo plano y refrescar la tabla al terminar."""
+        datos = [v.to_dict() for v in self.Venta.ventas]
+
+        def guardado(_):
+            messagebox.showinfo(titulo, mensaje)
+            # Refrescar tabla de resultados
+            try:
+                self.search()
+            except:
+                pass
+
+        background_executor.submit(self.window, get_repository("ventas").save_all, datos,
+                                   on_success=guardado, serial="ventas")
 
 # ==================== Nueva ventana: Registrar Cliente y Necesidad (HU14) ====================
 class RegisterNeedWindow(BaseDialog):
@@ -682,8 +699,9 @@ class RegisterNeedWindow(BaseDialog):
         btn_frame = tk.Frame(frm, bg=self.colors['white'])
         btn_frame.grid(row=4, column=0, columnspan=2, pady=15)
 
-        tk.Button(btn_frame, text=f"{ICONS['save']} Guardar", bg=self.colors['success'], fg=self.colors['white'],
-                  command=self._on_save).pack(side='left', padx=10)
+        self.save_button = tk.Button(btn_frame, text=f"{ICONS['save']} Guardar", bg=self.colors['success'],
+                                     fg=self.colors['white'], command=self._on_save)
+        self.save_button.pack(side='left', padx=10)
         tk.Button(btn_frame, text=f"{ICONS['cancel']} Cancelar", bg=self.colors['danger'], fg=self.colors['white'],
                   command=self.window.destroy).pack(side='left', padx=10)
 
@@ -784,18 +802,18 @@ class RegisterNeedWindow(BaseDialog):
         if not messagebox.askyesno("Confirmar", resumen):
             return
 
-        # -------- Guardar en JSON --------
-        try:
-            with open("db/solicitudes.json", "r", encoding="utf-8") as f:
-                solicitudes = json.load(f)
-        except FileNotFoundError:
-            solicitudes = []
-        except json.decoder.JSONDecodeError:
-            solicitudes = []
-
-        solicitudes.append(data)
-        with open("db/solicitudes.json", "w", encoding="utf-8") as f:
-            json.dump(solicitudes, f, indent=4, ensure_ascii=False)
-
-        messagebox.showinfo("Éxito", "Solicitud registrada correctamente")
-        self.window.destroy()
+        # -------- Guardar en la base de datos (en segundo plano) --------
+        def guardar():
+            repositorio = get_repository("solicitudes")
+            try:
+                repositorio.append(data)
+            except json.decoder.JSONDecodeError:
+                # Archivo dañado: reiniciar la lista con la nueva solicitud
+                repositorio.save_all([data])
+
+        def guardado(_):
+            messagebox.showinfo("Éxito", "Solicitud registrada correctamente")
+            self.window.destroy()
+
+        background_executor.submit(self.window, guardar, on_success=guardado,
+                                   busy=self.save_button, serial="solicitudes")
@@ -10,12 +10,30 @@ from HU.HistoriaClinica import HistoriaClinica
 
 
 class ClinicalHistoryComponent:
-    """Componente para la gestión del historial clínico."""
+    """Componente para la gestión del historial clínico.
+    
+    Los historiales se muestran del más reciente al más antiguo y por
+    páginas: se dibujan los primeros y el resto se carga al acercarse al
+    final del scroll. De cada historial se muestran sus últimos registros,
+    con un botón para ver los anteriores. Un registro o historial nuevo se
+    agrega a la vista sin reconstruirla.
+    """
+    
+    HISTORIALES_POR_PAGINA = 20
+    REGISTROS_POR_PAGINA = 10
     
     def __init__(self, parent):
         self.parent = parent
         self.colors = COLOR_PALETTE
         self.records_frame = None
+        self._canvas = None
+        self._scrollbar = None
+        self._vistas = {}  # índice del historial -> widgets y registros mostrados
+        self._inicio_visto = 0  # Se muestran los historiales [inicio_visto, total_visto)
+        self._total_visto = 0
+        self._carga_pendiente = False
+        self._pie = None
+        self._vacio = None
         
     def create_clinical_history_tab(self, notebook):
         """Crear la pestaña de historial clínico."""
@@ -69,7 +87,7 @@ class ClinicalHistoryComponent:
         )
         
         canvas.create_window((0, 0), window=records_container, anchor='nw')
-        canvas.configure(yscrollcommand=scrollbar.set)
+        canvas.configure(yscrollcommand=self._on_scroll)
         canvas.pack(side='left', fill='both', expand=True)
         scrollbar.pack(side='right', fill='y')
 
@@ -79,56 +97,189 @@ class ClinicalHistoryComponent:
         self._bind_mousewheel(content_frame)
 
         self.records_frame = records_container
-        self.refresh_clinical_histories()
+        self._canvas = canvas
+        self._scrollbar = scrollbar
+        self._reconstruir()
         
         return clinical_frame
 
     def refresh_clinical_histories(self):
-        """Refrescar los historiales clínicos mostrados."""
-        # Limpiar registros anteriores
+        """Refrescar los historiales clínicos mostrados.
+        
+        Solo se agregan los historiales y registros nuevos; la vista se
+        reconstruye únicamente si los historiales se recargaron.
+        """
+        if self.records_frame is None:
+            return
+        historiales = HistoriaClinica.historiales
+        obsoleta = (len(historiales) < self._total_visto
+                    or (self._vacio is not None and historiales)
+                    or any(historiales[i] is not vista['historial'] for i, vista in self._vistas.items()))
+        if obsoleta:
+            self._reconstruir()
+            return
+        
+        # Historiales nuevos (al final de la lista): se muestran arriba
+        nuevo = None
+        for indice in range(self._total_visto, len(historiales)):
+            nuevo = self._mostrar_historial(indice, arriba=True)
+        self._total_visto = len(historiales)
+        
+        # Registros nuevos de los historiales visibles
+        for vista in self._vistas.values():
+            if len(vista['historial'].get_registros()) > vista['hasta']:
+                nuevo = self._agregar_registros_nuevos(vista)
+        if nuevo is not None:
+            self._ver(nuevo)
+        self._actualizar_pie()
+    
+    def _reconstruir(self):
+        """Dibujar desde cero la primera página de historiales."""
         for widget in self.records_frame.winfo_children():
             widget.destroy()
+        self._vistas = {}
+        self._vacio = None
+        self._total_visto = self._inicio_visto = len(HistoriaClinica.historiales)
         
         if not HistoriaClinica.historiales:
-            label = tk.Label(self.records_frame, text="No hay historiales clínicos registrados.", 
-                             font=('Arial', 11), bg=self.colors['light_gray'])
-            label.pack(pady=20)
+            self._vacio = tk.Label(self.records_frame, text="No hay historiales clínicos registrados.", 
+                                   font=('Arial', 11), bg=self.colors['light_gray'])
+            self._vacio.pack(pady=20)
+            self._pie = None
+            return
+        
+        # Pie con el botón para cargar más (también se carga al llegar al final del scroll)
+        self._pie = tk.Frame(self.records_frame, bg=self.colors['light_gray'])
+        self._pie.pack(fill='x', pady=10)
+        self._pie_boton = tk.Button(self._pie, command=self._cargar_pagina,
+                                    bg=self.colors['white'], relief='flat', font=('Arial', 10))
+        self._bind_mousewheel_recursivo(self._pie)
+        self._cargar_pagina()
+        self._canvas.yview_moveto(0.0)
+    
+    def _cargar_pagina(self):
+        """Mostrar la siguiente página de historiales (más antiguos) al final de la vista."""
+        self._carga_pendiente = False
+        fin = self._inicio_visto
+        for indice in range(fin - 1, max(0, fin - self.HISTORIALES_POR_PAGINA) - 1, -1):
+            self._mostrar_historial(indice)
+        self._inicio_visto = max(0, fin - self.HISTORIALES_POR_PAGINA)
+        self._actualizar_pie()
+    
+    def _actualizar_pie(self):
+        if self._pie is None:
+            return
+        restantes = self._inicio_visto
+        if restantes:
+            self._pie_boton.config(text=f"⬇ Cargar más historiales ({restantes} restantes)")
+            self._pie_boton.pack()
+        else:
+            self._pie_boton.pack_forget()
+    
+    def _on_scroll(self, first, last):
+        """Actualizar la barra y cargar otra página al acercarse al final."""
+        self._scrollbar.set(first, last)
+        if float(last) >= 0.95 and self._inicio_visto > 0 and not self._carga_pendiente:
+            self._carga_pendiente = True
+            self.records_frame.after_idle(self._cargar_pagina)
+    
+    def _mostrar_historial(self, indice, arriba=False):
+        """Dibujar el historial ``indice`` con sus últimos registros."""
+        h = HistoriaClinica.historiales[indice]
+        contenedor = tk.Frame(self.records_frame, bg=self.colors['light_gray'])
+        if arriba:
+            primero = self.records_frame.pack_slaves()[0]
+            contenedor.pack(fill='x', expand=True, before=primero)
         else:
-            for h in HistoriaClinica.historiales:
-                # Frame para cada historial
-                frame = tk.Frame(self.records_frame, bg=self.colors['light_gray'], padx=10, pady=10)
-                frame.pack(fill='x', expand=True, pady=10)
-                
-                # Título del historial
-                title = f"Cliente ID: {h.get_id_cliente()} - {h.get_nombre_cliente()} / Mascota: {h.get_nombre_mascota()}"
-                tk.Label(frame, text=title, font=('Arial', 12, 'bold'), 
-                        bg=self.colors['light_gray']).pack(anchor='w')
-                
-                # Registros del historial
-                for i, reg in enumerate(h.get_registros(), 1):
-                    reg_frame = tk.Frame(frame, bg=self.colors['light_gray'], padx=10, pady=10)
-                    reg_frame.pack(fill='x', expand=True, pady=(5, 0))
-                    
-                    # Fecha y hora
-                    fecha_hora = f"{reg['fecha']} {reg['hora']}"
-                    tk.Label(reg_frame, text=fecha_hora, font=('Arial', 10, 'italic'), 
-                            bg=self.colors['light_gray']).pack(anchor='w')
-                    
-                    # Diagnóstico y tratamiento
-                    diag_trat = f"Diagnóstico: {reg['diagnostico']} | Tratamiento: {reg['tratamiento']}"
-                    tk.Label(reg_frame, text=diag_trat, font=('Arial', 10), 
-                            bg=self.colors['light_gray']).pack(anchor='w')
-                    
-                    # Comentarios (si existen)
-                    if reg.get('comentarios'):
-                        tk.Label(reg_frame, text=f"Comentarios: {reg['comentarios']}", font=('Arial', 10, 'italic'), 
-                                bg=self.colors['light_gray']).pack(anchor='w')
-                
-                # Separador entre historiales
-                ttk.Separator(self.records_frame, orient='horizontal').pack(fill='x', pady=10)
-        
-        # Hacer scroll al final
-        self.records_frame.master.yview_moveto(1.0)
+            contenedor.pack(fill='x', expand=True, before=self._pie)
+        
+        # Frame para cada historial
+        frame = tk.Frame(contenedor, bg=self.colors['light_gray'], padx=10, pady=10)
+        frame.pack(fill='x', expand=True, pady=10)
+        
+        # Título del historial
+        title = f"Cliente ID: {h.get_id_cliente()} - {h.get_nombre_cliente()} / Mascota: {h.get_nombre_mascota()}"
+        tk.Label(frame, text=title, font=('Arial', 12, 'bold'), 
+                bg=self.colors['light_gray']).pack(anchor='w')
+        
+        # Botón para ver registros anteriores (solo si hay más de una página)
+        anteriores = tk.Button(frame, bg=self.colors['light_gray'], relief='flat', font=('Arial', 9, 'italic'),
+                               command=lambda: self._mostrar_registros_anteriores(indice))
+        
+        # Separador entre historiales
+        ttk.Separator(contenedor, orient='horizontal').pack(fill='x', pady=10)
+        
+        total = len(h.get_registros())
+        vista = {'historial': h, 'frame': frame, 'anteriores': anteriores,
+                 'desde': max(0, total - self.REGISTROS_POR_PAGINA), 'hasta': total}
+        self._vistas[indice] = vista
+        for reg in h.get_registros()[vista['desde']:]:
+            self._crear_registro(frame, reg)
+        self._actualizar_anteriores(vista)
+        self._bind_mousewheel_recursivo(contenedor)
+        return contenedor
+    
+    def _crear_registro(self, frame, reg, antes=None):
+        """Crear los widgets de un registro clínico (al final o antes del widget ``antes``)."""
+        reg_frame = tk.Frame(frame, bg=self.colors['light_gray'], padx=10, pady=10)
+        if antes is None:
+            reg_frame.pack(fill='x', expand=True, pady=(5, 0))
+        else:
+            reg_frame.pack(fill='x', expand=True, pady=(5, 0), before=antes)
+        
+        # Fecha y hora
+        fecha_hora = f"{reg['fecha']} {reg['hora']}"
+        tk.Label(reg_frame, text=fecha_hora, font=('Arial', 10, 'italic'), 
+                bg=self.colors['light_gray']).pack(anchor='w')
+        
+        # Diagnóstico y tratamiento
+        diag_trat = f"Diagnóstico: {reg['diagnostico']} | Tratamiento: {reg['tratamiento']}"
+        tk.Label(reg_frame, text=diag_trat, font=('Arial', 10), 
+                bg=self.colors['light_gray']).pack(anchor='w')
+        
+        # Comentarios (si existen)
+        if reg.get('comentarios'):
+            tk.Label(reg_frame, text=f"Comentarios: {reg['comentarios']}", font=('Arial', 10, 'italic'), 
+                    bg=self.colors['light_gray']).pack(anchor='w')
+        return reg_frame
+    
+    def _agregar_registros_nuevos(self, vista):
+        """Agregar al final del historial los registros creados desde que se dibujó."""
+        registros = vista['historial'].get_registros()
+        ultimo = None
+        for reg in registros[vista['hasta']:]:
+            ultimo = self._crear_registro(vista['frame'], reg)
+            self._bind_mousewheel_recursivo(ultimo)
+        vista['hasta'] = len(registros)
+        return ultimo
+    
+    def _mostrar_registros_anteriores(self, indice):
+        """Mostrar la página anterior de registros de un historial."""
+        vista = self._vistas[indice]
+        registros = vista['historial'].get_registros()
+        desde = max(0, vista['desde'] - self.REGISTROS_POR_PAGINA)
+        # Insertar justo después del botón (antes del primer registro mostrado)
+        hijos = vista['frame'].pack_slaves()
+        antes = hijos[hijos.index(vista['anteriores']) + 1] if vista['anteriores'] in hijos[:-1] else None
+        for reg in registros[desde:vista['desde']]:
+            self._bind_mousewheel_recursivo(self._crear_registro(vista['frame'], reg, antes=antes))
+        vista['desde'] = desde
+        self._actualizar_anteriores(vista)
+    
+    def _actualizar_anteriores(self, vista):
+        if vista['desde']:
+            vista['anteriores'].config(text=f"⬆ Ver registros anteriores ({vista['desde']})")
+            # Justo debajo del título
+            vista['anteriores'].pack(anchor='w', after=vista['frame'].pack_slaves()[0])
+        else:
+            vista['anteriores'].pack_forget()
+    
+    def _ver(self, widget):
+        """Desplazar el scroll para que ``widget`` quede visible."""
+        self.records_frame.update_idletasks()
+        alto = max(1, self.records_frame.winfo_height())
+        y = widget.winfo_rooty() - self.records_frame.winfo_rooty()
+        self._canvas.yview_moveto(max(0.0, y / alto))
 
     def open_clinical_entry_registrar(self):
         """Registrar nuevo diagnóstico con ID autoincrementado."""
@@ -178,3 +329,12 @@ class ClinicalHistoryComponent:
         # Linux
         widget.bind("<Button-4>",  lambda e, c=_get_scroll_target(widget): c.yview_scroll(-1, "units"))
         widget.bind("<Button-5>",  lambda e, c=_get_scroll_target(widget): c.yview_scroll(1, "units"))
+
+    def _bind_mousewheel_recursivo(self, widget):
+        """Enlazar la rueda del ratón a ``widget`` y sus descendientes, desplazando el canvas."""
+        canvas = self._canvas
+        widget.bind("<MouseWheel>", lambda e: canvas.yview_scroll(int(-1 * (e.delta / 120)), "units"))
+        widget.bind("<Button-4>", lambda e: canvas.yview_scroll(-1, "units"))
+        widget.bind("<Button-5>", lambda e: canvas.yview_scroll(1, "units"))
+        for hijo in widget.winfo_children():
+            self._bind_mousewheel_recursivo(hijo)
@@ -60,7 +60,7 @@ class PedidosWindow:
         # Tabla pedidos
         table_frame = tk.LabelFrame(self.window, text="📋 Pedidos Registrados", font=FONTS['subtitle'], bg=self.colors['white'], fg=self.colors['dark_gray'])
         table_frame.pack(fill='both', expand=True, padx=20, pady=10)
-        columns = ("Proveedor", "Producto", "Cantidad", "Fecha", "Estado")
+        columns = ("N.°", "Proveedor", "Producto", "Cantidad", "Fecha", "Estado")
         self.tree = ttk.Treeview(table_frame, columns=columns, show='headings')
         for col in columns:
             self.tree.heading(col, text=col)
@@ -122,7 +122,7 @@ class PedidosWindow:
             d = p.to_dict()
             # Apply tag based on estado for coloring
             tag = d['estado']
-            self.tree.insert('', 'end', iid=str(idx), values=(d['cliente'], d['producto'], d['cantidad'], d['fecha'], d['estado']), tags=(tag,))
+            self.tree.insert('', 'end', iid=str(idx), values=(d['id'], d['cliente'], d['producto'], d['cantidad'], d['fecha'], d['estado']), tags=(tag,))
 
     def _procesar(self):
         sel = self.tree.selection()
@@ -190,7 +190,7 @@ class PedidosComponent:
         # Tabla de pedidos
         table_frame = tk.LabelFrame(root, text="📋 Pedidos Registrados", font=FONTS['subtitle'], bg=self.colors['white'], fg=self.colors['dark_gray'])
         table_frame.pack(fill='both', expand=True, padx=20, pady=10)
-        columns = ("Proveedor", "Producto", "Cantidad", "Fecha", "Estado")
+        columns = ("N.°", "Proveedor", "Producto", "Cantidad", "Fecha", "Estado")
         self.tree = ttk.Treeview(table_frame, columns=columns, show='headings')
         for col in columns:
             self.tree.heading(col, text=col)
@@ -234,7 +234,7 @@ class PedidosComponent:
             d = p.to_dict()
             # Apply tag based on estado for coloring
             tag = d['estado']
-            self.tree.insert('', 'end', iid=str(idx), values=(d['cliente'], d['producto'], d['cantidad'], d['fecha'], d['estado']), tags=(tag,))
+            self.tree.insert('', 'end', iid=str(idx), values=(d['id'], d['cliente'], d['producto'], d['cantidad'], d['fecha'], d['estado']), tags=(tag,))
 
     def _procesar(self):
         sel = self.tree.selection()
@@ -0,0 +1,158 @@
+"""
+Componente de reportes de ventas (pestaña Historial).
+
+Muestra los resúmenes materializados de ``HU/ResumenVentas.py``: ventas por
+día, por producto, por forma de pago y mejores clientes. Cada consulta solo
+recorre los días del rango elegido; los resúmenes se reconstruyen desde el
+archivo de ventas al abrir la pestaña, en segundo plano.
+"""
+
+import tkinter as tk
+from datetime import date, datetime, timedelta
+from tkinter import ttk, messagebox
+
+from HU.ResumenVentas import ResumenVentas
+from HU.Venta import Venta
+from ..background import background_executor
+from ..configuracion import COLOR_PALETTE, FONTS, ICONS
+
+
+class ReportsComponent:
+    """Reportes de ventas sobre los resúmenes materializados."""
+
+    DIAS_POR_DEFECTO = 30
+    LIMITE_CLIENTES = 20
+
+    # Tabla -> columnas
+    TABLAS = {
+        'dias': ("Fecha", "Ventas", "Total"),
+        'productos': ("Código", "Producto", "Unidades", "Total"),
+        'pagos': ("Forma de Pago", "Ventas", "Total"),
+        'clientes': ("Cliente", "Compras", "Unidades", "Total", "Última Compra"),
+    }
+
+    def __init__(self, parent):
+        self.parent = parent
+        self.colors = COLOR_PALETTE
+        self.resumen = ResumenVentas()
+        self._listo = False  # Resúmenes reconstruidos desde el archivo
+        self.tables = {}
+        self.desde_entry = None
+        self.hasta_entry = None
+        self.totals_label = None
+        self.rebuild_button = None
+
+    def create_reports_tab(self, notebook):
+        """Crear la pestaña de historial y reportes."""
+        history_frame = ttk.Frame(notebook)
+        notebook.add(history_frame, text=f"{ICONS.get('history', '📊')} Historial")
+
+        main_frame = tk.Frame(history_frame, bg=self.colors['light_gray'])
+        main_frame.pack(fill='both', expand=True, padx=20, pady=20)
+
+        tk.Label(main_frame,
+                 text="📊 Historial y Reportes de Ventas",
+                 font=FONTS['title'],
+                 bg=self.colors['light_gray'],
+                 fg=self.colors['dark_gray']).pack(pady=(0, 15))
+
+        # Rango de fechas
+        controls = tk.Frame(main_frame, bg=self.colors['light_gray'])
+        controls.pack(fill='x', pady=(0, 10))
+        hoy = date.today()
+        tk.Label(controls, text="Desde (dd/mm/aaaa):", font=FONTS['label'],
+                 bg=self.colors['light_gray']).pack(side='left', padx=(0, 5))
+        self.desde_entry = tk.Entry(controls, width=12)
+        self.desde_entry.insert(0, (hoy - timedelta(days=self.DIAS_POR_DEFECTO)).strftime("%d/%m/%Y"))
+        self.desde_entry.pack(side='left', padx=(0, 15))
+        tk.Label(controls, text="Hasta (dd/mm/aaaa):", font=FONTS['label'],
+                 bg=self.colors['light_gray']).pack(side='left', padx=(0, 5))
+        self.hasta_entry = tk.Entry(controls, width=12)
+        self.hasta_entry.insert(0, hoy.strftime("%d/%m/%Y"))
+        self.hasta_entry.pack(side='left', padx=(0, 15))
+        tk.Button(controls, text=f"{ICONS['search']} Ver Reporte", font=FONTS['label'],
+                  bg=self.colors['primary'], fg=self.colors['white'],
+                  command=self.refresh).pack(side='left', padx=5)
+        self.rebuild_button = tk.Button(controls, text="🔄 Recalcular", font=FONTS['label'],
+                                        bg=self.colors['accent'], fg=self.colors['white'],
+                                        command=self.rebuild)
+        self.rebuild_button.pack(side='left', padx=5)
+
+        self.totals_label = tk.Label(main_frame, text="", font=FONTS['subtitle'],
+                                     bg=self.colors['light_gray'], fg=self.colors['dark_gray'])
+        self.totals_label.pack(fill='x', pady=(0, 10))
+
+        # Una subpestaña por reporte
+        reports = ttk.Notebook(main_frame)
+        reports.pack(fill='both', expand=True)
+        titulos = {'dias': "📅 Por Día", 'productos': "📦 Por Producto",
+                   'pagos': "💳 Por Forma de Pago", 'clientes': "👥 Clientes"}
+        for clave, columnas in self.TABLAS.items():
+            frame = ttk.Frame(reports)
+            reports.add(frame, text=titulos[clave])
+            tree = ttk.Treeview(frame, columns=columnas, show='headings', height=15)
+            for col in columnas:
+                tree.heading(col, text=col)
+                tree.column(col, anchor='w' if col in ("Producto", "Cliente") else 'center', width=120)
+            scrollbar = ttk.Scrollbar(frame, orient='vertical', command=tree.yview)
+            tree.configure(yscrollcommand=scrollbar.set)
+            tree.pack(side='left', fill='both', expand=True)
+            scrollbar.pack(side='right', fill='y')
+            self.tables[clave] = tree
+
+        # Las ventas nuevas ya están en los resúmenes: basta con volver a consultar al mostrar la pestaña
+        history_frame.bind('<Map>', lambda e: self._listo and self.refresh())
+        self.rebuild()
+
+    def rebuild(self):
+        """Reconstruir los resúmenes desde el archivo de ventas (lectura en segundo plano)."""
+        version = self.resumen.version
+        background_executor.submit(self.rebuild_button, Venta.leer_ventas,
+                                   on_success=lambda registros: self._on_ventas_leidas(registros, version),
+                                   busy=self.rebuild_button, serial="ventas")
+
+    def _on_ventas_leidas(self, registros, version):
+        if self.resumen.version != version:
+            # Se registró o anuló una venta mientras se leía el archivo: volver a leer
+            self.rebuild()
+            return
+        self.resumen.reconstruir(registros)
+        self._listo = True
+        if self.totals_label.winfo_exists():
+            self.refresh()
+
+    def _rango(self):
+        """Fechas del rango elegido; ``None`` si alguna no es válida."""
+        try:
+            desde = datetime.strptime(self.desde_entry.get().strip(), "%d/%m/%Y").date()
+            hasta = datetime.strptime(self.hasta_entry.get().strip(), "%d/%m/%Y").date()
+        except ValueError:
+            return None
+        return desde, hasta
+
+    def refresh(self):
+        """Consultar los resúmenes para el rango elegido y mostrar los reportes."""
+        rango = self._rango()
+        if rango is None:
+            messagebox.showerror("Error", "Formato de fecha inválido (use dd/mm/aaaa)")
+            return
+        desde, hasta = rango
+        ventas, importe = self.resumen.totales(desde, hasta)
+        self.totals_label.config(text=f"🧾 {ventas} ventas   💰 Total: ${importe:,.0f}")
+
+        self._load_table('dias', [(f.strftime("%d/%m/%Y"), n, f"${total:,.0f}")
+                                  for f, n, total in reversed(self.resumen.ventas_por_dia(desde, hasta))])
+        self._load_table('productos', [(codigo, nombre, unidades, f"${total:,.0f}")
+                                       for codigo, nombre, unidades, total
+                                       in self.resumen.ventas_por_producto(desde, hasta)])
+        self._load_table('pagos', [(forma, n, f"${total:,.0f}")
+                                   for forma, n, total in self.resumen.ventas_por_forma_pago(desde, hasta)])
+        self._load_table('clientes', [(c['nombre'], c['ventas'], c['unidades'], f"${c['importe']:,.0f}",
+                                       c['ultima'].strftime("%d/%m/%Y"))
+                                      for c in self.resumen.mejores_clientes(self.LIMITE_CLIENTES, desde, hasta)])
+
+    def _load_table(self, clave, filas):
+        tree = self.tables[clave]
+        tree.delete(*tree.get_children())
+        for fila in filas:
+            tree.insert('', 'end', values=fila)
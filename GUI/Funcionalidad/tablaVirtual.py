@@ -0,0 +1,168 @@
+"""
+Virtualized Treeview for large tables in AgroVet Plus.
+"""
+
+import tkinter as tk
+from tkinter import ttk
+
+
+class VirtualTreeview:
+    """Tabla virtualizada sobre un ``ttk.Treeview``.
+
+    El modelo (``items``) vive en Python: filtrar y ordenar operan sobre la
+    lista, no sobre los widgets. El Treeview solo contiene las filas de la
+    ventana visible y cada refresco aplica un diff por iid: inserta las filas
+    que entran, borra las que salen y reconfigura solo las que cambiaron.
+
+    Args:
+        tree: Treeview sin scrollbar propio (la barra vertical la controla la tabla).
+        scrollbar: Barra vertical que recorre el modelo completo.
+        clave: Función ``item -> iid`` (identificador estable de la fila).
+        fila: Función ``item -> (valores, tags)``.
+        claves_orden: ``{columna: función item -> clave}`` para ordenar al pulsar el encabezado.
+    """
+
+    def __init__(self, tree, scrollbar, clave, fila, claves_orden=None):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.clave = clave
+        self.fila = fila
+        self.claves_orden = claves_orden or {}
+        self.items = []
+        self._items_originales = []
+        self.orden = None  # (columna, descendente)
+        self.inicio = 0
+        self.filas_visibles = max(1, int(tree.cget('height')))
+        self._mostradas = {}  # iid -> (valores, tags) presentes en el Treeview
+        self._seleccion = set()  # iids seleccionados, aunque estén fuera de la ventana
+
+        scrollbar.configure(command=self._on_scrollbar)
+        tree.bind('<Configure>', self._on_configure)
+        tree.bind('<<TreeviewSelect>>', self._on_select, add='+')
+        tree.bind('<MouseWheel>', lambda e: self.desplazar(int(-1 * (e.delta / 120)) * 3))
+        tree.bind('<Button-4>', lambda e: self.desplazar(-3))
+        tree.bind('<Button-5>', lambda e: self.desplazar(3))
+        tree.bind('<Up>', lambda e: self._on_flecha(-1))
+        tree.bind('<Down>', lambda e: self._on_flecha(1))
+        tree.bind('<Prior>', lambda e: self.desplazar(-self.filas_visibles))
+        tree.bind('<Next>', lambda e: self.desplazar(self.filas_visibles))
+        for columna in self.claves_orden:
+            tree.heading(columna, command=lambda c=columna: self.ordenar_por(c))
+
+    # ---------- Modelo ----------
+    def set_items(self, items, reiniciar=True):
+        """Reemplazar el modelo y refrescar la vista.
+
+        Con ``reiniciar`` la vista vuelve al inicio (nueva búsqueda); sin él
+        se conserva la posición (refresco de los mismos datos).
+        """
+        self._items_originales = list(items)
+        self.items = self._ordenados(self._items_originales)
+        if self._seleccion:
+            self._seleccion &= {self.clave(item) for item in self.items}
+        if reiniciar:
+            self.inicio = 0
+        self.render()
+
+    def _ordenados(self, items):
+        if self.orden is None:
+            return list(items)
+        columna, descendente = self.orden
+        return sorted(items, key=self.claves_orden[columna], reverse=descendente)
+
+    def ordenar_por(self, columna):
+        """Ordenar el modelo por ``columna``; pulsar de nuevo invierte el orden."""
+        descendente = self.orden == (columna, False)
+        self.orden = (columna, descendente)
+        self.items = self._ordenados(self._items_originales)
+        for otra in self.claves_orden:
+            texto = self.tree.heading(otra, 'text').rstrip(' ▲▼')
+            if otra == columna:
+                texto += ' ▼' if descendente else ' ▲'
+            self.tree.heading(otra, text=texto)
+        self.render()
+
+    def seleccion(self):
+        """iids seleccionados, estén o no en la ventana visible."""
+        return list(self._seleccion)
+
+    # ---------- Vista ----------
+    def desplazar(self, filas):
+        self.inicio += filas
+        self.render()
+        return 'break'
+
+    def render(self):
+        """Sincronizar el Treeview con la ventana visible del modelo (diff por iid)."""
+        total = len(self.items)
+        self.inicio = max(0, min(self.inicio, total - self.filas_visibles))
+        deseadas = [(self.clave(item), *self.fila(item))
+                    for item in self.items[self.inicio:self.inicio + self.filas_visibles]]
+        iids = {iid for iid, _, _ in deseadas}
+
+        sobrantes = [iid for iid in self._mostradas if iid not in iids]
+        if sobrantes:
+            self.tree.delete(*sobrantes)
+            for iid in sobrantes:
+                del self._mostradas[iid]
+
+        for posicion, (iid, valores, tags) in enumerate(deseadas):
+            actual = self._mostradas.get(iid)
+            if actual is None:
+                self.tree.insert('', posicion, iid=iid, values=valores, tags=tags)
+            else:
+                if actual != (valores, tags):
+                    self.tree.item(iid, values=valores, tags=tags)
+                if self.tree.index(iid) != posicion:
+                    self.tree.move(iid, '', posicion)
+            self._mostradas[iid] = (valores, tags)
+
+        visibles = [iid for iid in self._mostradas if iid in self._seleccion]
+        if set(self.tree.selection()) != set(visibles):
+            self.tree.selection_set(visibles)
+
+        if total:
+            self.scrollbar.set(self.inicio / total, min(1.0, (self.inicio + self.filas_visibles) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    # ---------- Eventos ----------
+    def _on_scrollbar(self, accion, cantidad, unidad=None):
+        if accion == 'moveto':
+            self.inicio = int(float(cantidad) * len(self.items))
+            self.render()
+        elif accion == 'scroll':
+            paso = self.filas_visibles if unidad == 'pages' else 1
+            self.desplazar(int(cantidad) * paso)
+
+    def _on_configure(self, event):
+        alto_fila = int(ttk.Style().lookup('Treeview', 'rowheight') or 20)
+        # Descontar el encabezado (aproximadamente una fila)
+        filas = max(1, event.height // alto_fila - 1)
+        if filas != self.filas_visibles:
+            self.filas_visibles = filas
+            self.render()
+
+    def _on_select(self, event=None):
+        # Las filas fuera de la ventana conservan su estado de selección
+        self._seleccion = (self._seleccion - set(self._mostradas)) | set(self.tree.selection())
+
+    def _on_flecha(self, paso):
+        """Mover la selección con el teclado, desplazando la ventana al llegar al borde."""
+        foco = self.tree.focus()
+        if not foco or foco not in self._mostradas:
+            return None
+        posicion = self.tree.index(foco)
+        borde = 0 if paso < 0 else len(self._mostradas) - 1
+        if posicion != borde:
+            return None  # Movimiento normal del Treeview dentro de la ventana
+        indice = self.inicio + posicion + paso
+        if not 0 <= indice < len(self.items):
+            return 'break'
+        iid = self.clave(self.items[indice])
+        self._seleccion = {iid}
+        self.inicio += paso
+        self.render()
+        self.tree.focus(iid)
+        self.tree.see(iid)
+        return 'break'
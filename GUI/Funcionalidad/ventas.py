@@ -8,6 +8,8 @@ import os
 import json
 from datetime import datetime
 
+from db import next_id, SequenceError
+from ..background import background_executor
 from ..configuracion import COLOR_PALETTE, FONTS, ICONS
 
 
@@ -346,32 +348,27 @@ class SalesComponent:
                 # Copia de los ítems antes de vaciar el carrito
                 items_copia = [item.copy() for item in self.carrito_items]
 
-                # Actualizar stock y registrar historial utilizando método del Inventario
-                for item in self.carrito_items:
-                    producto = item['producto']
-                    nueva_cantidad = producto.get_cantidad() - item['cantidad']
-                    # Esto registra historial y guarda inventario internamente
-                    self.inventario.actualizar_stock(producto.get_codigo(), nueva_cantidad, "ventas")
-
                 # ---------------- Registrar la venta ----------------
-                try:
-                    from HU.Venta import Venta
-                    # Cargar ventas previas (si existe el archivo)
-                    Venta.cargar_desde_json()
+                from HU.Venta import Venta
 
-                    # Construir lista de tuplas (Producto, cantidad)
-                    productos_vendidos = [(item['producto'], item['cantidad']) for item in items_copia]
+                # Construir lista de tuplas (Producto, cantidad)
+                productos_vendidos = [(item['producto'], item['cantidad']) for item in items_copia]
 
-                    # Crear nueva venta
-                    nueva_venta = Venta(self.cliente_entry.get(), productos_vendidos, self.pago_var.get())
-                    # Guardar actualizaciones en el archivo
-                    Venta.guardar_en_json()
-                except Exception as e:
-                    # No impedir la venta si falla el guardado; solo informar
-                    print(f"Error al registrar venta en ventas.json: {e}")
+                # Descontar stock, registrar historial y guardar la venta en un solo lote
+                try:
+                    venta = Venta.confirmar_venta(self.inventario, self.cliente_entry.get(),
+                                          productos_vendidos, self.pago_var.get())
+                except (SequenceError, OSError) as e:
+                    # Falla de almacenamiento: nada se guardó y el carrito se conserva para reintentar
+                    messagebox.showerror("Error", f"⚠️ No se pudo guardar la venta: {e}")
+                    return
+                except ValueError as e:
+                    # Nada se guardó: el carrito se conserva para corregirlo
+                    messagebox.showerror("Error", f"⚠️ {e}")
+                    return
 
                 # Generar comprobante
-                self.generar_comprobante_venta(total, items_copia)
+                self.generar_comprobante_venta(total, items_copia, venta)
 
                 # Mostrar éxito
                 messagebox.showinfo("Venta Completada",
@@ -395,34 +392,44 @@ class SalesComponent:
         except Exception as e:
             messagebox.showerror("Error", f"⚠️ Error al procesar venta: {str(e)}")
 
-    def generar_comprobante_venta(self, total, items):
-        """Generar un comprobante de venta en formato de texto."""
-        try:
+    def generar_comprobante_venta(self, total, items, venta=None):
+        """Generar un comprobante de venta en formato de texto.
+        
+        El texto se arma con los datos del formulario; el número y el archivo
+        se obtienen y escriben en segundo plano. El número sale de la secuencia
+        persistente "comprobantes", así que no se repite entre estaciones, y
+        se agrega al nombre del archivo para que dos comprobantes del mismo
+        segundo no se pisen.
+        """
+        fecha = datetime.now()
+        
+        encabezado = ["AGROVET PLUS - COMPROBANTE DE VENTA", "=" * 50]
+        lineas = []
+        if venta is not None:
+            lineas.append(f"Venta N.°: {venta.id}")
+        lineas += [f"Fecha: {fecha.strftime('%d/%m/%Y %H:%M:%S')}",
+                   f"Cliente: {self.cliente_entry.get()}",
+                   f"Forma de pago: {self.pago_var.get()}",
+                   "-" * 50]
+        for item in items:
+            nombre = item['producto'].nombre
+            cantidad = item['cantidad']
+            subtotal = item['subtotal']
+            lineas.append(f"{nombre} x {cantidad} = ${subtotal:,}")
+        lineas += ["-" * 50, f"TOTAL: ${total:,}", "=" * 50]
+        
+        def escribir():
+            numero = next_id("comprobantes")
+            filename = os.path.join("comprobantes", f"comprobante_{fecha.strftime('%Y%m%d_%H%M%S')}_{numero:06d}.txt")
             os.makedirs("comprobantes", exist_ok=True)
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = os.path.join("comprobantes", f"comprobante_{timestamp}.txt")
-
             with open(filename, "w", encoding="utf-8") as f:
-                f.write("AGROVET PLUS - COMPROBANTE DE VENTA\n")
-                f.write("=" * 50 + "\n")
-                f.write(f"Fecha: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}\n")
-                f.write(f"Cliente: {self.cliente_entry.get()}\n")
-                f.write(f"Forma de pago: {self.pago_var.get()}\n")
-                f.write("-" * 50 + "\n")
-
-                for item in items:
-                    nombre = item['producto'].nombre
-                    cantidad = item['cantidad']
-                    subtotal = item['subtotal']
-                    f.write(f"{nombre} x {cantidad} = ${subtotal:,}\n")
-
-                f.write("-" * 50 + "\n")
-                f.write(f"TOTAL: ${total:,}\n")
-                f.write("=" * 50 + "\n")
-
-            messagebox.showinfo("Comprobante generado", f"🧾 Comprobante guardado en {filename}")
-        except Exception as e:
-            messagebox.showerror("Error", f"⚠️ Error al generar comprobante: {e}")
+                f.write("\n".join(encabezado + [f"Comprobante N.°: {numero:06d}"] + lineas) + "\n")
+            return filename
+        
+        background_executor.submit(
+            self.parent, escribir,
+            on_success=lambda filename: messagebox.showinfo("Comprobante generado", f"🧾 Comprobante guardado en {filename}"),
+            on_error=lambda e: messagebox.showerror("Error", f"⚠️ Error al generar comprobante: {e}"))
 
     def open_purchase_history(self):
         """Abrir ventana del historial de compras por cliente."""
@@ -11,9 +11,12 @@ from .Funcionalidad.historiaClinica import ClinicalHistoryComponent
 from .configuracion import COLOR_PALETTE, FONTS, ICONS
 from .Funcionalidad.dashboard import DashboardComponent
 from .Funcionalidad.Inventario import InventoryComponent
+from .Funcionalidad.reportes import ReportsComponent
 from .Funcionalidad.ventas import SalesComponent
 from .roles import role_manager
 from HU.GestorUsuarios import GestorUsuarios
+from db import close_writer, flush_writes
+from .background import background_executor
 import os
 # Sólo PNG soportado nativamente por tk.PhotoImage
 PIL_AVAILABLE = False
@@ -49,12 +52,16 @@ class AgrovetApplication:
         self.inventory_component.refresh_callback = self.on_inventory_change
         from .Funcionalidad.pedidos import PedidosComponent
         self.orders_component = PedidosComponent(self.root)
+        # Reportes de ventas (resúmenes mantenidos con cada venta)
+        self.reports_component = ReportsComponent(self.root)
         # Gestor de usuarios para administración
         self.user_manager = GestorUsuarios()
         
         # Configurar estilos y crear interfaz
         self.setup_styles()
         self.create_widgets()
+        # Escribir los cambios diferidos pendientes antes de cerrar la ventana
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         
     def setup_window(self):
         """Configurar la ventana principal."""
@@ -231,6 +238,9 @@ class AgrovetApplication:
 
         # Pestaña Productos eliminada
             
+        if accessible_tabs.get('history'):
+            self.create_history_tab()
+            
         if accessible_tabs['user_management']:
             self.create_user_management_tab()
         # Pestaña de Pedidos para roles con permiso 'pedidos'
@@ -274,75 +284,18 @@ class AgrovetApplication:
         info_label.pack(expand=True, pady=50)
     
     def create_history_tab(self):
-        """Crear pestaña de historial."""
-        history_frame = ttk.Frame(self.notebook)
-        self.notebook.add(history_frame, text=f"{ICONS.get('history', '📊')} Historial")
-        
-        # Frame principal
-        main_frame = tk.Frame(history_frame, bg=self.colors['light_gray'])
-        main_frame.pack(fill='both', expand=True, padx=20, pady=20)
-        
-        # Título
-        title_label = tk.Label(main_frame,
-                              text="📊 Historial y Reportes",
-                              font=FONTS['title'],
-                              bg=self.colors['light_gray'],
-                              fg=self.colors['dark_gray'])
-        title_label.pack(pady=(0, 20))
-        
-        # Frame de contenido
-        content_frame = tk.Frame(main_frame, bg=self.colors['white'], relief='raised', bd=2)
-        content_frame.pack(fill='both', expand=True, padx=10, pady=10)
-        
-        # Información
-        info_label = tk.Label(content_frame,
-                             text="📈 Historial de Movimientos y Reportes\n\n"
-                                  "Aquí puede:\n"
-                                  "• Ver historial de transacciones\n"
-                                  "• Generar reportes de ventas\n"
-                                  "• Analizar movimientos de inventario\n"
-                                  "• Exportar datos para análisis\n\n"
-                                  "⚠️ Funcionalidad en desarrollo",
-                             font=FONTS['text'],
-                             bg=self.colors['white'],
-                             fg=self.colors['dark_gray'],
-                             justify='left')
-        info_label.pack(expand=True, pady=50)
+        """Crear pestaña de historial y reportes de ventas."""
+        self.reports_component.create_reports_tab(self.notebook)
     
     def refresh_dashboard(self):
-        """Reconstruir la pestaña Dashboard para reflejar datos actualizados."""
-        if not hasattr(self, 'notebook'):
-            return
+        """Actualizar los valores del Dashboard que hayan cambiado.
 
+        Las métricas se mantienen al día con cada cambio de stock y el
+        dashboard ya se actualiza solo; aquí se fuerza la actualización
+        (por ejemplo, para recalcular los vencimientos al cambiar el día).
+        """
         try:
-            # Pestaña seleccionada en este momento
-            selected_tab_before = self.notebook.select()
-
-            dashboard_idx = None
-            dashboard_selected = False
-
-            # Ubicar pestaña Dashboard
-            for idx, tab_id in enumerate(self.notebook.tabs()):
-                if 'Dashboard' in self.notebook.tab(tab_id, 'text'):
-                    dashboard_idx = idx
-                    dashboard_selected = (tab_id == selected_tab_before)
-                    # Eliminar la pestaña actual del dashboard
-                    self.notebook.forget(tab_id)
-                    break
-
-            # Si existía dashboard, reconstruirlo en la misma posición
-            if dashboard_idx is not None:
-                self.dashboard_component.create_dashboard_tab(self.notebook, index=dashboard_idx)
-
-                # Recuperar pestaña que estaba activa antes, salvo que fuera el propio dashboard
-                if not dashboard_selected:
-                    # El usuario estaba en otra pestaña → mantenerla
-                    if selected_tab_before in self.notebook.tabs():
-                        self.notebook.select(selected_tab_before)
-                else:
-                    # Si el usuario estaba en dashboard, seleccionar la nueva pestaña creada
-                    new_tab_id = self.notebook.tabs()[dashboard_idx]
-                    self.notebook.select(new_tab_id)
+            self.dashboard_component.actualizar()
         except Exception as e:
             print(f"Error al refrescar dashboard: {e}")
 
@@ -357,10 +310,21 @@ class AgrovetApplication:
         except Exception:
             pass
 
+    def on_close(self):
+        """Cerrar la aplicación guardando los cambios diferidos pendientes."""
+        try:
+            # Terminar los guardados en segundo plano antes de los diferidos
+            background_executor.shutdown(wait=True)
+            close_writer()
+        finally:
+            self.root.destroy()
+
     def go_back(self):
         """Cerrar la interfaz actual y volver a la selección de rol."""
         try:
-            # Cerrar ventana actual
+            # Guardar cambios en curso y diferidos y cerrar ventana actual
+            background_executor.shutdown(wait=True)
+            flush_writes()
             self.root.destroy()
             # Volver a lanzar la selección de rol
             from .app import main as app_main  # import interno para evitar dependencias circulares
@@ -0,0 +1,160 @@
+"""
+Background executor for disk I/O and heavy queries in the AgroVet Plus GUI.
+"""
+
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from tkinter import TclError, messagebox
+
+
+class BackgroundExecutor:
+    """Servicio compartido para ejecutar trabajos fuera del hilo de Tk.
+
+    Los componentes envían con ``submit`` los trabajos de persistencia
+    (cargar, guardar, escribir comprobantes) y las consultas pesadas. El
+    trabajo corre en un hilo del pool; su resultado o su excepción vuelve al
+    hilo principal (sondeando una cola con ``after``), donde se llaman
+    ``on_success`` u ``on_error``. Mientras tanto la ventana muestra el cursor
+    de espera y los widgets indicados en ``busy`` quedan deshabilitados.
+
+    Los trabajos con la misma clave ``serial`` (por ejemplo, los guardados de
+    un mismo archivo) se ejecutan uno tras otro, en el orden de envío.
+    """
+
+    POLL_MS = 30
+
+    def __init__(self, max_workers=4):
+        self.max_workers = max_workers
+        self._pool = None
+        self._seriales = {}  # clave -> ejecutor de un solo hilo
+        self._resultados = queue.Queue()
+        self._pendientes = 0
+        self._raiz = None
+        self._sondeando = False
+        self._ocupadas = {}  # ventana -> trabajos en curso
+
+    def _ejecutor(self, serial):
+        if serial is not None:
+            if serial not in self._seriales:
+                self._seriales[serial] = ThreadPoolExecutor(1, thread_name_prefix=f"agrovet-{serial}")
+            return self._seriales[serial]
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(self.max_workers, thread_name_prefix="agrovet-io")
+        return self._pool
+
+    def submit(self, widget, trabajo, *args, on_success=None, on_error=None, busy=(), serial=None):
+        """Ejecutar ``trabajo(*args)`` en segundo plano (llamar desde el hilo de Tk).
+
+        Args:
+            widget: Widget que origina el trabajo (su ventana muestra el cursor de espera).
+            on_success: Se llama en el hilo principal con el resultado.
+            on_error: Se llama en el hilo principal con la excepción; por
+                defecto se muestra un mensaje de error.
+            busy: Widget o lista de widgets a deshabilitar mientras tanto.
+            serial: Clave para ejecutar en orden los trabajos sobre un mismo recurso.
+        """
+        if not isinstance(busy, (list, tuple)):
+            busy = [busy]
+        raiz = widget.nametowidget('.')
+        if raiz is not self._raiz:
+            # Nueva raíz de Tk (p. ej. al volver a la selección de rol): el sondeo anterior murió con ella
+            self._raiz = raiz
+            self._sondeando = False
+        ventana = widget.winfo_toplevel()
+        estados = self._ocupar(ventana, busy)
+        self._pendientes += 1
+        resultados = self._resultados  # Un trabajo que termine tras ``shutdown`` no llega a la cola nueva
+
+        def ejecutar():
+            try:
+                resultado, error = trabajo(*args), None
+            except Exception as e:
+                resultado, error = None, e
+            resultados.put((ventana, busy, estados, on_success, on_error, resultado, error))
+
+        future = self._ejecutor(serial).submit(ejecutar)
+        if not self._sondeando:
+            self._sondeando = True
+            self._raiz.after(self.POLL_MS, self._procesar)
+        return future
+
+    def _procesar(self):
+        """Entregar en el hilo principal los resultados de los trabajos terminados."""
+        while True:
+            try:
+                ventana, busy, estados, on_success, on_error, resultado, error = self._resultados.get_nowait()
+            except queue.Empty:
+                break
+            self._pendientes -= 1
+            self._liberar(ventana, busy, estados)
+            try:
+                if error is None:
+                    if on_success:
+                        on_success(resultado)
+                elif on_error:
+                    on_error(error)
+                else:
+                    messagebox.showerror("Error", f"⚠️ {error}")
+            except Exception as e:
+                # Un callback fallido (p. ej. ventana ya cerrada) no debe detener el sondeo
+                print(f"Error en callback de tarea en segundo plano: {e}")
+        try:
+            if self._pendientes:
+                self._raiz.after(self.POLL_MS, self._procesar)
+                return
+        except TclError:
+            pass  # La aplicación se cerró
+        self._sondeando = False
+
+    # ---------- Indicadores de ocupado ----------
+    def _ocupar(self, ventana, widgets):
+        self._ocupadas[ventana] = self._ocupadas.get(ventana, 0) + 1
+        estados = []
+        try:
+            ventana.config(cursor='watch')
+        except TclError:
+            pass
+        for widget in widgets:
+            try:
+                estados.append(widget.cget('state'))
+                widget.config(state='disabled')
+            except TclError:
+                estados.append(None)
+        return estados
+
+    def _liberar(self, ventana, widgets, estados):
+        restantes = self._ocupadas.get(ventana, 1) - 1
+        try:
+            if restantes <= 0:
+                self._ocupadas.pop(ventana, None)
+                if ventana.winfo_exists():
+                    ventana.config(cursor='')
+            else:
+                self._ocupadas[ventana] = restantes
+            for widget, estado in zip(widgets, estados):
+                if estado is not None and widget.winfo_exists():
+                    widget.config(state=estado)
+        except TclError:
+            pass  # Ventana ya destruida
+
+    def shutdown(self, wait=True):
+        """Esperar (o no) los trabajos en curso, detener los hilos y olvidar la raíz de Tk.
+
+        Los resultados que aún no se entregaron se descartan: sus ventanas se
+        destruyen junto con la raíz. El ejecutor queda listo para usarse con
+        una nueva raíz.
+        """
+        for ejecutor in [self._pool, *self._seriales.values()]:
+            if ejecutor is not None:
+                ejecutor.shutdown(wait=wait)
+        self._pool = None
+        self._seriales = {}
+        self._resultados = queue.Queue()
+        self._pendientes = 0
+        self._raiz = None
+        self._sondeando = False
+        self._ocupadas = {}
+
+
+# Instancia compartida por todos los componentes
+background_executor = BackgroundExecutor()
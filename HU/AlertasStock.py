@@ -3,46 +3,121 @@ HU13: Ver alertas de stock bajo
 Gestión de alertas de inventario
 """
 
-import json
 from datetime import datetime
-from pathlib import Path
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
 
+from db import get_repository, schedule_save
 from .Inventario import Inventario, Producto
+from .MarcaTiempo import a_iso, ahora
 
 UMBRAL_DEFECTO = 5
-RUTA_UMBRAL_JSON = Path("db/stock_thresholds.json")
-RUTA_ALERTAS_JSON = Path("db/stock_alerts.json")
 
 
-def _cargar_json(ruta: Path, defecto):
+def _cargar_documento(clave: str, defecto):
     try:
-        if ruta.exists():
-            with open(ruta, "r", encoding="utf-8") as f:
-                return json.load(f)
+        return get_repository(clave).load_document(defecto)
     except Exception:
-        pass
-    return defecto
+        return defecto
 
 
-def _guardar_json(ruta: Path, data):
+def _guardar_documento(clave: str, data):
     try:
-        ruta.parent.mkdir(parents=True, exist_ok=True)
-        with open(ruta, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=4, ensure_ascii=False)
+        get_repository(clave).save_document(data)
     except Exception:
         pass
 
 
 class AlertasStockManager:
-    """Lógica de negocio para alertas de stock bajo (HU13)."""
+    """Lógica de negocio para alertas de stock bajo (HU13).
+
+    Mantiene por eventos el conjunto de productos bajo su umbral: cada cambio
+    de stock (``Producto.set_cantidad``, que usan ventas, anulaciones,
+    recepción de pedidos y ajustes) llega por ``Producto.suscribir`` y solo
+    se evalúa ese producto. Al cruzar el umbral hacia abajo se registra el
+    momento del cruce; ``stock_alerts`` se guarda solo cuando el conjunto
+    cambia.
+    """
 
     def __init__(self, inventario: Inventario):
         self.inventario = inventario
         # Cargar umbrales por producto {codigo: umbral}
-        self.umbrales: Dict[str, int] = _cargar_json(RUTA_UMBRAL_JSON, {})
-        # Cargar últimos productos alertados para generar notificaciones
-        self.ultimo_alertado: List[str] = _cargar_json(RUTA_ALERTAS_JSON, [])
+        self.umbrales: Dict[str, int] = _cargar_documento("stock_thresholds", {})
+        # Alertas vigentes {codigo: {'desde': fecha ISO del cruce, 'notificada': bool}}
+        self.alertas: Dict[str, Dict] = self._normalizar_alertas(_cargar_documento("stock_alerts", {}))
+        # (generación de índices del inventario, productos ya evaluados, último evaluado)
+        self._marca: Tuple[int, int, Optional[Producto]] = (-1, 0, None)
+        self.inventario.columnas.configurar_umbrales(self.umbrales, UMBRAL_DEFECTO)
+        self._reconciliar()
+        Producto.suscribir(self)
+
+    @staticmethod
+    def _normalizar_alertas(data) -> Dict[str, Dict]:
+        """Adaptar el formato anterior (lista de códigos ya alertados, sin fecha de cruce)."""
+        if isinstance(data, list):
+            return {str(codigo): {"desde": None, "notificada": True} for codigo in data}
+        return {str(codigo): dict(alerta) for codigo, alerta in data.items()}
+
+    # ---------------- Seguimiento por eventos -----------------
+    def producto_modificado(self, producto: Producto):
+        """Notificación de ``Producto``: reevaluar solo el producto que cambió."""
+        if self.inventario.buscar_por_codigo(producto.get_codigo()) is not producto:
+            return
+        if self._evaluar(producto):
+            self._guardar_alertas()
+
+    def _evaluar(self, producto: Producto) -> bool:
+        """Actualizar la alerta de un producto. Retorna True si entró o salió del conjunto."""
+        codigo = str(producto.get_codigo())
+        bajo = producto.get_cantidad() < self.obtener_umbral(codigo)
+        if bajo == (codigo in self.alertas):
+            return False
+        if bajo:
+            self.alertas[codigo] = {"desde": a_iso(ahora()), "notificada": False}
+        else:
+            del self.alertas[codigo]
+        return True
+
+    def _reconciliar(self):
+        """Recalcular el conjunto completo desde la vista columnar (al iniciar o si el inventario se rehízo)."""
+        productos = self.inventario.productos
+        vigentes = {str(p.get_codigo()) for p in self.inventario.columnas.bajo_umbral()}
+        momento = a_iso(ahora())
+        cambio = False
+        for codigo in list(self.alertas):
+            if codigo not in vigentes:
+                del self.alertas[codigo]
+                cambio = True
+        for codigo in vigentes:
+            if codigo not in self.alertas:
+                self.alertas[codigo] = {"desde": momento, "notificada": False}
+                cambio = True
+        self._marca = (self.inventario.generacion, len(productos), productos[-1] if productos else None)
+        if cambio:
+            self._guardar_alertas()
+
+    def _sincronizar(self):
+        """Evaluar los productos agregados al inventario desde la última consulta.
+
+        Las altas no pasan por ``set_cantidad``: basta con revisar los productos
+        nuevos al final de la lista. Si el inventario se recargó (durante la
+        recarga los cambios de stock no se pueden asociar a él) se reconcilia
+        todo.
+        """
+        productos = self.inventario.productos
+        generacion, vistos, ultimo = self._marca
+        if generacion != self.inventario.generacion or len(productos) < vistos or \
+                (vistos and productos[vistos - 1] is not ultimo):
+            self._reconciliar()
+            return
+        cambio = False
+        for producto in productos[vistos:]:
+            cambio = self._evaluar(producto) or cambio
+        self._marca = (generacion, len(productos), productos[-1] if productos else None)
+        if cambio:
+            self._guardar_alertas()
+
+    def _guardar_alertas(self):
+        schedule_save("stock_alerts", lambda: _guardar_documento("stock_alerts", dict(self.alertas)))
 
     # ---------------- Funcionalidades principales -----------------
     def obtener_umbral(self, codigo_producto: int) -> int:
@@ -54,26 +129,32 @@ class AlertasStockManager:
         if nuevo_umbral < 0:
             raise ValueError("El umbral no puede ser negativo")
         self.umbrales[str(codigo_producto)] = int(nuevo_umbral)
-        _guardar_json(RUTA_UMBRAL_JSON, self.umbrales)
+        self.inventario.columnas.establecer_umbral(codigo_producto, nuevo_umbral)
+        _guardar_documento("stock_thresholds", self.umbrales)
+        producto = self.inventario.buscar_por_codigo(codigo_producto)
+        if producto is not None and self._evaluar(producto):
+            self._guardar_alertas()
 
     def listar_productos_bajo_stock(self) -> List[Producto]:
         """Listar todos los productos cuyo stock está por debajo de su umbral."""
-        productos_bajos = []
-        for producto in self.inventario.productos:
-            if producto.get_cantidad() < self.obtener_umbral(producto.get_codigo()):
-                productos_bajos.append(producto)
-        return productos_bajos
+        self._sincronizar()
+        productos = (self.inventario.buscar_por_codigo(codigo) for codigo in self.alertas)
+        return sorted((p for p in productos if p is not None), key=lambda p: int(p.get_codigo()))
+
+    def listar_productos_por_vencer(self, dias: int = 30) -> List[Tuple[Producto, int]]:
+        """Productos vencidos o que vencen en los próximos ``dias`` días, como (producto, días restantes)."""
+        return self.inventario.vencidos() + self.inventario.proximos_a_vencer(dias)
 
     def detectar_nuevas_alertas(self) -> Tuple[List[Producto], List[Producto]]:
-        """Detectar nuevos productos que acaban de caer por debajo del umbral.
+        """Detectar los productos que cruzaron el umbral desde la última notificación.
         Retorna (nuevos_alertas, vigentes).
         """
         vigentes = self.listar_productos_bajo_stock()
-        codigos_vigentes = {str(p.get_codigo()) for p in vigentes}
-        nuevos = [p for p in vigentes if str(p.get_codigo()) not in self.ultimo_alertado]
-        # Actualizar registro
-        self.ultimo_alertado = list(codigos_vigentes)
-        _guardar_json(RUTA_ALERTAS_JSON, self.ultimo_alertado)
+        nuevos = [p for p in vigentes if not self.alertas[str(p.get_codigo())]["notificada"]]
+        if nuevos:
+            for p in nuevos:
+                self.alertas[str(p.get_codigo())]["notificada"] = True
+            self._guardar_alertas()
         return nuevos, vigentes
 
     # ---------------- Utilidades -----------------
@@ -85,6 +166,7 @@ class AlertasStockManager:
                 "codigo": p.get_codigo(),
                 "nombre": p.get_nombre(),
                 "stock": p.get_cantidad(),
-                "umbral": self.obtener_umbral(p.get_codigo())
+                "umbral": self.obtener_umbral(p.get_codigo()),
+                "desde": self.alertas[str(p.get_codigo())]["desde"]
             })
-        return alertas 
\ No newline at end of file
+        return alertas
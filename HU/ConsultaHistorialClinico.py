@@ -5,11 +5,15 @@ Solo contiene lógica de negocio, sin interfaz gráfica.
 """
 
 import json
+import time
 from datetime import datetime
 from typing import List, Dict, Any, Optional, Tuple
 
 from db import get_db_path
 from .HistoriaClinica import HistoriaClinica
+from .IndiceBusqueda import normalizar_texto
+from .MarcaTiempo import a_marca, ahora
+from .ReglasRecomendacion import MotorReglas
 from .Venta import Venta
 
 
@@ -19,7 +23,73 @@ class ConsultaHistorialClinico:
     def __init__(self):
         self.historiales_clinicos = []
         self.compras_cliente = []
+        # Índice cliente normalizado -> {'nombre', 'historiales', 'ventas'}
+        self._clientes: Dict[str, Dict[str, Any]] = {}
+        self._clientes_ordenados: Optional[List[str]] = None
+        # Por lista global: (elementos ya indexados, último elemento indexado)
+        self._marcas: Dict[str, Tuple[int, Any]] = {}
+        # Cambia cada vez que el índice gana o pierde clientes
+        self._version_indice = 0
+        # Última búsqueda: (versión del índice, término, claves coincidentes en orden)
+        self._ultima_busqueda: Optional[Tuple[int, str, List[str]]] = None
+        self.estadisticas_busqueda = {'consultas': 0, 'refinadas': 0,
+                                      'ultima_ms': 0.0, 'promedio_ms': 0.0, 'total_ms': 0.0}
         self.cargar_datos_sistema()
+        self._reconstruir_indice()
+        self.motor_reglas = MotorReglas.cargar()
+        
+    # ---------- Índice de clientes ----------
+    def _fuentes(self):
+        return (("historiales", HistoriaClinica.historiales, HistoriaClinica.get_nombre_cliente),
+                ("ventas", Venta.ventas, lambda venta: venta.cliente))
+    
+    def _reconstruir_indice(self):
+        """Construir el índice de clientes desde cero."""
+        self._clientes = {}
+        self._clientes_ordenados = None
+        self._version_indice += 1
+        self._marcas = {fuente: (0, None) for fuente, _, _ in self._fuentes()}
+        self._sincronizar_indice()
+    
+    def _sincronizar_indice(self):
+        """Indexar los historiales y ventas agregados desde la última consulta.
+        
+        Las listas globales solo crecen por el final durante la sesión (nuevos
+        historiales, ventas), así que basta con indexar lo nuevo. Si cambiaron
+        de otra forma (recarga, anulación) el índice se reconstruye.
+        """
+        for fuente, lista, _ in self._fuentes():
+            vistos, ultimo = self._marcas[fuente]
+            if len(lista) < vistos or (vistos and lista[vistos - 1] is not ultimo):
+                self._reconstruir_indice()
+                return
+        for fuente, lista, nombre_de in self._fuentes():
+            vistos, _ = self._marcas[fuente]
+            for elemento in lista[vistos:]:
+                nombre = nombre_de(elemento)
+                clave = normalizar_texto(nombre)
+                entrada = self._clientes.get(clave)
+                if entrada is None:
+                    entrada = self._clientes[clave] = {'nombre': nombre, 'historiales': [], 'ventas': []}
+                    self._clientes_ordenados = None
+                    self._version_indice += 1
+                entrada[fuente].append(elemento)
+            if len(lista) > vistos:
+                self._marcas[fuente] = (len(lista), lista[-1])
+    
+    def _entrada_cliente(self, nombre_cliente: str) -> Optional[Dict[str, Any]]:
+        """Entrada del índice de un cliente, verificando que siga vigente."""
+        self._sincronizar_indice()
+        clave = normalizar_texto(nombre_cliente)
+        entrada = self._clientes.get(clave)
+        if entrada is not None:
+            vigente = (all(normalizar_texto(h.get_nombre_cliente()) == clave for h in entrada['historiales'])
+                       and all(normalizar_texto(v.cliente) == clave for v in entrada['ventas']))
+            if not vigente:
+                # Se editó el nombre de un cliente en una venta o historial
+                self._reconstruir_indice()
+                entrada = self._clientes.get(clave)
+        return entrada
         
     def cargar_datos_sistema(self):
         """Cargar todos los datos del sistema."""
@@ -34,67 +104,63 @@ class ConsultaHistorialClinico:
             raise Exception(f"Error al cargar datos del sistema: {str(e)}")
             
     def obtener_lista_clientes(self) -> List[str]:
-        """Obtener lista única de todos los clientes del sistema."""
+        """Obtener lista única de todos los clientes del sistema (sin distinguir mayúsculas ni tildes)."""
         try:
-            clientes = set()
-            
-            # Clientes de historiales clínicos
-            for historial in HistoriaClinica.historiales:
-                clientes.add(historial.get_nombre_cliente())
-            
-            # Clientes de ventas
-            for venta in Venta.ventas:
-                clientes.add(venta.cliente)
-            
-            return sorted(list(clientes))
+            self._sincronizar_indice()
+            if self._clientes_ordenados is None:
+                self._clientes_ordenados = sorted(e['nombre'] for e in self._clientes.values())
+            return list(self._clientes_ordenados)
             
         except Exception as e:
             raise Exception(f"Error al obtener lista de clientes: {str(e)}")
             
     def buscar_clientes_por_termino(self, termino: str) -> List[str]:
-        """Buscar clientes que coincidan con el término de búsqueda."""
+        """Buscar clientes que coincidan con el término de búsqueda.
+        
+        Si el término amplía el de la búsqueda anterior (el usuario sigue
+        escribiendo) y el índice no cambió, solo se revisan las coincidencias
+        previas. La cantidad de consultas y su duración quedan en
+        ``estadisticas_busqueda``.
+        """
         try:
-            termino_lower = termino.lower()
-            clientes_filtrados = []
-            
-            # Filtrar de historiales clínicos
-            for historial in HistoriaClinica.historiales:
-                nombre = historial.get_nombre_cliente().lower()
-                if termino_lower in nombre:
-                    clientes_filtrados.append(historial.get_nombre_cliente())
-            
-            # Filtrar de ventas
-            for venta in Venta.ventas:
-                nombre = venta.cliente.lower()
-                if termino_lower in nombre:
-                    clientes_filtrados.append(venta.cliente)
-            
-            # Eliminar duplicados y ordenar
-            return sorted(list(set(clientes_filtrados)))
+            inicio = time.perf_counter()
+            termino_normalizado = normalizar_texto(termino)
+            self._sincronizar_indice()
+            ultima = self._ultima_busqueda
+            if ultima and ultima[0] == self._version_indice and ultima[1] in termino_normalizado:
+                # Las claves previas ya están ordenadas por nombre; filtrar conserva el orden
+                claves = [clave for clave in ultima[2] if termino_normalizado in clave]
+                self.estadisticas_busqueda['refinadas'] += 1
+            else:
+                # Se recorren los clientes distintos, no todos los historiales y ventas
+                claves = sorted((clave for clave in self._clientes if termino_normalizado in clave),
+                                key=lambda clave: self._clientes[clave]['nombre'])
+            self._ultima_busqueda = (self._version_indice, termino_normalizado, claves)
+            resultado = [self._clientes[clave]['nombre'] for clave in claves]
+            self._registrar_busqueda(time.perf_counter() - inicio)
+            return resultado
             
         except Exception as e:
             raise Exception(f"Error al buscar clientes: {str(e)}")
             
+    def _registrar_busqueda(self, segundos: float):
+        """Acumular la duración de una búsqueda en ``estadisticas_busqueda``."""
+        estadisticas = self.estadisticas_busqueda
+        estadisticas['consultas'] += 1
+        estadisticas['ultima_ms'] = segundos * 1000
+        estadisticas['total_ms'] += segundos * 1000
+        estadisticas['promedio_ms'] = estadisticas['total_ms'] / estadisticas['consultas']
+            
     def obtener_historial_completo_cliente(self, nombre_cliente: str) -> Tuple[List, List]:
         """
         Obtener historial completo del cliente.
         Retorna tupla (historiales_clinicos, compras_cliente)
         """
         try:
-            historiales_cliente = []
-            compras_cliente = []
-            
-            # Buscar historiales clínicos
-            for historial in HistoriaClinica.historiales:
-                if historial.get_nombre_cliente().lower() == nombre_cliente.lower():
-                    historiales_cliente.append(historial)
-            
-            # Buscar compras
-            for venta in Venta.ventas:
-                if venta.cliente.lower() == nombre_cliente.lower():
-                    compras_cliente.append(venta)
-            
-            return historiales_cliente, compras_cliente
+            entrada = self._entrada_cliente(nombre_cliente)
+            if entrada is None:
+                return [], []
+            return list(entrada['historiales']), list(entrada['ventas'])
             
         except Exception as e:
             raise Exception(f"Error al obtener historial del cliente: {str(e)}")
@@ -106,6 +172,8 @@ class ConsultaHistorialClinico:
         for historial in historiales_cliente:
             for registro in historial.get_registros():
                 consulta = {
+                    'id': registro.get('id'),
+                    'marca': HistoriaClinica.marca_registro(registro),
                     'fecha_completa': f"{registro['fecha']} {registro['hora']}",
                     'fecha': registro['fecha'],
                     'hora': registro['hora'],
@@ -116,11 +184,8 @@ class ConsultaHistorialClinico:
                 }
                 consultas.append(consulta)
                 
-        # Ordenar por fecha (más reciente primero)
-        try:
-            consultas.sort(key=lambda x: datetime.strptime(x['fecha'], "%d/%m/%Y"), reverse=True)
-        except:
-            pass  # Si hay error en formato de fecha, mantener orden original
+        # Ordenar por fecha (más reciente primero) comparando marcas enteras
+        consultas.sort(key=lambda x: x['marca'], reverse=True)
             
         return consultas
         
@@ -134,6 +199,7 @@ class ConsultaHistorialClinico:
                                      for p in venta_dict['productos']])
             
             compra = {
+                'id': venta.id,
                 'fecha': venta.fecha_venta.strftime("%d/%m/%Y %H:%M"),
                 'fecha_obj': venta.fecha_venta,
                 'productos': productos_str,
@@ -173,63 +239,33 @@ class ConsultaHistorialClinico:
             }
             
     def generar_recomendaciones_inteligentes(self, historiales_cliente: List, compras_cliente: List) -> List[str]:
-        """Generar recomendaciones personalizadas basadas en el historial."""
+        """Generar recomendaciones personalizadas basadas en el historial.
+        
+        Las recomendaciones por diagnósticos y productos salen de las reglas
+        de ``motor_reglas``, que solo procesa lo nuevo desde la consulta
+        anterior del mismo cliente.
+        """
         recomendaciones = []
         
         try:
-            # Análisis de diagnósticos frecuentes
-            diagnosticos = []
-            for historial in historiales_cliente:
-                for registro in historial.get_registros():
-                    diagnosticos.append(registro['diagnostico'].lower())
-            
-            # Análisis de productos comprados
-            productos_comprados = []
-            for venta in compras_cliente:
-                for producto in venta.to_dict()['productos']:
-                    productos_comprados.append(producto['nombre'].lower())
-            
-            # Generar recomendaciones inteligentes
-            texto_diagnosticos = ' '.join(diagnosticos)
-            texto_productos = ' '.join(productos_comprados)
-            
-            # Recomendaciones basadas en diagnósticos
-            if 'desparasit' in texto_diagnosticos:
-                recomendaciones.append("Mantener esquema regular de desparasitación cada 3-6 meses")
-            
-            if 'vacun' in texto_diagnosticos or 'inmuniz' in texto_diagnosticos:
-                recomendaciones.append("Verificar calendario de vacunación y mantener al día")
-            
-            if 'dental' in texto_diagnosticos or 'diente' in texto_diagnosticos:
-                recomendaciones.append("Implementar rutina de higiene dental regular")
-            
-            # Recomendaciones basadas en productos
-            if 'vitamina' in texto_productos or 'suplemento' in texto_productos:
-                recomendaciones.append("Continuar con suplementación vitamínica según indicaciones")
-            
-            if 'alimento' in texto_productos or 'comida' in texto_productos:
-                recomendaciones.append("Mantener alimentación balanceada y de calidad")
+            # Recomendaciones por palabras clave en diagnósticos y productos comprados
+            nombre = (historiales_cliente[0].get_nombre_cliente() if historiales_cliente
+                      else compras_cliente[0].cliente if compras_cliente else None)
+            if nombre is not None:
+                clave = normalizar_texto(nombre)
+                recomendaciones.extend(self.motor_reglas.evaluar(clave, historiales_cliente, compras_cliente))
             
             # Recomendaciones temporales
             if historiales_cliente:
-                try:
-                    # Buscar última consulta
-                    ultima_fecha = None
-                    for historial in historiales_cliente:
-                        for registro in historial.get_registros():
-                            fecha_registro = datetime.strptime(registro['fecha'], "%d/%m/%Y")
-                            if ultima_fecha is None or fecha_registro > ultima_fecha:
-                                ultima_fecha = fecha_registro
-                    
-                    if ultima_fecha:
-                        dias_desde_ultima = (datetime.now() - ultima_fecha).days
-                        if dias_desde_ultima > 365:
-                            recomendaciones.append("Programar chequeo general - más de un año desde última consulta")
-                        elif dias_desde_ultima > 180:
-                            recomendaciones.append("Considerar chequeo preventivo")
-                            
-                except:
-                    pass
+                # Última consulta, llevada por el motor al procesar los registros (0 = fecha ilegible)
+                ultima_marca = self.motor_reglas.ultima_marca(clave)
+                
+                if ultima_marca:
+                    dias_desde_ultima = (a_marca(ahora()) - ultima_marca) // 86400
+                    if dias_desde_ultima > 365:
+                        recomendaciones.append("Programar chequeo general - más de un año desde última consulta")
+                    elif dias_desde_ultima > 180:
+                        recomendaciones.append("Considerar chequeo preventivo")
             
             # Recomendaciones generales si no hay específicas
             if not recomendaciones:
@@ -244,6 +280,16 @@ class ConsultaHistorialClinico:
         except Exception as e:
             return ["Mantener visitas regulares para chequeos preventivos"]
             
+    def recomendaciones_por_cliente(self) -> Dict[str, List[str]]:
+        """Evaluar las reglas de recomendación para todos los clientes.
+        
+        Retorna ``{nombre del cliente: recomendaciones}`` solo con las
+        recomendaciones por palabras clave (sin las de fechas ni las generales).
+        """
+        self._sincronizar_indice()
+        return {entrada['nombre']: self.motor_reglas.evaluar(clave, entrada['historiales'], entrada['ventas'])
+                for clave, entrada in self._clientes.items()}
+            
     def validar_acceso_veterinario(self, rol_usuario: Dict) -> bool:
         """Validar que el usuario tenga permisos para consultar historial clínico."""
         try:
@@ -263,55 +309,55 @@ class ConsultaHistorialClinico:
         except Exception:
             return False
             
-    def buscar_detalle_consulta_especifica(self, fecha: str, mascota: str, diagnostico: str) -> Optional[Dict]:
-        """Buscar detalle específico de una consulta."""
+    def buscar_detalle_consulta_especifica(self, id_registro: int) -> Optional[Dict]:
+        """Buscar detalle específico de una consulta por el id de su registro."""
         try:
-            for historial in HistoriaClinica.historiales:
-                if historial.get_nombre_mascota() == mascota:
-                    for registro in historial.get_registros():
-                        if (registro['fecha'] == fecha and 
-                            registro['diagnostico'] == diagnostico):
-                            return {
-                                'cliente': historial.get_nombre_cliente(),
-                                'mascota': historial.get_nombre_mascota(),
-                                'especie': historial.get_especie(),
-                                'raza': historial.get_raza(),
-                                'edad': historial.get_edad(),
-                                'genero': historial.get_genero(),
-                                'fecha': registro['fecha'],
-                                'hora': registro['hora'],
-                                'diagnostico': registro['diagnostico'],
-                                'tratamiento': registro['tratamiento']
-                            }
-            return None
+            encontrado = HistoriaClinica.buscar_registro(int(id_registro))
+            if encontrado is None:
+                return None
+            historial, registro = encontrado
+            return {
+                'id': registro['id'],
+                'id_cliente': historial.get_id_cliente(),
+                'cliente': historial.get_nombre_cliente(),
+                'mascota': historial.get_nombre_mascota(),
+                'especie': historial.get_especie(),
+                'raza': historial.get_raza(),
+                'edad': historial.get_edad(),
+                'genero': historial.get_genero(),
+                'fecha': registro['fecha'],
+                'hora': registro['hora'],
+                'diagnostico': registro['diagnostico'],
+                'tratamiento': registro['tratamiento'],
+                'comentarios': registro.get('comentarios', '')
+            }
             
         except Exception as e:
             return None
             
-    def buscar_detalle_compra_especifica(self, fecha: str, cliente: str) -> Optional[Dict]:
-        """Buscar detalle específico de una compra."""
+    def buscar_detalle_compra_especifica(self, id_venta: int) -> Optional[Dict]:
+        """Buscar detalle específico de una compra por su id."""
         try:
-            for venta in Venta.ventas:
-                fecha_venta_str = venta.fecha_venta.strftime("%d/%m/%Y %H:%M")
-                if fecha_venta_str == fecha and venta.cliente == cliente:
-                    venta_dict = venta.to_dict()
-                    return {
-                        'cliente': venta.cliente,
-                        'fecha': fecha_venta_str,
-                        'productos': venta_dict['productos'],
-                        'total': venta.total(),
-                        'forma_pago': venta.forma_pago,
-                        'descuento': venta_dict.get('descuento', 0)
-                    }
-            return None
+            venta = Venta.por_id(int(id_venta))
+            if venta is None:
+                return None
+            venta_dict = venta.to_dict()
+            return {
+                'id': venta.id,
+                'cliente': venta.cliente,
+                'fecha': venta.fecha_venta.strftime("%d/%m/%Y %H:%M"),
+                'productos': venta_dict['productos'],
+                'total': venta.total(),
+                'forma_pago': venta.forma_pago,
+                'descuento': venta_dict.get('descuento', 0)
+            }
             
         except Exception as e:
             return None
             
     def verificar_cliente_existe(self, nombre_cliente: str) -> bool:
         """Verificar si existe un cliente en el sistema."""
-        clientes = self.obtener_lista_clientes()
-        return nombre_cliente in clientes
+        return self._entrada_cliente(nombre_cliente) is not None
         
     def generar_resumen_textual(self, nombre_cliente: str, estadisticas: Dict, recomendaciones: List[str]) -> str:
         """Generar resumen textual integrado del cliente."""
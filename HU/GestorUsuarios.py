@@ -1,11 +1,13 @@
 """
 Módulo para gestionar usuarios y sus roles.
 """
-import json
-from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional
+
+from db import get_repository, JsonRepository, SCHEMAS
 
 class Usuario:
+    __slots__ = ("username", "nombre", "rol_id")
+
     def __init__(self, username: str, nombre: str, rol_id: str):
         self.username = username
         self.nombre = nombre
@@ -19,27 +21,28 @@ class Usuario:
         }
 
 class GestorUsuarios:
-    def __init__(self, archivo_usuarios: str = "db/usuarios.json"):
-        from pathlib import Path
-        self.archivo = Path(archivo_usuarios)
-        self.archivo.parent.mkdir(parents=True, exist_ok=True)
+    def __init__(self, archivo_usuarios: Optional[str] = None):
+        self.archivo = archivo_usuarios
+        if archivo_usuarios:
+            self.repositorio = JsonRepository(archivo_usuarios, SCHEMAS["usuarios"])
+        else:
+            self.repositorio = get_repository("usuarios")
         self.usuarios: List[Usuario] = []
         self._cargar_usuarios()
 
     def _cargar_usuarios(self):
-        if not self.archivo.exists():
-            return
         try:
-            with open(self.archivo, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            for u in data:
+            for u in self.repositorio.load_all():
                 self.usuarios.append(Usuario(u.get("username"), u.get("nombre"), u.get("rol_id")))
         except Exception:
             self.usuarios.clear()
 
     def _guardar_usuarios(self):
-        with open(self.archivo, "w", encoding="utf-8") as f:
-            json.dump([u.to_dict() for u in self.usuarios], f, indent=4, ensure_ascii=False)
+        self.repositorio.save_all([u.to_dict() for u in self.usuarios])
+
+    def _guardar_usuario(self, usuario: "Usuario"):
+        """Persistir solo la fila del usuario indicado."""
+        self.repositorio.upsert(usuario.to_dict())
 
     def listar_usuarios(self) -> List[Usuario]:
         return self.usuarios
@@ -49,7 +52,7 @@ class GestorUsuarios:
             raise ValueError("El usuario ya existe")
         usuario = Usuario(username, nombre, rol_id)
         self.usuarios.append(usuario)
-        self._guardar_usuarios()
+        self._guardar_usuario(usuario)
         return usuario
 
     def actualizar_rol(self, username: str, nuevo_rol_id: str) -> Usuario:
@@ -57,7 +60,7 @@ class GestorUsuarios:
         if not usuario:
             raise ValueError("Usuario no encontrado")
         usuario.rol_id = nuevo_rol_id
-        self._guardar_usuarios()
+        self._guardar_usuario(usuario)
         return usuario
     
     def actualizar_nombre(self, username: str, nuevo_nombre: str) -> Usuario:
@@ -66,7 +69,7 @@ class GestorUsuarios:
         if not usuario:
             raise ValueError("Usuario no encontrado")
         usuario.nombre = nuevo_nombre
-        self._guardar_usuarios()
+        self._guardar_usuario(usuario)
         return usuario
 
     def eliminar_usuario(self, username: str) -> None:
@@ -75,4 +78,4 @@ class GestorUsuarios:
         if not usuario:
             raise ValueError("Usuario no encontrado")
         self.usuarios.remove(usuario)
-        self._guardar_usuarios()
+        self.repositorio.delete(username)
@@ -1,15 +1,101 @@
 # HU/HistoriaClinica.py
 import json
-from datetime import datetime
-from pathlib import Path
+
+from db import get_repository, next_id, schedule_save, JsonRepository
+from .IndiceBusqueda import normalizar_texto
+from .MarcaTiempo import CLAVE_CACHE, a_iso, a_marca, ahora, desde_marca, marca_de
+
+
+class RegistroClinico:
+    """Registro de una consulta (diagnóstico y tratamiento) de un historial clínico.
+
+    Objeto compacto (``__slots__``) que conserva el acceso tipo diccionario de
+    los registros anteriores: ``registro['fecha']``, ``get``, ``items``. Los
+    campos ausentes en los datos originales siguen ausentes al guardar, y los
+    campos desconocidos se conservan tal cual.
+    """
+
+    CAMPOS = ("id", "fecha", "hora", "fecha_iso", "diagnostico", "tratamiento", "comentarios")
+    __slots__ = CAMPOS + (CLAVE_CACHE, "_extra")
+
+    def __init__(self, **campos):
+        self._extra = None
+        for clave, valor in campos.items():
+            self[clave] = valor
+
+    @classmethod
+    def desde_dict(cls, data):
+        return cls(**data)
+
+    def __getitem__(self, clave):
+        try:
+            if clave in self.__slots__:
+                return getattr(self, clave)
+            if self._extra is not None:
+                return self._extra[clave]
+        except AttributeError:
+            pass
+        raise KeyError(clave)
+
+    def __setitem__(self, clave, valor):
+        if clave in self.__slots__ and clave != "_extra":
+            setattr(self, clave, valor)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[clave] = valor
+
+    def __contains__(self, clave):
+        try:
+            self[clave]
+            return True
+        except KeyError:
+            return False
+
+    def get(self, clave, defecto=None):
+        try:
+            return self[clave]
+        except KeyError:
+            return defecto
+
+    def keys(self):
+        claves = [c for c in self.CAMPOS if hasattr(self, c)]
+        if self._extra:
+            claves.extend(self._extra)
+        return claves
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def items(self):
+        return [(clave, self[clave]) for clave in self.keys()]
+
+    def to_dict(self):
+        """Diccionario serializable (sin la marca cacheada)."""
+        return dict(self.items())
+
+    def __repr__(self):
+        return f"RegistroClinico({self.to_dict()!r})"
+
 
 class HistoriaClinica:
     historiales = []  # Lista de objetos de historia clínica
+    # Datos de la mascota que se guardan junto al historial (vacíos si no se indicaron)
+    ATRIBUTOS_MASCOTA = ("especie", "raza", "edad", "genero")
+    # Índices sobre ``historiales``: se ponen al día en cada consulta (ver ``_sincronizar_indices``)
+    _por_cliente = {}        # id_cliente -> historiales del cliente
+    _por_mascota = {}        # (id_cliente, mascota normalizada) -> historial
+    _por_registro = {}       # id de registro -> (historial, registro)
+    _marca_indices = (0, None)  # (historiales indexados, último historial indexado)
 
-    def __init__(self, id_cliente, nombre_cliente, nombre_mascota):
+    def __init__(self, id_cliente, nombre_cliente, nombre_mascota, especie="", raza="", edad="", genero=""):
         self._id_cliente = id_cliente
         self._nombre_cliente = nombre_cliente
         self._nombre_mascota = nombre_mascota
+        self._especie = especie
+        self._raza = raza
+        self._edad = edad
+        self._genero = genero
         self._registros = []
         # La siguiente línea se elimina para que el constructor no modifique la lista global.
         # HistoriaClinica.historiales.append(self)
@@ -18,19 +104,137 @@ class HistoriaClinica:
     def get_nombre_cliente(self): return self._nombre_cliente
     def get_nombre_mascota(self): return self._nombre_mascota
     def get_registros(self): return self._registros
+    def get_especie(self): return self._especie
+    def get_raza(self): return self._raza
+    def get_edad(self): return self._edad
+    def get_genero(self): return self._genero
+
+    def actualizar_mascota(self, **datos):
+        """Actualizar los datos de la mascota indicados (``especie``, ``raza``, ``edad``, ``genero``).
+
+        Los valores vacíos no reemplazan los ya guardados.
+        """
+        for campo, valor in datos.items():
+            if campo not in self.ATRIBUTOS_MASCOTA:
+                raise ValueError(f"Dato de mascota desconocido: {campo}")
+            if valor:
+                setattr(self, f"_{campo}", valor)
 
     def registrar_diagnostico(self, diagnostico, tratamiento, comentarios=""):
         if not diagnostico or not tratamiento:
             raise ValueError("Diagnóstico y tratamiento son campos obligatorios")
 
-        registro = {
-            "fecha": datetime.now().strftime("%d/%m/%Y"),
-            "hora": datetime.now().strftime("%H:%M:%S"),
-            "diagnostico": diagnostico,
-            "tratamiento": tratamiento,
-            "comentarios": comentarios
-        }
+        momento = ahora()
+        registro = RegistroClinico(
+            id=HistoriaClinica._nuevo_id_registro(),
+            fecha=momento.strftime("%d/%m/%Y"),
+            hora=momento.strftime("%H:%M:%S"),
+            fecha_iso=a_iso(momento),
+            diagnostico=diagnostico,
+            tratamiento=tratamiento,
+            comentarios=comentarios
+        )
+        registro[CLAVE_CACHE] = a_marca(momento)
         self._registros.append(registro)
+        HistoriaClinica._por_registro[registro["id"]] = (self, registro)
+        return registro
+
+    # ---------- Identificadores de registros ----------
+    @classmethod
+    def _nuevo_id_registro(cls):
+        """Siguiente id de la secuencia persistente de registros clínicos (única entre procesos)."""
+        return next_id("registros", seed=cls._ultimo_id_registro)
+
+    @classmethod
+    def _ultimo_id_registro(cls):
+        """Mayor id de registro guardado o en memoria (punto de partida de la secuencia).
+
+        Los registros guardados sin id cuentan con la numeración que reciben al
+        cargarse (ver ``_numerar_registros``).
+        """
+        try:
+            guardados = [registro for h in get_repository("historiales").iter_all()
+                         for registro in h.get("registros", [])]
+        except (FileNotFoundError, json.JSONDecodeError):
+            guardados = []
+        ultimo = cls._numerar_registros(guardados)
+        en_memoria = (registro.get("id", 0) for h in cls.historiales for registro in h.get_registros())
+        return max(ultimo, *en_memoria, 0)
+
+    @staticmethod
+    def _numerar_registros(registros):
+        """Dar id a los registros que no lo tienen y retornar el mayor id.
+
+        Los registros sin id (anteriores a los ids) reciben, a continuación del
+        mayor id existente, su posición en la lista: la numeración es la misma
+        en cada carga hasta que se guarden los historiales, que la persisten.
+        """
+        ultimo = base = max((registro["id"] for registro in registros if "id" in registro), default=0)
+        for posicion, registro in enumerate(registros, 1):
+            if "id" not in registro:
+                registro["id"] = base + posicion
+                ultimo = registro["id"]
+        return ultimo
+
+    # ---------- Índices ----------
+
+    @staticmethod
+    def _clave_mascota(id_cliente, nombre_mascota):
+        return str(id_cliente), normalizar_texto(nombre_mascota)
+
+    @classmethod
+    def _reconstruir_indices(cls):
+        cls._por_cliente = {}
+        cls._por_mascota = {}
+        cls._por_registro = {}
+        cls._marca_indices = (0, None)
+        cls._sincronizar_indices()
+
+    @classmethod
+    def _sincronizar_indices(cls):
+        """Indexar los historiales agregados a ``historiales`` desde la última consulta.
+
+        La lista solo crece por el final durante la sesión; si cambió de otra
+        forma (recarga) los índices se reconstruyen.
+        """
+        vistos, ultimo = cls._marca_indices
+        if len(cls.historiales) < vistos or (vistos and cls.historiales[vistos - 1] is not ultimo):
+            cls._reconstruir_indices()
+            return
+        for historial in cls.historiales[vistos:]:
+            id_cliente = str(historial.get_id_cliente())
+            cls._por_cliente.setdefault(id_cliente, []).append(historial)
+            cls._por_mascota.setdefault(cls._clave_mascota(id_cliente, historial.get_nombre_mascota()), historial)
+            for registro in historial.get_registros():
+                cls._por_registro[registro.get("id")] = (historial, registro)
+        if len(cls.historiales) > vistos:
+            cls._marca_indices = (len(cls.historiales), cls.historiales[-1])
+
+    @classmethod
+    def buscar_registro(cls, id_registro):
+        """Tupla ``(historial, registro)`` del registro con ese id, o ``None``: O(1)."""
+        cls._sincronizar_indices()
+        return cls._por_registro.get(id_registro)
+
+    @classmethod
+    def historiales_de_cliente(cls, id_cliente):
+        """Historiales (uno por mascota) del cliente con ese id."""
+        cls._sincronizar_indices()
+        return list(cls._por_cliente.get(str(id_cliente), ()))
+
+    @staticmethod
+    def marca_registro(registro):
+        """Marca de tiempo entera (segundos desde epoch) de un registro, cacheada."""
+        return marca_de(registro, ("fecha", "hora"))
+
+    @classmethod
+    def _preparar_registro(cls, datos):
+        """Crear el registro de datos cargados, cachear su marca y completar ``fecha_iso`` en datos antiguos."""
+        registro = RegistroClinico.desde_dict(datos)
+        marca = cls.marca_registro(registro)
+        if marca and "fecha_iso" not in registro:
+            registro["fecha_iso"] = a_iso(desde_marca(marca))
+        return registro
 
     # ---------- Serialización ----------
     def to_dict(self):
@@ -39,21 +243,28 @@ class HistoriaClinica:
             "id_cliente": self._id_cliente,
             "nombre_cliente": self._nombre_cliente,
             "nombre_mascota": self._nombre_mascota,
-            "registros": self._registros
+            **{campo: getattr(self, f"_{campo}") for campo in self.ATRIBUTOS_MASCOTA},
+            "registros": [r.to_dict() for r in self._registros]
         }
 
     def ver_historial(self):
         print(f"\nHistorial clínico de {self._nombre_mascota} (Cliente: {self._nombre_cliente}) (ID: {self._id_cliente}):")
         if not self._registros:
             print("No hay registros aún.")
-        for i, reg in enumerate(self._registros, 1):
-            print(f"\nRegistro {i}")
+        for reg in self._registros:
+            print(f"\nRegistro N.° {reg.get('id')}")
             for k, v in reg.items():
-                print(f"{k.capitalize()}: {v}")
+                if k not in ("id", "fecha_iso"):
+                    print(f"{k.capitalize()}: {v}")
 
     @classmethod
-    def buscar_historial(cls, id_cliente):
-        return next((h for h in cls.historiales if h.get_id_cliente() == id_cliente), None)
+    def buscar_historial(cls, id_cliente, nombre_mascota=None):
+        """Historial del cliente (de la mascota indicada, o el primero del cliente): O(1)."""
+        cls._sincronizar_indices()
+        if nombre_mascota is not None:
+            return cls._por_mascota.get(cls._clave_mascota(id_cliente, nombre_mascota))
+        historiales = cls._por_cliente.get(str(id_cliente))
+        return historiales[0] if historiales else None
 
     @classmethod
     def crear_o_actualizar_historial(cls):
@@ -80,7 +291,9 @@ class HistoriaClinica:
 
             nombre_cliente = entrada("Nombre del cliente: ", lambda s: s != "", "Requerido")
             nombre_mascota = entrada("Nombre de la mascota: ", lambda s: s != "", "Requerido")
-            historial = cls(id_cliente, nombre_cliente, nombre_mascota)
+            datos_mascota = {campo: entrada(f"{campo.capitalize()} (opcional): ", opcional=True)
+                             for campo in cls.ATRIBUTOS_MASCOTA}
+            historial = cls(id_cliente, nombre_cliente, nombre_mascota, **datos_mascota)
             cls.historiales.append(historial)  # Añadir explícitamente a la lista
             print("Historial creado para el cliente.")
 
@@ -106,55 +319,64 @@ class HistoriaClinica:
             h.ver_historial()
 
     @classmethod
-    def guardar_historiales(cls, archivo="db/historiales.json"):
-        """Guardar todos los historiales en un archivo JSON."""
+    def guardar_historiales(cls, archivo=None):
+        """Guardar todos los historiales (en ``archivo`` si se indica, como exportación JSON).
+
+        Sin ``archivo`` el guardado pasa por ``schedule_save``: con escritura
+        diferida activa lo realiza el escritor en segundo plano.
+        """
+        if archivo:
+            cls._guardar_en(JsonRepository(archivo))
+        else:
+            schedule_save("historiales", lambda: cls._guardar_en(get_repository("historiales")))
+
+    @classmethod
+    def _guardar_en(cls, repositorio):
         try:
-            # Asegurarse de que el directorio de la base de datos exista
-            Path(archivo).parent.mkdir(parents=True, exist_ok=True)
-            with open(archivo, "w", encoding="utf-8") as f:
-                json.dump([h.to_dict() for h in cls.historiales], f, indent=4, ensure_ascii=False)
-            print(f"Historiales guardados en {archivo}")
+            repositorio.save_all([h.to_dict() for h in list(cls.historiales)])
+            print(f"Historiales guardados en {repositorio.path}")
         except Exception as e:
             print(f"Error al guardar historiales: {e}")
 
     @classmethod
-    def cargar_historiales(cls, archivo="db/historiales.json"):
+    def cargar_historiales(cls, archivo=None):
         if cls.historiales:  # Si ya hay datos, no cargar de nuevo en la misma sesión.
             return
 
+        repositorio = JsonRepository(archivo) if archivo else get_repository("historiales")
         try:
-            if not Path(archivo).exists():
-                print(f"Archivo {archivo} no encontrado. Creando historiales de muestra.")
+            if not repositorio.exists():
+                print(f"Archivo {repositorio.path} no encontrado. Creando historiales de muestra.")
                 cls._crear_historiales_muestra()
                 cls.guardar_historiales(archivo)
                 return
 
-            with open(archivo, "r", encoding="utf-8") as f:
-                contenido = f.read().strip()
-                if not contenido or contenido == '[]':
-                    # No es necesario crear datos de muestra si el usuario empieza a registrar.
-                    # Se creará el archivo al guardar el primer historial.
-                    print(f"Archivo {archivo} vacío o sin historiales.")
-                    return
-            
-            datos = json.loads(contenido)
+            datos = repositorio.load_all()
+            if not datos:
+                # No es necesario crear datos de muestra si el usuario empieza a registrar.
+                # Se creará el archivo al guardar el primer historial.
+                print(f"Archivo {repositorio.path} vacío o sin historiales.")
+                return
             
         except (FileNotFoundError, json.JSONDecodeError) as e:
-            print(f"Error al cargar desde {archivo}: {e}. Se iniciará la sesión sin historiales.")
+            print(f"Error al cargar desde {repositorio.path}: {e}. Se iniciará la sesión sin historiales.")
             cls.historiales.clear()
             return
 
         # Si llegamos aquí, 'datos' tiene contenido válido.
         temp_historiales = []
         for h in datos:
-            nuevo = cls(h["id_cliente"], h["nombre_cliente"], h["nombre_mascota"])
-            nuevo._registros = h.get("registros", [])
+            nuevo = cls(h["id_cliente"], h["nombre_cliente"], h["nombre_mascota"],
+                        **{campo: h.get(campo, "") for campo in cls.ATRIBUTOS_MASCOTA})
+            nuevo._registros = [cls._preparar_registro(r) for r in h.get("registros", [])]
             temp_historiales.append(nuevo)
+        cls._numerar_registros([registro for historial in temp_historiales for registro in historial.get_registros()])
         
         # Solo ahora modificamos la lista de la clase
         cls.historiales.clear()
         cls.historiales.extend(temp_historiales)
-        print(f"Historiales cargados desde {archivo}")
+        cls._reconstruir_indices()
+        print(f"Historiales cargados desde {repositorio.path}")
 
     @classmethod
     def _crear_historiales_muestra(cls):
@@ -176,6 +398,23 @@ class HistoriaClinica:
 
     @classmethod
     def get_next_id(cls):
-        if not cls.historiales:
-            return 1
-        return max(int(h.get_id_cliente()) for h in cls.historiales if str(h.get_id_cliente()).isdigit()) + 1
+        """Reservar un ID de cliente nuevo de la secuencia persistente "clientes".
+
+        Dos estaciones que lo pidan a la vez reciben IDs distintos. Se saltan
+        los IDs que ya tenga un historial (los ID se pueden escribir a mano).
+        Cada llamada consume un ID: pedirlo recién al crear el historial.
+        """
+        while True:
+            id_cliente = next_id("clientes", seed=cls._ultimo_id_cliente)
+            if cls.buscar_historial(str(id_cliente)) is None:
+                return id_cliente
+
+    @classmethod
+    def _ultimo_id_cliente(cls):
+        """Mayor ID numérico de cliente guardado o en memoria (punto de partida de la secuencia)."""
+        try:
+            ids = [h.get("id_cliente") for h in get_repository("historiales").iter_all()]
+        except (FileNotFoundError, json.JSONDecodeError):
+            ids = []  # Como en ``cargar_historiales``: un archivo dañado no impide registrar
+        ids.extend(h.get_id_cliente() for h in cls.historiales)
+        return max((int(i) for i in ids if str(i).isdigit()), default=0)
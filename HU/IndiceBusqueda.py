@@ -0,0 +1,196 @@
+import heapq
+import unicodedata
+
+
+def normalizar_texto(texto):
+    """Normalizar texto para búsquedas: sin mayúsculas, tildes ni espacios extremos."""
+    descompuesto = unicodedata.normalize("NFKD", str(texto).strip().casefold())
+    return "".join(c for c in descompuesto if not unicodedata.combining(c))
+
+
+class _IndiceCampo:
+    """Índice de trigramas sobre los valores distintos de un campo.
+
+    Cada valor normalizado se indexa una sola vez aunque lo compartan muchos
+    productos (por ejemplo, una categoría), y las listas de trigramas guardan
+    referencias al valor, no copias.
+    """
+
+    N = 3
+
+    def __init__(self):
+        self.valores = {}  # valor normalizado -> productos con ese valor
+        self.gramas = {}   # trigrama -> valores que lo contienen
+
+    def _gramas(self, valor):
+        return {valor[i:i + self.N] for i in range(len(valor) - self.N + 1)}
+
+    def agregar(self, valor, producto):
+        productos = self.valores.get(valor)
+        if productos is None:
+            self.valores[valor] = [producto]
+            for grama in self._gramas(valor):
+                self.gramas.setdefault(grama, []).append(valor)
+        else:
+            productos.append(producto)
+
+    def quitar(self, valor, producto):
+        productos = self.valores.get(valor)
+        if productos is None or producto not in productos:
+            return
+        productos.remove(producto)
+        if productos:
+            return
+        del self.valores[valor]
+        for grama in self._gramas(valor):
+            lista = self.gramas[grama]
+            lista.remove(valor)
+            if not lista:
+                del self.gramas[grama]
+
+    def candidatos(self, consulta):
+        """Valores que podrían contener ``consulta`` (la lista de trigrama más corta)."""
+        if len(consulta) < self.N:
+            return self.valores.keys()
+        return min((self.gramas.get(g, ()) for g in self._gramas(consulta)), key=len)
+
+    def coincidencias(self, consulta, previas=None):
+        """Valores que contienen ``consulta``; ``previas`` acota la búsqueda al refinar."""
+        base = self.candidatos(consulta)
+        if previas is not None and len(previas) < len(base):
+            base = previas
+        return {valor for valor in base if consulta in valor}
+
+
+class IndiceBusqueda:
+    """Índice de búsqueda por subcadenas para el buscador del inventario.
+
+    Indexa por trigramas el código, nombre, categoría y descripción de cada
+    producto (normalizados sin mayúsculas ni tildes). Una consulta solo
+    verifica los valores de su trigrama menos frecuente, y si amplía la
+    consulta anterior (el usuario sigue escribiendo) se refina a partir de
+    las coincidencias previas. Los resultados se ordenan por relevancia:
+    coincidencia exacta, al inicio del campo, al inicio de una palabra y,
+    por último, en cualquier posición.
+    """
+
+    CAMPOS = ("codigo", "nombre", "categoria", "descripcion")  # En orden de prioridad
+    _SEPARADORES = " -_/.,("
+
+    def __init__(self, productos=()):
+        self._campos = {campo: _IndiceCampo() for campo in self.CAMPOS}
+        self._valores_producto = {}  # id(producto) -> valores indexados por campo
+        self._ultima = None  # (campos, consulta, coincidencias por campo)
+        for producto in productos:
+            self.agregar(producto)
+
+    @staticmethod
+    def _valores(producto):
+        return (
+            normalizar_texto(producto.get_codigo()),
+            normalizar_texto(producto.get_nombre()),
+            normalizar_texto(producto.get_categoria()),
+            normalizar_texto(producto.get_descripcion()),
+        )
+
+    def __len__(self):
+        return len(self._valores_producto)
+
+    def agregar(self, producto):
+        if id(producto) in self._valores_producto:
+            return
+        valores = self._valores(producto)
+        self._valores_producto[id(producto)] = valores
+        for campo, valor in zip(self.CAMPOS, valores):
+            self._campos[campo].agregar(valor, producto)
+        self._ultima = None
+
+    def quitar(self, producto):
+        valores = self._valores_producto.pop(id(producto), None)
+        if valores is None:
+            return
+        for campo, valor in zip(self.CAMPOS, valores):
+            self._campos[campo].quitar(valor, producto)
+        self._ultima = None
+
+    def actualizar(self, producto):
+        """Reindexar un producto cuyos datos cambiaron."""
+        if self._valores_producto.get(id(producto)) != self._valores(producto):
+            self.quitar(producto)
+            self.agregar(producto)
+
+    def limpiar(self):
+        for campo in self.CAMPOS:
+            self._campos[campo] = _IndiceCampo()
+        self._valores_producto.clear()
+        self._ultima = None
+
+    def _clave(self, valor, consulta, prioridad, campo):
+        """Clave de relevancia: tipo de coincidencia, campo, posición y largo del valor."""
+        posicion = valor.find(consulta)
+        if valor == consulta:
+            calidad = 0
+        elif posicion == 0:
+            calidad = 1
+        elif valor[posicion - 1] in self._SEPARADORES:
+            calidad = 2
+        else:
+            calidad = 3
+        return calidad, prioridad, posicion, len(valor), valor, campo
+
+    def buscar(self, consulta, campos=None, limite=None):
+        """Productos cuyo(s) campo(s) contienen ``consulta``, de más a menos relevante.
+
+        Args:
+            consulta: Texto a buscar (se normaliza igual que los datos).
+            campos: Campos donde buscar; por defecto, todos (``CAMPOS``).
+            limite: Cantidad máxima de resultados.
+        """
+        consulta = normalizar_texto(consulta)
+        campos = tuple(campos) if campos else self.CAMPOS
+        if not consulta:
+            return []
+
+        previas = {}
+        if self._ultima and self._ultima[0] == campos and self._ultima[1] in consulta:
+            previas = self._ultima[2]
+        coincidencias = {campo: self._campos[campo].coincidencias(consulta, previas.get(campo))
+                         for campo in campos}
+        self._ultima = (campos, consulta, coincidencias)
+
+        if limite:
+            # Caso habitual al escribir: si hay suficientes coincidencias al inicio
+            # del campo (las más relevantes), no hace falta clasificar las demás
+            prefijos = [(valor != consulta, prioridad, 0, len(valor), valor, campo)
+                        for prioridad, campo in enumerate(campos)
+                        for valor in coincidencias[campo] if valor.startswith(consulta)]
+            if len(prefijos) >= limite:
+                productos = self._expandir(heapq.nsmallest(limite, prefijos), limite)
+                if len(productos) >= limite:
+                    return productos
+
+        # Se ordenan los valores distintos (no los productos): cada producto
+        # aparece con el primer valor en que coincide, que es el más relevante
+        claves = [self._clave(valor, consulta, prioridad, campo)
+                  for prioridad, campo in enumerate(campos)
+                  for valor in coincidencias[campo]]
+        if limite:
+            # Cada valor aporta al menos un producto: bastan los ``limite`` mejores,
+            # salvo que un mismo producto coincida en varios campos
+            productos = self._expandir(heapq.nsmallest(limite, claves), limite)
+            if len(productos) >= limite or len(claves) <= limite:
+                return productos
+        return self._expandir(sorted(claves), limite)
+
+    def _expandir(self, claves, limite=None):
+        """Productos de los valores en el orden de ``claves``, sin repetir."""
+        productos = []
+        vistos = set()
+        for *_, valor, campo in claves:
+            for producto in self._campos[campo].valores[valor]:
+                if id(producto) not in vistos:
+                    vistos.add(id(producto))
+                    productos.append(producto)
+                    if limite and len(productos) >= limite:
+                        return productos
+        return productos
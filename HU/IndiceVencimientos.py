@@ -0,0 +1,101 @@
+"""
+Índice de productos ordenados por fecha de vencimiento.
+
+Cada fecha "dd/mm/YYYY" se interpreta una sola vez, al indexar el producto
+o cuando su fecha cambia, y los productos se mantienen en una lista
+ordenada por día de vencimiento. Las consultas por ventana de días
+(próximos a vencer, vencidos) ubican sus extremos con ``bisect`` y solo
+recorren los productos que devuelven: O(log n + k).
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from datetime import date
+
+from .InventarioColumnar import SIN_VENCIMIENTO, dia_vencimiento
+from .Producto import Producto
+
+
+class IndiceVencimientos:
+    """Productos de un inventario ordenados por vencimiento.
+
+    Los productos sin fecha válida ("N/A", vacía o mal escrita) no se
+    indexan. Las altas llegan por ``agregar``; los cambios de fecha de un
+    producto ya indexado, por ``Producto.suscribir``.
+    """
+
+    def __init__(self):
+        self.limpiar()
+        Producto.suscribir(self)
+
+    def limpiar(self):
+        self._productos = {}  # id(producto) -> producto
+        self._orden = {}      # id(producto) -> posición en el inventario (desempate)
+        self._fechas = {}     # id(producto) -> (fecha indexada, día de vencimiento)
+        self._lista = []      # (día de vencimiento, orden, id) ordenado
+
+    def __len__(self):
+        return len(self._lista)
+
+    def agregar(self, producto):
+        clave = id(producto)
+        if clave in self._productos:
+            return
+        self._productos[clave] = producto
+        self._orden[clave] = len(self._orden)
+        self._indexar(clave, producto.get_fecha_vencimiento())
+
+    def producto_modificado(self, producto):
+        """Reubicar un producto del índice si cambió su fecha de vencimiento."""
+        clave = id(producto)
+        if clave not in self._productos:
+            return
+        fecha = producto.get_fecha_vencimiento()
+        if fecha == self._fechas[clave][0]:
+            return
+        dia = self._fechas[clave][1]
+        if dia != SIN_VENCIMIENTO:
+            del self._lista[bisect_left(self._lista, (dia, self._orden[clave], clave))]
+        self._indexar(clave, fecha)
+
+    def _indexar(self, clave, fecha):
+        dia = dia_vencimiento(fecha)
+        self._fechas[clave] = (fecha, dia)
+        if dia != SIN_VENCIMIENTO:
+            insort(self._lista, (dia, self._orden[clave], clave))
+
+    def _rango(self, desde, hasta, hoy, limite=None):
+        """Productos con día de vencimiento en [desde, hasta], como ``(producto, dias_restantes)``."""
+        inicio = bisect_left(self._lista, (desde,))
+        fin = bisect_right(self._lista, (hasta, float("inf")))
+        if limite is not None:
+            fin = min(fin, inicio + limite)
+        return [(self._productos[clave], dia - hoy) for dia, _, clave in self._lista[inicio:fin]]
+
+    def proximos_a_vencer(self, dias, hoy=None, limite=None):
+        """Productos que vencen entre hoy y dentro de ``dias`` días, ordenados por vencimiento.
+
+        Retorna tuplas ``(producto, dias_restantes)``; con ``limite`` solo los
+        primeros ``limite``.
+        """
+        hoy = (hoy or date.today()).toordinal()
+        return self._rango(hoy, hoy + dias, hoy, limite)
+
+    def vencidos(self, hoy=None):
+        """Productos con fecha de vencimiento anterior a hoy, del más antiguo al más reciente.
+
+        Retorna tuplas ``(producto, dias_restantes)`` con días negativos.
+        """
+        hoy = (hoy or date.today()).toordinal()
+        return self._rango(0, hoy - 1, hoy)
+
+    def por_vencimiento(self, desde=None):
+        """Recorrer los productos en orden de vencimiento, a partir de la fecha ``desde``.
+
+        Genera los productos de a uno, así que se puede cortar el recorrido
+        sin ordenar ni copiar el resto. El índice no debe modificarse
+        mientras se recorre.
+        """
+        posicion = bisect_left(self._lista, (desde.toordinal(),)) if desde else 0
+        while posicion < len(self._lista):
+            yield self._productos[self._lista[posicion][2]]
+            posicion += 1
@@ -1,5 +1,11 @@
 import json
-from datetime import datetime
+
+from db import flush_writes, get_repository, schedule_save, transaction, JsonRepository
+from .IndiceBusqueda import IndiceBusqueda, normalizar_texto
+from .IndiceVencimientos import IndiceVencimientos
+from .InventarioColumnar import InventarioColumnar
+from .MetricasInventario import MetricasInventario
+from .MarcaTiempo import a_iso, a_marca, ahora, marca_de
 from .Producto import Producto
 
 
@@ -7,9 +13,79 @@ class Inventario:
     def __init__(self):
         self.productos = []
         self.umbral_stock_bajo = 5  # Definir el umbral de stock bajo
+        # Índices: código -> producto, nombre normalizado -> producto,
+        # categoría normalizada -> productos
+        self._por_codigo = {}
+        self._por_nombre = {}
+        self._por_categoria = {}
+        # id(producto) -> (nombre, categoría) normalizados con que está en los dos índices anteriores
+        self._claves = {}
+        self._claves_vigentes = True  # Falso si un producto cambió de nombre o categoría al recargarse
+        # Índice de subcadenas para el buscador (código, nombre, categoría, descripción)
+        self.indice_busqueda = IndiceBusqueda()
+        # Vista por columnas (NumPy si está instalado) para agregados: valor, stock bajo, vencimientos
+        self.columnas = InventarioColumnar()
+        # Productos ordenados por fecha de vencimiento
+        self.vencimientos = IndiceVencimientos()
+        # Métricas del dashboard, actualizadas por cada alta o cambio de stock
+        self.metricas = MetricasInventario(self.vencimientos)
+        # Aumenta cada vez que se reconstruyen los índices (recarga del inventario)
+        self.generacion = 0
+        Producto.suscribir(self)
 
     def agregar_producto(self, producto):
         self.productos.append(producto)
+        self._indexar(producto)
+
+    def _indexar(self, producto):
+        # Ante duplicados prevalece el primero, como en una búsqueda lineal
+        self._por_codigo.setdefault(producto.get_codigo(), producto)
+        self._indexar_claves(producto)
+        self.indice_busqueda.agregar(producto)
+        self.columnas.agregar(producto)
+        self.vencimientos.agregar(producto)
+        self.metricas.agregar(producto)
+
+    def _indexar_claves(self, producto):
+        nombre = normalizar_texto(producto.get_nombre())
+        categoria = normalizar_texto(producto.get_categoria())
+        self._por_nombre.setdefault(nombre, producto)
+        self._por_categoria.setdefault(categoria, []).append(producto)
+        self._claves[id(producto)] = (nombre, categoria)
+
+    def _reconstruir_claves(self):
+        """Reconstruir los índices por nombre y categoría, en el orden del inventario."""
+        self._por_nombre.clear()
+        self._por_categoria.clear()
+        self._claves.clear()
+        for producto in self.productos:
+            self._indexar_claves(producto)
+        self._claves_vigentes = True
+
+    def producto_modificado(self, producto):
+        """Notificación de ``Producto``: al recargarse, un producto compartido pudo cambiar sus datos."""
+        claves = self._claves.get(id(producto))
+        if claves is None:
+            return
+        self.indice_busqueda.actualizar(producto)
+        if claves != (normalizar_texto(producto.get_nombre()), normalizar_texto(producto.get_categoria())):
+            # Se reconstruyen en la próxima búsqueda: una recarga puede renombrar muchos productos seguidos
+            self._claves_vigentes = False
+
+    def _reindexar(self):
+        """Reconstruir todos los índices (recarga del inventario)."""
+        self._por_codigo.clear()
+        self._por_nombre.clear()
+        self._por_categoria.clear()
+        self._claves.clear()
+        self._claves_vigentes = True
+        self.indice_busqueda.limpiar()
+        self.columnas.limpiar()
+        self.vencimientos.limpiar()
+        self.metricas.limpiar()
+        self.generacion += 1
+        for producto in self.productos:
+            self._indexar(producto)
 
     def listar_productos(self):
         print("\n--- Listado de productos ---")
@@ -23,16 +99,39 @@ class Inventario:
             print("\n---⚠️ Productos próximos a agotarse (stock bajo) ---")
         productos_bajos = 0 #variable que rertorna la cantidad de productos con stock bajo
         prods = []
-        for producto in self.productos:
-            if producto.get_cantidad() < self.umbral_stock_bajo:
-                productos_bajos += 1
-                prods.append(producto.nombre)
-                if ptr:
-                    print(f'Código: {producto.codigo} Producto: {producto.nombre} Cantidad: {producto.cantidad}')
+        for producto in self.columnas.bajo_umbral(self.umbral_stock_bajo):
+            productos_bajos += 1
+            prods.append(producto.nombre)
+            if ptr:
+                print(f'Código: {producto.codigo} Producto: {producto.nombre} Cantidad: {producto.cantidad}')
         if productos_bajos == 0 and ptr:
             print("No hay productos con stock bajo.")
         return (productos_bajos, prods)
     
+    def proximos_a_vencer(self, dias, hoy=None):
+        """Productos que vencen en los próximos ``dias`` días, como ``(producto, dias_restantes)``."""
+        return self.vencimientos.proximos_a_vencer(dias, hoy)
+
+    def vencidos(self, hoy=None):
+        """Productos ya vencidos, como ``(producto, dias_restantes)`` con días negativos."""
+        return self.vencimientos.vencidos(hoy)
+
+    def por_vencimiento(self, desde=None):
+        """Recorrer los productos con fecha de vencimiento, del que vence antes al que vence después."""
+        return self.vencimientos.por_vencimiento(desde)
+
+    def listar_productos_por_vencer(self, dias=30):
+        print(f"\n--- Productos vencidos o que vencen en los próximos {dias} días ---")
+        vencidos = self.vencidos()
+        proximos = self.proximos_a_vencer(dias)
+        for producto, restantes in vencidos:
+            print(f"❌ Código: {producto.codigo} Producto: {producto.nombre} Vencido hace {-restantes} días ({producto.fecha_vencimiento})")
+        for producto, restantes in proximos:
+            print(f"⏰ Código: {producto.codigo} Producto: {producto.nombre} Vence en {restantes} días ({producto.fecha_vencimiento})")
+        if not vencidos and not proximos:
+            print("No hay productos vencidos ni próximos a vencer.")
+        return vencidos, proximos
+
     def cambiar_umbral_stock_bajo(self, nuevo_umbral):  # Esta funcion solo puede ser usada por el admnistrador o bodeguero
         try:
             nuevo_umbral = int(nuevo_umbral)
@@ -45,19 +144,27 @@ class Inventario:
             print("Error: El umbral debe ser un número entero.")
         
     def buscar_por_codigo(self, codigo):
-        for p in self.productos:
-            if p.get_codigo() == int(codigo):
-                return p
-        return None
+        return self._por_codigo.get(int(codigo))
 
     def buscar_por_nombre(self, nombre):
-        for p in self.productos:
-            if p.get_nombre().lower() == nombre.lower():
-                return p
-        return None
+        """Buscar por nombre sin distinguir mayúsculas ni tildes."""
+        if not self._claves_vigentes:
+            self._reconstruir_claves()
+        return self._por_nombre.get(normalizar_texto(nombre))
 
     def buscar_por_categoria(self, categoria):
-        return [p for p in self.productos if p.get_categoria().lower() == categoria.lower()]
+        """Productos de una categoría, sin distinguir mayúsculas ni tildes."""
+        if not self._claves_vigentes:
+            self._reconstruir_claves()
+        return list(self._por_categoria.get(normalizar_texto(categoria), []))
+
+    def buscar_productos(self, texto, campo=None, limite=None):
+        """Búsqueda por subcadena (sin mayúsculas ni tildes), ordenada por relevancia.
+
+        ``campo`` restringe la búsqueda a 'codigo', 'nombre', 'categoria' o
+        'descripcion'; por defecto se busca en todos.
+        """
+        return self.indice_busqueda.buscar(texto, (campo,) if campo else None, limite)
 
     def actualizar_stock(self, codigo, nueva_cantidad, motivo):
         producto = self.buscar_por_codigo(codigo)
@@ -68,82 +175,171 @@ class Inventario:
                 return
             producto.set_cantidad(nueva_cantidad)
             self.registrar_historial_stock(codigo, anterior, nueva_cantidad, motivo)
-            self.guardar_en_json()
+            # Actualizar solo la fila del producto modificado
+            get_repository("productos").upsert(producto.to_dict())
             print(f"Stock actualizado para '{producto.get_nombre()}' de {anterior} a {nueva_cantidad}.")
         else:
             print("Producto no encontrado.")
 
-    def registrar_historial_stock(self, codigo, stock_anterior, nuevo_stock, motivo):
-        """Registrar un cambio en el historial de stock."""
-        historial = []
+    def aplicar_movimientos(self, lineas, motivo, al_confirmar=None):
+        """Aplicar varios movimientos de stock como un único lote atómico.
+
+        ``lineas`` es un iterable de tuplas ``(codigo, variacion)``: la variación
+        es negativa para salidas (por ejemplo, una venta) y positiva para
+        entradas. Todas las líneas se validan antes de modificar nada; si alguna
+        no es válida se lanza ``ValueError`` y el inventario queda intacto.
+
+        Los productos modificados, sus entradas de historial y lo que escriba
+        ``al_confirmar`` (por ejemplo, el registro de la venta) se persisten en
+        una misma transacción. Retorna las entradas de historial generadas.
+        """
+        momento = ahora()
+        originales = {}  # codigo -> (producto, cantidad antes del lote)
+        actuales = {}    # codigo -> cantidad tras las líneas ya validadas
+        entradas = []
+        for codigo, variacion in lineas:
+            producto = self.buscar_por_codigo(codigo)
+            if producto is None:
+                raise ValueError(f"Producto {codigo} no encontrado")
+            clave = producto.get_codigo()
+            originales.setdefault(clave, (producto, producto.get_cantidad()))
+            anterior = actuales.get(clave, producto.get_cantidad())
+            nuevo = anterior + int(variacion)
+            if nuevo < 0:
+                raise ValueError(f"Stock insuficiente para '{producto.get_nombre()}' (disponible: {anterior})")
+            actuales[clave] = nuevo
+            entradas.append(self._entrada_historial(clave, producto.get_nombre(), anterior, nuevo, motivo, momento))
+
+        for clave, cantidad in actuales.items():
+            originales[clave][0].set_cantidad(cantidad)
         try:
-            with open("db/historial_stock.json", "r") as archivo:
-                historial = json.load(archivo)
-        except FileNotFoundError:
-            historial = []
+            with transaction():
+                repositorio = get_repository("productos")
+                for producto, _ in originales.values():
+                    repositorio.upsert(producto.to_dict())
+                get_repository("historial_stock").append_many(entradas)
+                if al_confirmar:
+                    al_confirmar()
+        except Exception:
+            # Nada se persistió: revertir también los cambios en memoria
+            for producto, cantidad in originales.values():
+                producto.set_cantidad(cantidad)
+            raise
+        return entradas
 
-        producto = self.buscar_por_codigo(codigo)
-        entrada = {
+    @staticmethod
+    def _entrada_historial(codigo, nombre, stock_anterior, nuevo_stock, motivo, momento):
+        return {
             "codigo_producto": codigo,
-            "nombre_producto": producto.get_nombre() if producto else "Producto desconocido",
+            "nombre_producto": nombre,
             "stock_anterior": stock_anterior,
             "nuevo_stock": nuevo_stock,
             "motivo": motivo,
-            "fecha": datetime.now().strftime("%d/%m/%Y %H:%M:%S")
+            "fecha": momento.strftime("%d/%m/%Y %H:%M:%S"),
+            "fecha_iso": a_iso(momento)
         }
 
-        historial.append(entrada)
-        with open("db/historial_stock.json", "w") as archivo:
-            json.dump(historial, archivo, indent=4)
+    def registrar_historial_stock(self, codigo, stock_anterior, nuevo_stock, motivo):
+        """Registrar un cambio en el historial de stock."""
+        producto = self.buscar_por_codigo(codigo)
+        nombre = producto.get_nombre() if producto else "Producto desconocido"
+        entrada = self._entrada_historial(codigo, nombre, stock_anterior, nuevo_stock, motivo, ahora())
+        get_repository("historial_stock").append(entrada)
+
+    def iterar_historial_stock(self, codigo=None, desde=None):
+        """Recorrer el historial de stock por streaming, opcionalmente solo de un producto.
 
-    def obtener_historial_stock(self):
-        """Obtener el historial completo de cambios de stock."""
+        Cada movimiento trae su marca de tiempo entera en ``_marca`` (ver
+        ``MarcaTiempo``); con ``desde`` (``datetime`` o marca) solo se
+        recorren los movimientos a partir de ese momento.
+        """
+        repositorio = get_repository("historial_stock")
+        if codigo is None:
+            entradas = repositorio.iter_all()
+        else:
+            entradas = repositorio.iter_by("codigo_producto", int(codigo))
+        minimo = a_marca(desde) if desde is not None else None
+        for entrada in entradas:
+            marca = marca_de(entrada)
+            if minimo is None or marca >= minimo:
+                yield entrada
+
+    def obtener_historial_stock(self, codigo=None, limite=None):
+        """Obtener el historial de cambios de stock.
+
+        Con ``limite`` se devuelven solo los ``limite`` movimientos más recientes
+        (leyendo la bitácora desde el final); con ``codigo`` solo los del producto.
+        """
         try:
-            with open("db/historial_stock.json", "r") as archivo:
-                return json.load(archivo)
-        except FileNotFoundError:
+            if limite is not None and codigo is None:
+                historial = get_repository("historial_stock").tail(limite)
+                for entrada in historial:
+                    marca_de(entrada)
+                return historial
+            historial = list(self.iterar_historial_stock(codigo))
+            return historial[-limite:] if limite else historial
+        except json.JSONDecodeError:
             return []
 
-    def mostrar_historial(self):
-        try:
-            with open("db/historial_stock.json", "r") as archivo:
-                historial = json.load(archivo)
-                for registro in historial:
-                    print(f"{registro['fecha']} - {registro['nombre_producto']} - {registro['stock_anterior']} -> {registro['nuevo_stock']} | Motivo: {registro['motivo']}")
-        except FileNotFoundError:
+    def mostrar_historial(self, codigo=None, limite=None):
+        if limite:
+            registros = self.obtener_historial_stock(codigo, limite)
+        else:
+            registros = self.iterar_historial_stock(codigo)
+        vacio = True
+        for registro in registros:
+            vacio = False
+            print(f"{registro['fecha']} - {registro['nombre_producto']} - {registro['stock_anterior']} -> {registro['nuevo_stock']} | Motivo: {registro['motivo']}")
+        if vacio:
             print("No hay historial aún.")
 
-    def guardar_en_json(self, archivo="db/productos.json"):
-        """Guardar la lista de productos en un archivo JSON."""
-        with open(archivo, "w") as f:
-            json.dump([p.to_dict() for p in self.productos], f, indent=4)
+    def guardar_en_json(self, archivo=None):
+        """Guardar la lista de productos (en ``archivo`` si se indica, como exportación JSON).
+
+        Sin ``archivo`` el guardado pasa por ``schedule_save``: con escritura
+        diferida activa lo realiza el escritor en segundo plano.
+        """
+        if archivo:
+            JsonRepository(archivo).save_all([p.to_dict() for p in self.productos])
+        else:
+            schedule_save("productos", self._guardar_productos)
+
+    def _guardar_productos(self):
+        get_repository("productos").save_all([p.to_dict() for p in list(self.productos)])
         
-    def cargar_desde_json(self, archivo="db/productos.json"):
-        # Limpiar lista de productos antes de recargar
-        self.productos.clear()
-        from pathlib import Path
+    def cargar_desde_json(self, archivo=None):
+        self.aplicar_productos(self.leer_productos(archivo))
+
+    def leer_productos(self, archivo=None):
+        """Leer los registros de productos guardados sin modificar el inventario.
+
+        Solo hace E/S, por lo que puede ejecutarse en un hilo de fondo; el
+        resultado se aplica después con ``aplicar_productos``. Retorna una
+        lista vacía si el archivo no existe, está vacío o está dañado.
+        """
+        if not archivo:
+            # Las instancias se comparten (mapa de identidad): no pisar cambios aún sin escribir
+            flush_writes()
+        repositorio = JsonRepository(archivo) if archivo else get_repository("productos")
         try:
-            if not Path(archivo).exists():
-                print(f" Archivo {archivo} no encontrado. Se iniciará inventario vacío.")
-                return
+            if not repositorio.exists():
+                print(f" Archivo {repositorio.path} no encontrado. Se iniciará inventario vacío.")
+                return []
 
-            with open(archivo, "r", encoding="utf-8") as f:
-                contenido = f.read().strip()
-                if not contenido:
-                    print(f" Archivo {archivo} vacío. Inventario vacío.")
-                    return
-                productos_cargados = json.loads(contenido)
-                for p in productos_cargados:
-                    producto = Producto(
-                        p["codigo"],
-                        p["nombre"],
-                        p["categoria"],
-                        p["descripcion"],
-                        p["precio"],
-                        p["cantidad"],
-                        p["fecha_vencimiento"]
-                    )
-                    self.agregar_producto(producto)
-            print(f" Productos cargados desde {archivo}.")
+            productos_cargados = repositorio.load_all()
+            if not productos_cargados:
+                print(f" Archivo {repositorio.path} vacío. Inventario vacío.")
+                return []
+            print(f" Productos cargados desde {repositorio.path}.")
+            return productos_cargados
         except (FileNotFoundError, json.JSONDecodeError):
-            print(f" Archivo {archivo} dañado o vacío. Se iniciará inventario vacío.")
\ No newline at end of file
+            print(f" Archivo {repositorio.path} dañado o vacío. Se iniciará inventario vacío.")
+            return []
+
+    def aplicar_productos(self, registros):
+        """Reemplazar los productos del inventario por los de ``registros`` (ver ``leer_productos``)."""
+        # Limpiar lista de productos e índices antes de recargar
+        self.productos.clear()
+        self._reindexar()
+        for p in registros:
+            self.agregar_producto(Producto.desde_dict(p))
@@ -0,0 +1,171 @@
+"""
+Vista columnar del inventario para agregados vectorizados.
+
+Guarda por columnas el código, precio, cantidad, umbral de stock bajo y
+vencimiento (número de día) de cada producto, en el mismo orden del
+inventario. Con NumPy instalado las columnas son arreglos y los agregados
+(valor total, agotados, stock bajo, ventanas de vencimiento) se calculan de
+forma vectorizada; sin NumPy se usan listas y recorridos en Python puro,
+con los mismos resultados.
+"""
+
+from datetime import date, datetime
+
+try:
+    import numpy as np
+except ImportError:  # NumPy es opcional
+    np = None
+
+from .Producto import Producto
+
+SIN_VENCIMIENTO = date.max.toordinal()  # Productos sin fecha de vencimiento válida
+_TIPOS = {"codigo": "int64", "precio": "float64", "cantidad": "int64",
+          "umbral": "int64", "vencimiento": "int32"}
+
+
+def dia_vencimiento(fecha):
+    """Número de día (ordinal) de una fecha "dd/mm/YYYY", o ``SIN_VENCIMIENTO``."""
+    try:
+        return datetime.strptime(str(fecha), "%d/%m/%Y").date().toordinal()
+    except ValueError:
+        return SIN_VENCIMIENTO
+
+
+class InventarioColumnar:
+    """Columnas de los productos de un inventario, sincronizadas con sus cambios.
+
+    El inventario agrega las filas (``agregar``) y las descarta al recargar
+    (``limpiar``); los cambios de cantidad, precio o vencimiento de un
+    producto llegan por ``Producto.suscribir`` y actualizan solo su fila.
+    """
+
+    CAPACIDAD_INICIAL = 64
+
+    def __init__(self, umbral_defecto=5, usar_numpy=True):
+        self.numpy = np is not None and usar_numpy
+        self.umbral_defecto = umbral_defecto
+        self._umbrales = {}  # codigo -> umbral propio del producto
+        self._productos = []
+        self._filas = {}  # id(producto) -> fila
+        self._columnas = {}
+        self.limpiar()
+        Producto.suscribir(self)
+
+    def __len__(self):
+        return len(self._productos)
+
+    def limpiar(self):
+        self._productos.clear()
+        self._filas.clear()
+        if self.numpy:
+            self._columnas = {nombre: np.zeros(self.CAPACIDAD_INICIAL, dtype=tipo)
+                              for nombre, tipo in _TIPOS.items()}
+        else:
+            self._columnas = {nombre: [] for nombre in _TIPOS}
+
+    def agregar(self, producto):
+        if id(producto) in self._filas:
+            return
+        fila = len(self._productos)
+        if self.numpy:
+            capacidad = len(self._columnas["codigo"])
+            if fila == capacidad:
+                for nombre, columna in self._columnas.items():
+                    ampliada = np.zeros(capacidad * 2, dtype=columna.dtype)
+                    ampliada[:capacidad] = columna
+                    self._columnas[nombre] = ampliada
+        else:
+            for columna in self._columnas.values():
+                columna.append(0)
+        self._productos.append(producto)
+        self._filas[id(producto)] = fila
+        self._escribir(fila, producto)
+
+    def _escribir(self, fila, producto):
+        codigo = int(producto.get_codigo())
+        self._columnas["codigo"][fila] = codigo
+        self._columnas["precio"][fila] = producto.get_precio()
+        self._columnas["cantidad"][fila] = producto.get_cantidad()
+        self._columnas["umbral"][fila] = self._umbrales.get(codigo, self.umbral_defecto)
+        self._columnas["vencimiento"][fila] = dia_vencimiento(producto.get_fecha_vencimiento())
+
+    def producto_modificado(self, producto):
+        """Notificación de ``Producto``: refrescar la fila del producto, si está en la vista."""
+        fila = self._filas.get(id(producto))
+        if fila is not None:
+            self._escribir(fila, producto)
+
+    # ---------- Umbrales ----------
+    def configurar_umbrales(self, umbrales, defecto=None):
+        """Fijar los umbrales por producto (``{codigo: umbral}``) y, opcionalmente, el de defecto."""
+        if defecto is not None:
+            self.umbral_defecto = int(defecto)
+        self._umbrales = {int(codigo): int(umbral) for codigo, umbral in umbrales.items()}
+        for fila, producto in enumerate(self._productos):
+            self._columnas["umbral"][fila] = self._umbrales.get(int(producto.get_codigo()),
+                                                                self.umbral_defecto)
+
+    def establecer_umbral(self, codigo, umbral):
+        codigo = int(codigo)
+        self._umbrales[codigo] = int(umbral)
+        for fila, producto in enumerate(self._productos):
+            if int(producto.get_codigo()) == codigo:
+                self._columnas["umbral"][fila] = int(umbral)
+
+    # ---------- Agregados ----------
+    def columna(self, nombre):
+        """Columna ``nombre`` con una entrada por producto (arreglo NumPy o lista)."""
+        return self._columnas[nombre][:len(self._productos)]
+
+    def valor_total(self):
+        """Suma de precio × cantidad de todo el inventario."""
+        precios, cantidades = self.columna("precio"), self.columna("cantidad")
+        if self.numpy:
+            return float(precios @ cantidades)
+        return sum(p * c for p, c in zip(precios, cantidades))
+
+    def contar_agotados(self):
+        cantidades = self.columna("cantidad")
+        if self.numpy:
+            return int(np.count_nonzero(cantidades == 0))
+        return sum(1 for c in cantidades if c == 0)
+
+    def _mascara_bajo_umbral(self, umbral, incluir_agotados):
+        cantidades = self.columna("cantidad")
+        limites = self.columna("umbral") if umbral is None else umbral
+        if self.numpy:
+            mascara = cantidades < limites
+            if not incluir_agotados:
+                mascara &= cantidades > 0
+            return mascara
+        if umbral is not None:
+            limites = [umbral] * len(cantidades)
+        return [c < u and (incluir_agotados or c > 0) for c, u in zip(cantidades, limites)]
+
+    def contar_bajo_umbral(self, umbral=None, incluir_agotados=True):
+        """Cantidad de productos con stock menor a ``umbral`` (o al umbral de cada producto)."""
+        mascara = self._mascara_bajo_umbral(umbral, incluir_agotados)
+        return int(np.count_nonzero(mascara)) if self.numpy else sum(mascara)
+
+    def bajo_umbral(self, umbral=None, incluir_agotados=True):
+        """Productos con stock menor a ``umbral`` (o a su propio umbral), en orden del inventario."""
+        mascara = self._mascara_bajo_umbral(umbral, incluir_agotados)
+        filas = np.flatnonzero(mascara).tolist() if self.numpy else [i for i, m in enumerate(mascara) if m]
+        return [self._productos[i] for i in filas]
+
+    def por_vencer(self, dias, hoy=None):
+        """Productos que vencen dentro de ``dias`` días, como ``(producto, dias_restantes)``.
+
+        Se excluyen los ya vencidos y los que no tienen fecha válida; el
+        resultado se ordena por días restantes (y por orden del inventario).
+        """
+        hoy = (hoy or date.today()).toordinal()
+        restantes = self.columna("vencimiento")
+        if self.numpy:
+            restantes = restantes.astype("int64") - hoy
+            filas = np.flatnonzero((restantes >= 0) & (restantes <= dias))
+            filas = filas[np.argsort(restantes[filas], kind="stable")].tolist()
+            return [(self._productos[i], int(restantes[i])) for i in filas]
+        ventana = [(v - hoy, i) for i, v in enumerate(restantes) if 0 <= v - hoy <= dias]
+        ventana.sort()
+        return [(self._productos[i], d) for d, i in ventana]
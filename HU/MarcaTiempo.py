@@ -0,0 +1,66 @@
+"""
+Marcas de tiempo de registros clínicos y movimientos de stock.
+
+En disco cada registro guarda su momento en formato ISO ordenable
+(``fecha_iso``, "YYYY-MM-DDTHH:MM:SS") junto a los campos legibles de
+siempre; en memoria se cachea como entero (segundos desde epoch) en la
+clave ``_marca``, que no se persiste. Los registros antiguos, sin
+``fecha_iso``, se interpretan a partir de sus campos "dd/mm/YYYY".
+"""
+
+from datetime import datetime
+
+FORMATO_ISO = "%Y-%m-%dT%H:%M:%S"
+_FORMATOS_LEGADOS = ("%d/%m/%Y %H:%M:%S", "%d/%m/%Y %H:%M", "%d/%m/%Y")
+CLAVE_CACHE = "_marca"
+
+
+def ahora():
+    """Fecha y hora actuales, sin microsegundos."""
+    return datetime.now().replace(microsecond=0)
+
+
+def a_marca(momento):
+    """Convertir un ``datetime`` (o una marca ya entera) a segundos desde epoch."""
+    return momento if isinstance(momento, int) else int(momento.timestamp())
+
+
+def desde_marca(marca):
+    return datetime.fromtimestamp(marca)
+
+
+def a_iso(momento):
+    return momento.strftime(FORMATO_ISO)
+
+
+def parsear(texto):
+    """Interpretar una fecha ISO o en formato heredado "dd/mm/YYYY[ HH:MM[:SS]]"."""
+    texto = str(texto).strip()
+    try:
+        return datetime.fromisoformat(texto)
+    except ValueError:
+        pass
+    for formato in _FORMATOS_LEGADOS:
+        try:
+            return datetime.strptime(texto, formato)
+        except ValueError:
+            continue
+    return None
+
+
+def marca_de(registro, legado=("fecha",)):
+    """Marca entera de un registro, calculada una sola vez y cacheada en el registro.
+
+    Se usa ``fecha_iso`` si existe; si no, la concatenación de los campos
+    ``legado``. Retorna 0 si la fecha no se puede interpretar.
+    """
+    marca = registro.get(CLAVE_CACHE)
+    if marca is None:
+        momento = None
+        if registro.get("fecha_iso"):
+            momento = parsear(registro["fecha_iso"])
+        if momento is None:
+            momento = parsear(" ".join(str(registro[c]) for c in legado if registro.get(c)))
+        marca = a_marca(momento) if momento else 0
+        registro[CLAVE_CACHE] = marca
+    return marca
@@ -0,0 +1,118 @@
+"""
+Métricas del dashboard mantenidas por deltas.
+
+Cada alta de producto y cada cambio de stock (ventas, pedidos, ajustes)
+actualiza solo la contribución de ese producto al valor total, a los
+contadores de agotados y stock bajo, en lugar de recorrer todo el
+inventario. Los vencimientos se consultan en el ``IndiceVencimientos`` del
+inventario.
+"""
+
+import heapq
+
+from .Producto import Producto
+
+
+class MetricasInventario:
+    """Almacén de métricas del inventario con suscriptores.
+
+    Los suscriptores (``suscribir``) reciben una llamada sin argumentos por
+    cada cambio y leen ``valores()`` cuando les convenga, de modo que varios
+    cambios seguidos (una venta con varias líneas) se pueden aplicar juntos.
+    """
+
+    def __init__(self, vencimientos, umbral_bajo=5, dias_vencimiento=60, limite=5):
+        self.vencimientos = vencimientos  # IndiceVencimientos del inventario
+        self.umbral_bajo = umbral_bajo
+        self.dias_vencimiento = dias_vencimiento
+        self.limite = limite  # Productos a mostrar en las listas de stock bajo y vencimientos
+        self._suscriptores = []
+        self.limpiar()
+        Producto.suscribir(self)
+
+    def limpiar(self):
+        self._productos = {}  # id(producto) -> producto
+        self._orden = {}      # id(producto) -> posición en el inventario
+        self._estado = {}     # id(producto) -> (precio, cantidad) contabilizados
+        self._bajos = set()   # ids con 0 < cantidad < umbral_bajo
+        self.valor_total = 0
+        self.agotados = 0
+        self._notificar()
+
+    def suscribir(self, callback):
+        self._suscriptores.append(callback)
+
+    def _notificar(self):
+        for callback in list(self._suscriptores):
+            callback()
+
+    # ---------- Eventos ----------
+    def agregar(self, producto):
+        clave = id(producto)
+        if clave in self._productos:
+            return
+        self._productos[clave] = producto
+        self._orden[clave] = len(self._orden)
+        self._contabilizar(clave, producto)
+        self._notificar()
+
+    def producto_modificado(self, producto):
+        """Notificación de ``Producto``: aplicar el delta del producto, si es del inventario."""
+        clave = id(producto)
+        if clave not in self._productos:
+            return
+        # Actualizar el índice antes de avisar a los suscriptores, sea cual sea
+        # el orden en que ``Producto`` notifica a sus observadores
+        self.vencimientos.producto_modificado(producto)
+        self._descontar(clave)
+        self._contabilizar(clave, producto)
+        self._notificar()
+
+    def _contabilizar(self, clave, producto):
+        precio, cantidad = producto.get_precio(), producto.get_cantidad()
+        self._estado[clave] = (precio, cantidad)
+        self.valor_total += precio * cantidad
+        if cantidad == 0:
+            self.agotados += 1
+        elif 0 < cantidad < self.umbral_bajo:
+            self._bajos.add(clave)
+
+    def _descontar(self, clave):
+        precio, cantidad = self._estado.pop(clave)
+        self.valor_total -= precio * cantidad
+        if cantidad == 0:
+            self.agotados -= 1
+        self._bajos.discard(clave)
+
+    # ---------- Consultas ----------
+    @property
+    def total_productos(self):
+        return len(self._productos)
+
+    @property
+    def bajo_stock(self):
+        return len(self._bajos)
+
+    def productos_bajo_stock(self):
+        """Primeros ``limite`` productos con stock bajo, en orden del inventario."""
+        claves = heapq.nsmallest(self.limite, self._bajos, key=self._orden.__getitem__)
+        return [self._productos[c] for c in claves]
+
+    def proximos_a_vencer(self, hoy=None):
+        """Primeros ``limite`` productos que vencen en los próximos ``dias_vencimiento`` días.
+
+        Retorna tuplas ``(producto, dias_restantes)`` ordenadas por días restantes.
+        """
+        return self.vencimientos.proximos_a_vencer(self.dias_vencimiento, hoy, self.limite)
+
+    def valores(self):
+        """Valores actuales de todas las métricas, comparables entre llamadas."""
+        return {
+            "total_productos": self.total_productos,
+            "agotados": self.agotados,
+            "bajo_stock": self.bajo_stock,
+            "valor_total": self.valor_total,
+            "productos_bajo_stock": tuple((p.get_nombre(), p.get_cantidad())
+                                          for p in self.productos_bajo_stock()),
+            "proximos_a_vencer": tuple((p.get_nombre(), dias) for p, dias in self.proximos_a_vencer()),
+        }
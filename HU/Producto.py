@@ -1,5 +1,39 @@
+import weakref
+
+
+class RegistroProductos:
+    """Mapa de identidad de productos: una instancia canónica por código.
+
+    Se recorre como la antigua lista global (``for p in Producto.productos``)
+    pero no crece con cada recarga del inventario y permite buscar por código
+    en O(1) con ``get``.
+    """
+
+    def __init__(self):
+        self._por_codigo = {}
+
+    def registrar(self, producto):
+        """Registrar ``producto`` como instancia canónica de su código."""
+        self._por_codigo[producto.codigo] = producto
+
+    def eliminar(self, codigo):
+        self._por_codigo.pop(codigo, None)
+
+    def get(self, codigo, defecto=None):
+        return self._por_codigo.get(codigo, defecto)
+
+    def __iter__(self):
+        return iter(list(self._por_codigo.values()))
+
+    def __len__(self):
+        return len(self._por_codigo)
+
+
 class Producto:
-    productos = []  # Lista de todos los productos instanciados para acceso global en consola
+    __slots__ = ("codigo", "nombre", "categoria", "descripcion", "precio", "cantidad", "disponibilidad",
+                 "fecha_vencimiento")
+    productos = RegistroProductos()  # Productos vigentes por código, para acceso global en consola
+    _observadores = weakref.WeakSet()  # Objetos con ``producto_modificado(producto)``
 
     def __init__(self, codigo, nombre, categoria, descripcion, precio, cantidad, fecha_vencimiento):
         self.codigo = codigo
@@ -10,8 +44,44 @@ class Producto:
         self.cantidad = cantidad
         self.disponibilidad = cantidad > 0
         self.fecha_vencimiento = fecha_vencimiento
-        # Registrar automáticamente cada instancia creada
-        Producto.productos.append(self)
+        # Registrar automáticamente cada instancia creada (reemplaza a la anterior con el mismo código)
+        Producto.productos.registrar(self)
+
+    @classmethod
+    def desde_dict(cls, data):
+        """Obtener el producto de un registro guardado, reutilizando la instancia canónica.
+
+        Si ya existe un producto con ese código se actualizan sus datos en el
+        lugar, de modo que las referencias existentes (ventas, carritos) siguen
+        apuntando al mismo objeto tras recargar el inventario.
+        """
+        producto = cls.productos.get(data["codigo"])
+        if producto is None:
+            return cls(data["codigo"], data["nombre"], data["categoria"], data["descripcion"],
+                       data["precio"], data["cantidad"], data["fecha_vencimiento"])
+        producto.nombre = data["nombre"]
+        producto.categoria = data["categoria"]
+        producto.descripcion = data["descripcion"]
+        producto.precio = data["precio"]
+        producto.fecha_vencimiento = data["fecha_vencimiento"]
+        producto.set_cantidad(data["cantidad"])  # Avisa a los observadores con todos los datos ya cambiados
+        return producto
+
+    @classmethod
+    def suscribir(cls, observador):
+        """Avisar a ``observador.producto_modificado(producto)`` cuando cambien los datos de un producto.
+
+        Se avisa en cada cambio de stock y cuando ``desde_dict`` actualiza una
+        instancia existente (nombre, categoría, precio, etc.).
+
+        Se guarda una referencia débil: la suscripción termina cuando el
+        observador deja de usarse.
+        """
+        cls._observadores.add(observador)
+
+    def _notificar(self):
+        for observador in list(Producto._observadores):
+            observador.producto_modificado(self)
 
     # Getters
     def get_codigo(self):
@@ -43,6 +113,7 @@ class Producto:
         self.cantidad = cantidad
         # Actualizar disponibilidad automáticamente
         self.disponibilidad = cantidad > 0
+        self._notificar()
 
     def set_disponibilidad(self, disponibilidad):
         """Establecer manualmente la disponibilidad del producto."""
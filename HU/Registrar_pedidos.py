@@ -4,16 +4,21 @@ Módulo de registro de pedidos (orientado a objetos).
 - Gestiona pedidos y actualiza stock.
 """
 
+import json
 import tkinter as tk
 from tkinter import messagebox
 from datetime import datetime
 from typing import List, Dict
 
+from db import get_repository, next_id, JsonRepository
 from HU.Inventario import Inventario, Producto
 
 
 class Pedido:
-    def __init__(self, cliente: str, producto: Producto, cantidad: int):
+    __slots__ = ("id", "cliente", "producto", "cantidad", "fecha", "estado")
+
+    def __init__(self, cliente: str, producto: Producto, cantidad: int, id: int = None):
+        self.id = id
         self.cliente = cliente
         self.producto = producto
         self.cantidad = cantidad
@@ -22,6 +27,7 @@ class Pedido:
 
     def to_dict(self) -> Dict:
         return {
+            "id": self.id,
             "cliente": self.cliente,
             "producto": self.producto.get_nombre(),
             "cantidad": self.cantidad,
@@ -31,14 +37,13 @@ class Pedido:
 
 
 class GestorPedidos:
-    def __init__(self, archivo_pedidos="db/pedidos.json"):
+    def __init__(self, archivo_pedidos=None):
         # Inicializar inventario
         self.inventario = Inventario()
         self.inventario.cargar_desde_json()
-        # Archivo para persistir pedidos
-        from pathlib import Path
+        # Repositorio para persistir pedidos (archivo JSON explícito o motor configurado)
         self.archivo_pedidos = archivo_pedidos
-        Path(self.archivo_pedidos).parent.mkdir(parents=True, exist_ok=True)
+        self.repositorio = JsonRepository(archivo_pedidos) if archivo_pedidos else get_repository("pedidos")
         # Cargar pedidos existentes
         self.pedidos: List[Pedido] = []
         self._cargar_pedidos()
@@ -53,7 +58,7 @@ class GestorPedidos:
         if cantidad <= 0:
             raise ValueError("Cantidad inválida")
         # Para pedidos de aprovisionamiento no se descuenta stock al registrar
-        pedido = Pedido(cliente, producto, cantidad)
+        pedido = Pedido(cliente, producto, cantidad, id=next_id("pedidos", seed=self._ultimo_id_guardado))
         self.pedidos.append(pedido)
         # Guardar en disco
         self._guardar_pedidos()
@@ -93,25 +98,29 @@ class GestorPedidos:
     
     # -------- Persistencia de pedidos --------
     def _guardar_pedidos(self):
-        import json
-        with open(self.archivo_pedidos, "w", encoding="utf-8") as f:
-            json.dump([p.to_dict() for p in self.pedidos], f, indent=4, ensure_ascii=False)
+        self.repositorio.save_all([p.to_dict() for p in self.pedidos])
     
+    def _ultimo_id_guardado(self) -> int:
+        # Los pedidos guardados sin id se numeran por su posición (ver ``_cargar_pedidos``)
+        ultimo = max((p.id for p in self.pedidos), default=0)
+        try:
+            for posicion, d in enumerate(self.repositorio.iter_all(), 1):
+                ultimo = max(ultimo, d.get("id", posicion))
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass  # Como en ``_cargar_pedidos``: un archivo dañado no impide registrar
+        return ultimo
+
     def _cargar_pedidos(self):
-        import json
-        from pathlib import Path
-        if not Path(self.archivo_pedidos).exists():
-            return
         try:
-            with open(self.archivo_pedidos, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            for d in data:
+            data = self.repositorio.load_all()
+            # Los pedidos anteriores a los ids reciben su posición en el archivo
+            for posicion, d in enumerate(data, 1):
                 # Reconstruir pedido
                 nombre_producto = d.get("producto")
                 producto = next((p for p in self.inventario.productos if p.get_nombre() == nombre_producto), None)
                 if not producto:
                     continue
-                pedido = Pedido(d.get("cliente"), producto, d.get("cantidad"))
+                pedido = Pedido(d.get("cliente"), producto, d.get("cantidad"), id=d.get("id", posicion))
                 pedido.fecha = d.get("fecha")
                 pedido.estado = d.get("estado", pedido.estado)
                 self.pedidos.append(pedido)
@@ -182,9 +191,9 @@ class RegistroPedidosGUI:
         ventana.geometry("600x350")
         texto = tk.Text(ventana, width=85, height=18)
         texto.pack()
-        for i, p in enumerate(pedidos, 1):
+        for p in pedidos:
             d = p.to_dict()
-            texto.insert(tk.END, f"{i}. {d['cliente']} - {d['producto']} x{d['cantidad']} ({d['fecha']})\n")
+            texto.insert(tk.END, f"{d['id']}. {d['cliente']} - {d['producto']} x{d['cantidad']} ({d['fecha']})\n")
         texto.config(state='disabled')
 
 
@@ -0,0 +1,206 @@
+"""
+Motor de reglas de recomendación por palabras clave.
+
+Las reglas se leen de ``reglas_recomendacion.json`` (ver ``db``): cada una
+indica una fuente ("diagnosticos" o "productos"), las palabras que la
+disparan y la recomendación que produce. Una "palabra" puede ser también una
+frase ("control dental"). Todas las de una fuente se compilan en un único
+autómata Aho-Corasick, que encuentra en una sola pasada por texto cuáles
+aparecen dentro de él.
+
+Por cliente se guardan los textos normalizados ya vistos en sus diagnósticos
+y productos comprados y las reglas que ya se cumplieron. Cada evaluación solo
+recorre los registros nuevos y, de ellos, los textos que el cliente no tenía
+(un mismo producto comprado muchas veces se analiza una vez): O(registros
+nuevos), sin volver a unir ni recorrer todo el historial.
+"""
+
+import re
+from collections import deque
+
+from db import get_repository
+from .HistoriaClinica import HistoriaClinica
+from .IndiceBusqueda import normalizar_texto
+from .Venta import Venta
+
+FUENTES = ("diagnosticos", "productos")
+
+# Reglas con las que se crea el archivo si no existe
+REGLAS_PREDETERMINADAS = [
+    {"fuente": "diagnosticos", "palabras": ["desparasit"],
+     "recomendacion": "Mantener esquema regular de desparasitación cada 3-6 meses"},
+    {"fuente": "diagnosticos", "palabras": ["vacun", "inmuniz"],
+     "recomendacion": "Verificar calendario de vacunación y mantener al día"},
+    {"fuente": "diagnosticos", "palabras": ["dental", "diente"],
+     "recomendacion": "Implementar rutina de higiene dental regular"},
+    {"fuente": "productos", "palabras": ["vitamina", "suplemento"],
+     "recomendacion": "Continuar con suplementación vitamínica según indicaciones"},
+    {"fuente": "productos", "palabras": ["alimento", "comida"],
+     "recomendacion": "Mantener alimentación balanceada y de calidad"},
+]
+
+_PALABRA = re.compile(r"\w+")
+
+
+def normalizar_frase(texto):
+    """``texto`` sin mayúsculas ni tildes, con sus palabras separadas por un solo espacio."""
+    return " ".join(_PALABRA.findall(normalizar_texto(texto)))
+
+
+class AutomataPalabras:
+    """Autómata Aho-Corasick: todas las apariciones de un conjunto de patrones en un texto.
+
+    Cada patrón lleva asociado un valor; ``buscar`` retorna los valores de los
+    patrones que aparecen en el texto, en tiempo proporcional al largo del
+    texto (más las coincidencias), sin importar cuántos patrones haya.
+    """
+
+    __slots__ = ("_transiciones", "_fallo", "_salidas")
+
+    def __init__(self, patrones):
+        """``patrones``: pares ``(texto, valor)``; los textos no vacíos se usan tal cual."""
+        self._transiciones = [{}]
+        self._salidas = [set()]
+        for texto, valor in patrones:
+            if not texto:
+                continue
+            estado = 0
+            for caracter in texto:
+                siguiente = self._transiciones[estado].get(caracter)
+                if siguiente is None:
+                    siguiente = len(self._transiciones)
+                    self._transiciones[estado][caracter] = siguiente
+                    self._transiciones.append({})
+                    self._salidas.append(set())
+                estado = siguiente
+            self._salidas[estado].add(valor)
+
+        # Enlaces de fallo por niveles: el sufijo propio más largo que también es prefijo de algún patrón
+        self._fallo = [0] * len(self._transiciones)
+        pendientes = deque(self._transiciones[0].values())
+        while pendientes:
+            estado = pendientes.popleft()
+            for caracter, siguiente in self._transiciones[estado].items():
+                pendientes.append(siguiente)
+                fallo = self._fallo[estado]
+                while fallo and caracter not in self._transiciones[fallo]:
+                    fallo = self._fallo[fallo]
+                destino = self._transiciones[fallo].get(caracter, 0)
+                self._fallo[siguiente] = destino if destino != siguiente else 0
+                self._salidas[siguiente] |= self._salidas[self._fallo[siguiente]]
+
+    def buscar(self, texto):
+        encontrados = set()
+        transiciones, fallo, salidas = self._transiciones, self._fallo, self._salidas
+        estado = 0
+        for caracter in texto:
+            while estado and caracter not in transiciones[estado]:
+                estado = fallo[estado]
+            estado = transiciones[estado].get(caracter, 0)
+            if salidas[estado]:
+                encontrados |= salidas[estado]
+        return encontrados
+
+
+class _EstadoCliente:
+    """Lo ya evaluado de un cliente."""
+
+    __slots__ = ("textos", "reglas", "registros", "ventas", "ultima_marca")
+
+    def __init__(self):
+        self.textos = {fuente: set() for fuente in FUENTES}  # Textos normalizados ya analizados
+        self.reglas = set()    # Índices de las reglas ya cumplidas
+        # id(historial) -> (historial, registros ya procesados); la referencia evita que el id se reutilice
+        self.registros = {}
+        self.ventas = (0, None)  # (ventas procesadas, última venta procesada)
+        self.ultima_marca = 0    # Marca del registro clínico más reciente (0 = ninguno legible)
+
+
+class MotorReglas:
+    """Reglas de recomendación compiladas, con el estado incremental de cada cliente.
+
+    Una venta anulada o modificada (``Venta.suscribir``) descarta el estado
+    de su cliente, que se recalcula completo en la siguiente evaluación.
+    """
+
+    def __init__(self, reglas):
+        self.reglas = []
+        for regla in reglas:
+            if regla.get("fuente") not in FUENTES:
+                raise ValueError(f"Fuente de regla desconocida: {regla.get('fuente')!r}")
+            self.reglas.append({"fuente": regla["fuente"], "recomendacion": regla["recomendacion"],
+                                "palabras": [normalizar_frase(p) for p in regla.get("palabras", [])]})
+        self._automatas = {
+            fuente: AutomataPalabras((palabra, indice)
+                                     for indice, regla in enumerate(self.reglas) if regla["fuente"] == fuente
+                                     for palabra in regla["palabras"])
+            for fuente in FUENTES
+        }
+        self._estados = {}  # cliente normalizado -> _EstadoCliente
+        Venta.suscribir(self)
+
+    @classmethod
+    def cargar(cls):
+        """Compilar las reglas guardadas (creando el archivo con las predeterminadas si no existe)."""
+        repositorio = get_repository("reglas_recomendacion")
+        reglas = repositorio.load_document(None)
+        if reglas is None:
+            reglas = REGLAS_PREDETERMINADAS
+            repositorio.save_document(reglas)
+        return cls(reglas)
+
+    # ---------- Eventos de ``Venta`` ----------
+    def venta_agregada(self, venta):
+        pass  # Se toma en la próxima evaluación del cliente
+
+    def venta_quitada(self, venta):
+        self._estados.pop(normalizar_texto(venta.cliente), None)
+
+    # ---------- Evaluación ----------
+    def _agregar_texto(self, estado, fuente, texto):
+        # El texto completo, no palabra por palabra: así también se encuentran las frases
+        texto = normalizar_frase(texto)
+        vistos = estado.textos[fuente]
+        if texto not in vistos:
+            vistos.add(texto)
+            estado.reglas |= self._automatas[fuente].buscar(texto)
+
+    def _actualizar(self, clave, historiales, ventas):
+        estado = self._estados.get(clave)
+        ids_historiales = {id(historial) for historial in historiales}
+        vistas, ultima = estado.ventas if estado else (0, None)
+        if (estado is None or not estado.registros.keys() <= ids_historiales
+                or len(ventas) < vistas or (vistas and ventas[vistas - 1] is not ultima)
+                or any(len(h.get_registros()) < estado.registros.get(id(h), (h, 0))[1] for h in historiales)):
+            # Primera evaluación, o los datos del cliente cambiaron de otra forma que por agregados
+            estado = self._estados[clave] = _EstadoCliente()
+            vistas = 0
+
+        for historial in historiales:
+            registros = historial.get_registros()
+            _, procesados = estado.registros.get(id(historial), (historial, 0))
+            for registro in registros[procesados:]:
+                self._agregar_texto(estado, "diagnosticos", registro.get("diagnostico", ""))
+                estado.ultima_marca = max(estado.ultima_marca, HistoriaClinica.marca_registro(registro))
+            estado.registros[id(historial)] = (historial, len(registros))
+
+        for venta in ventas[vistas:]:
+            for producto, _ in venta.productos_vendidos:
+                self._agregar_texto(estado, "productos", producto.get_nombre())
+        if ventas:
+            estado.ventas = (len(ventas), ventas[-1])
+        return estado
+
+    def evaluar(self, clave, historiales, ventas):
+        """Recomendaciones de las reglas que cumple el cliente ``clave``, en el orden del archivo.
+
+        ``historiales`` y ``ventas`` son todos los del cliente; solo se
+        procesan los registros y ventas nuevos desde la evaluación anterior.
+        """
+        estado = self._actualizar(clave, historiales, ventas)
+        return [self.reglas[indice]["recomendacion"] for indice in sorted(estado.reglas)]
+
+    def ultima_marca(self, clave):
+        """Marca (segundos desde epoch) de la consulta más reciente vista en ``evaluar``, o 0."""
+        estado = self._estados.get(clave)
+        return estado.ultima_marca if estado else 0
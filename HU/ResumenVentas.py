@@ -0,0 +1,220 @@
+"""
+Resúmenes materializados de ventas para los reportes.
+
+Se mantienen cuatro agregados: por día y producto, por día y forma de pago,
+por día y cliente, y por cliente. Cada venta confirmada, modificada o anulada actualiza solo
+su aporte (``Venta.suscribir``), así que un reporte recorre únicamente los
+días o clientes que devuelve, no todas las ventas. Los agregados se pueden
+reconstruir desde ``ventas.json`` en una sola pasada por streaming.
+"""
+
+import heapq
+from bisect import bisect_left, bisect_right, insort
+from datetime import date
+
+from db import get_repository
+from .IndiceBusqueda import normalizar_texto
+from .Venta import Venta
+
+
+class ResumenVentas:
+    """Agregados de ventas por día × producto, día × forma de pago, día × cliente y cliente.
+
+    Los importes usan el precio unitario de cada línea al momento de la venta.
+    ``version`` aumenta con cada cambio, de modo que quien reconstruya en
+    segundo plano pueda saber si llegaron ventas mientras tanto.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self.limpiar()
+        Venta.suscribir(self)
+
+    def limpiar(self):
+        self._dias = []          # Días (ordinales) con ventas, ordenados
+        self._totales_dia = {}   # día -> [ventas, importe]
+        self._productos_dia = {} # día -> {codigo: [unidades, importe]}
+        self._pagos_dia = {}     # día -> {forma de pago: [ventas, importe]}
+        self._clientes_dia = {}  # día -> {cliente normalizado: [ventas, unidades, importe]}
+        self._clientes = {}      # cliente normalizado -> {'nombre', 'ventas', 'unidades', 'importe', 'ultima'}
+        self._dias_cliente = {}  # cliente normalizado -> días con ventas (para recalcular 'ultima' al anular)
+        self._nombres = {}       # codigo -> último nombre de producto visto
+        self._claves = {}        # nombre de cliente tal como se escribió -> clave normalizada
+        self.version += 1
+
+    # ---------- Aportes ----------
+    @staticmethod
+    def _aporte_venta(venta):
+        lineas = [(p.get_codigo(), p.get_nombre(), cantidad, precio) for p, cantidad, precio in venta.lineas()]
+        return venta.fecha_venta.date().toordinal(), venta.cliente, venta.forma_pago, lineas
+
+    @staticmethod
+    def _aporte_registro(registro):
+        lineas = [(linea["codigo"], linea.get("nombre", ""), linea["cantidad"], linea.get("precio_unitario", 0))
+                  for linea in registro.get("productos", [])]
+        # "YYYY-MM-DD HH:MM:SS": basta con la parte de la fecha
+        dia = date.fromisoformat(str(registro["fecha_venta"])[:10]).toordinal()
+        return dia, registro["cliente"], registro["forma_pago"], lineas
+
+    def _aplicar(self, aporte, signo):
+        dia, cliente, forma_pago, lineas = aporte
+        importe = sum(cantidad * precio for _, _, cantidad, precio in lineas)
+        unidades = sum(cantidad for _, _, cantidad, _ in lineas)
+
+        total = self._totales_dia.get(dia)
+        if total is None:
+            total = self._totales_dia[dia] = [0, 0]
+            self._productos_dia[dia] = {}
+            self._pagos_dia[dia] = {}
+            self._clientes_dia[dia] = {}
+            insort(self._dias, dia)
+        total[0] += signo
+        total[1] += signo * importe
+
+        productos = self._productos_dia[dia]
+        for codigo, nombre, cantidad, precio in lineas:
+            acumulado = productos.setdefault(codigo, [0, 0])
+            acumulado[0] += signo * cantidad
+            acumulado[1] += signo * cantidad * precio
+            if not acumulado[0]:
+                del productos[codigo]
+            if signo > 0 and nombre:
+                self._nombres[codigo] = nombre
+
+        pagos = self._pagos_dia[dia]
+        acumulado = pagos.setdefault(forma_pago, [0, 0])
+        acumulado[0] += signo
+        acumulado[1] += signo * importe
+        if not acumulado[0]:
+            del pagos[forma_pago]
+
+        clave = self._claves.get(cliente)
+        if clave is None:
+            clave = self._claves[cliente] = normalizar_texto(cliente)
+        clientes = self._clientes_dia[dia]
+        acumulado = clientes.get(clave)
+        if acumulado is None:
+            acumulado = clientes[clave] = [0, 0, 0]
+            self._dias_cliente.setdefault(clave, set()).add(dia)
+        acumulado[0] += signo
+        acumulado[1] += signo * unidades
+        acumulado[2] += signo * importe
+        dias_cliente = self._dias_cliente[clave]
+        if not acumulado[0]:
+            del clientes[clave]
+            dias_cliente.discard(dia)
+
+        if not total[0]:
+            del self._totales_dia[dia], self._productos_dia[dia], self._pagos_dia[dia], self._clientes_dia[dia]
+            del self._dias[bisect_left(self._dias, dia)]
+
+        datos = self._clientes.get(clave)
+        if datos is None:
+            datos = self._clientes[clave] = {"nombre": cliente, "ventas": 0, "unidades": 0,
+                                             "importe": 0, "ultima": dia}
+        datos["ventas"] += signo
+        datos["unidades"] += signo * unidades
+        datos["importe"] += signo * importe
+        if signo > 0:
+            datos["ultima"] = max(datos["ultima"], dia)
+        elif datos["ultima"] == dia and dia not in dias_cliente and dias_cliente:
+            # Se quitó la última compra del cliente en su día más reciente
+            datos["ultima"] = max(dias_cliente)
+        if not datos["ventas"]:
+            del self._clientes[clave], self._dias_cliente[clave]
+        self.version += 1
+
+    # ---------- Eventos de ``Venta`` ----------
+    def venta_agregada(self, venta):
+        self._aplicar(self._aporte_venta(venta), 1)
+
+    def venta_quitada(self, venta):
+        self._aplicar(self._aporte_venta(venta), -1)
+
+    def reconstruir(self, registros=None):
+        """Recalcular todo desde los registros de ventas (por defecto, los guardados).
+
+        ``registros`` puede ser cualquier iterable de dicts (por ejemplo, un
+        generador): se recorre una sola vez sin materializarlo.
+        """
+        if registros is None:
+            registros = get_repository("ventas").iter_all()
+        self.limpiar()
+        for registro in registros:
+            self._aplicar(self._aporte_registro(registro), 1)
+
+    # ---------- Consultas ----------
+    def _rango(self, desde=None, hasta=None):
+        """Días con ventas entre ``desde`` y ``hasta`` (``date``, ambos incluidos)."""
+        inicio = bisect_left(self._dias, desde.toordinal()) if desde else 0
+        fin = bisect_right(self._dias, hasta.toordinal()) if hasta else len(self._dias)
+        return self._dias[inicio:fin]
+
+    def ventas_por_dia(self, desde=None, hasta=None):
+        """Tuplas ``(fecha, ventas, importe)`` por día, en orden cronológico."""
+        return [(date.fromordinal(dia), *self._totales_dia[dia]) for dia in self._rango(desde, hasta)]
+
+    def totales(self, desde=None, hasta=None):
+        """``(ventas, importe)`` del rango."""
+        ventas = importe = 0
+        for dia in self._rango(desde, hasta):
+            ventas += self._totales_dia[dia][0]
+            importe += self._totales_dia[dia][1]
+        return ventas, importe
+
+    def ventas_por_producto(self, desde=None, hasta=None, limite=None):
+        """Tuplas ``(codigo, nombre, unidades, importe)`` del rango, de mayor a menor importe."""
+        acumulado = {}
+        for dia in self._rango(desde, hasta):
+            for codigo, (unidades, importe) in self._productos_dia[dia].items():
+                suma = acumulado.setdefault(codigo, [0, 0])
+                suma[0] += unidades
+                suma[1] += importe
+        filas = [(codigo, self._nombres.get(codigo, ""), unidades, importe)
+                 for codigo, (unidades, importe) in acumulado.items()]
+        orden = lambda fila: (fila[3], fila[2])
+        return heapq.nlargest(limite, filas, key=orden) if limite else sorted(filas, key=orden, reverse=True)
+
+    def ventas_por_forma_pago(self, desde=None, hasta=None):
+        """Tuplas ``(forma_pago, ventas, importe)`` del rango, de mayor a menor importe."""
+        acumulado = {}
+        for dia in self._rango(desde, hasta):
+            for forma, (ventas, importe) in self._pagos_dia[dia].items():
+                suma = acumulado.setdefault(forma, [0, 0])
+                suma[0] += ventas
+                suma[1] += importe
+        return sorted(((forma, v, i) for forma, (v, i) in acumulado.items()), key=lambda f: f[2], reverse=True)
+
+    def cliente(self, nombre):
+        """Resumen de un cliente (sin distinguir mayúsculas ni tildes), o ``None``.
+
+        Retorna un dict con 'nombre', 'ventas', 'unidades', 'importe' y
+        'ultima' (fecha de la última compra).
+        """
+        datos = self._clientes.get(normalizar_texto(nombre))
+        if datos is None:
+            return None
+        return dict(datos, ultima=date.fromordinal(datos["ultima"]))
+
+    def mejores_clientes(self, limite=10, desde=None, hasta=None):
+        """Los ``limite`` clientes con mayor importe comprado en el rango, como dicts (ver ``cliente``).
+
+        Las cifras y 'ultima' se limitan a las ventas del rango; sin límites
+        se usa directamente el resumen histórico de cada cliente.
+        """
+        if desde is None and hasta is None:
+            mejores = heapq.nlargest(limite, self._clientes.values(), key=lambda d: d["importe"])
+            return [dict(d, ultima=date.fromordinal(d["ultima"])) for d in mejores]
+        acumulado = {}
+        for dia in self._rango(desde, hasta):
+            for clave, (ventas, unidades, importe) in self._clientes_dia[dia].items():
+                datos = acumulado.get(clave)
+                if datos is None:
+                    datos = acumulado[clave] = {"nombre": self._clientes[clave]["nombre"], "ventas": 0,
+                                                "unidades": 0, "importe": 0}
+                datos["ventas"] += ventas
+                datos["unidades"] += unidades
+                datos["importe"] += importe
+                datos["ultima"] = dia  # Los días se recorren en orden
+        mejores = heapq.nlargest(limite, acumulado.values(), key=lambda d: d["importe"])
+        return [dict(d, ultima=date.fromordinal(d["ultima"])) for d in mejores]
@@ -1,29 +1,231 @@
 
+import gc
 import json
-from datetime import datetime
+import time
+import weakref
+from bisect import bisect_left, bisect_right
+from datetime import datetime, time as hora
+
+from db import get_repository, next_id, JsonRepository
+from HU.IndiceBusqueda import normalizar_texto
 from HU.Producto import Producto
 
+
+class IndiceTemporal:
+    """Ventas ordenadas por ``fecha_venta`` (las de igual fecha, en orden de registro)."""
+
+    __slots__ = ("fechas", "ventas")
+
+    def __init__(self, ventas=()):
+        """``ventas`` debe venir ya ordenada por fecha."""
+        self.ventas = list(ventas)
+        self.fechas = [venta.fecha_venta for venta in self.ventas]
+
+    def __len__(self):
+        return len(self.ventas)
+
+    def agregar(self, venta):
+        # Las ventas suelen llegar en orden cronológico: la inserción cae al final
+        posicion = bisect_right(self.fechas, venta.fecha_venta)
+        self.fechas.insert(posicion, venta.fecha_venta)
+        self.ventas.insert(posicion, venta)
+
+    def quitar(self, venta):
+        posicion = bisect_left(self.fechas, venta.fecha_venta)
+        while posicion < len(self.ventas) and self.ventas[posicion] is not venta:
+            posicion += 1
+        if posicion < len(self.ventas):
+            del self.fechas[posicion], self.ventas[posicion]
+
+    def rango(self, desde=None, hasta=None):
+        """Ventas con ``desde <= fecha_venta <= hasta``, en orden cronológico."""
+        inicio = bisect_left(self.fechas, desde) if desde is not None else 0
+        fin = bisect_right(self.fechas, hasta) if hasta is not None else len(self.fechas)
+        return self.ventas[inicio:fin]
+
+
 class Venta:
+    __slots__ = ("id", "cliente", "productos_vendidos", "precios", "forma_pago", "fecha_venta")
     ventas = []
+    # Resultado de la última carga: {"ventas": cantidad, "segundos": duración}
+    estadisticas_carga = {"ventas": 0, "segundos": 0.0}
+    REPORTE_CARGA_MINIMO = 100_000  # Informar el tiempo de carga a partir de esta cantidad
+    _observadores = weakref.WeakSet()  # Objetos con ``venta_agregada(venta)`` y ``venta_quitada(venta)``
+    # Índices por fecha: de todas las ventas y por cliente normalizado
+    _por_fecha = IndiceTemporal()
+    _por_cliente = {}
+    _claves_cliente = {}  # nombre tal como se escribió -> nombre normalizado
+    _indexar_al_crear = True  # Falso durante una carga masiva (se indexa todo al final)
+    _por_id = {}  # id -> venta
 
-    def __init__(self, cliente, productos_vendidos, forma_pago, fecha_venta=None):
+    def __init__(self, cliente, productos_vendidos, forma_pago, fecha_venta=None, descontar_stock=True, id=None,
+                 precios=None):
+        self.id = Venta._nuevo_id() if id is None else id
         self.cliente = cliente
         self.productos_vendidos = productos_vendidos  # Lista de tuplas (Producto, cantidad)
+        # Precio unitario de cada línea al momento de la venta (por defecto, el precio actual)
+        self.precios = Venta._precios_actuales(productos_vendidos) if precios is None else list(precios)
         self.forma_pago = forma_pago
         self.fecha_venta = fecha_venta or datetime.now()
         Venta.ventas.append(self)
-        self.actualizar_inventario()
+        if Venta._indexar_al_crear:
+            Venta._indexar(self)
+        if descontar_stock:
+            self.actualizar_inventario()
+
+    @staticmethod
+    def _precios_actuales(productos_vendidos):
+        return [producto.get_precio() for producto, _ in productos_vendidos]
+
+    def lineas(self):
+        """Tuplas ``(producto, cantidad, precio unitario)`` con el precio cobrado en la venta."""
+        return [(producto, cantidad, precio)
+                for (producto, cantidad), precio in zip(self.productos_vendidos, self.precios)]
 
     def actualizar_inventario(self):
         for producto, cantidad in self.productos_vendidos:
             producto.set_cantidad(producto.get_cantidad() - cantidad)
             producto.set_disponibilidad(producto.get_cantidad() > 0)
 
+    # ---------- Identificadores ----------
+    @classmethod
+    def _nuevo_id(cls):
+        """Siguiente id de la secuencia persistente de ventas (única entre procesos)."""
+        return next_id("ventas", seed=cls._ultimo_id_guardado)
+
+    @staticmethod
+    def _ultimo_id_guardado():
+        # Los registros anteriores a los ids se numeran por su posición (ver ``cargar_desde_json``)
+        ultimo = 0
+        try:
+            for posicion, registro in enumerate(get_repository("ventas").iter_all(), 1):
+                ultimo = max(ultimo, registro.get("id", posicion))
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+        return ultimo
+
+    @classmethod
+    def por_id(cls, id_venta):
+        """Venta con ese id, o ``None``: O(1)."""
+        if len(cls._por_id) != len(cls.ventas):
+            # La lista se modificó por fuera de Venta
+            cls._reindexar()
+        return cls._por_id.get(id_venta)
+
+    # ---------- Índices por fecha ----------
+    @classmethod
+    def _clave_cliente(cls, nombre):
+        clave = cls._claves_cliente.get(nombre)
+        if clave is None:
+            clave = cls._claves_cliente[nombre] = normalizar_texto(nombre)
+        return clave
+
+    @classmethod
+    def _indexar(cls, venta):
+        cls._por_id[venta.id] = venta
+        cls._por_fecha.agregar(venta)
+        clave = cls._clave_cliente(venta.cliente)
+        indice = cls._por_cliente.get(clave)
+        if indice is None:
+            indice = cls._por_cliente[clave] = IndiceTemporal()
+        indice.agregar(venta)
+
+    @classmethod
+    def _desindexar(cls, venta):
+        cls._por_id.pop(venta.id, None)
+        cls._por_fecha.quitar(venta)
+        indice = cls._por_cliente.get(cls._clave_cliente(venta.cliente))
+        if indice is not None:
+            indice.quitar(venta)
+
+    @classmethod
+    def _reindexar(cls):
+        """Reconstruir los índices de una vez (ordenar datos casi ordenados es casi lineal)."""
+        ordenadas = sorted(cls.ventas, key=lambda venta: venta.fecha_venta)
+        grupos = {}
+        for venta in ordenadas:
+            grupos.setdefault(cls._clave_cliente(venta.cliente), []).append(venta)
+        cls._por_id = {venta.id: venta for venta in cls.ventas}
+        cls._por_fecha = IndiceTemporal(ordenadas)
+        cls._por_cliente = {clave: IndiceTemporal(ventas) for clave, ventas in grupos.items()}
+
+    @staticmethod
+    def _limite(valor, final):
+        """Convertir una fecha (``date``) en el primer o último instante de ese día."""
+        if valor is None or isinstance(valor, datetime):
+            return valor
+        return datetime.combine(valor, hora.max if final else hora.min)
+
+    @classmethod
+    def en_rango(cls, desde=None, hasta=None, cliente=None):
+        """Ventas entre ``desde`` y ``hasta`` (incluidos), en orden cronológico.
+
+        Los límites pueden ser ``date`` (día completo) o ``datetime``; ``None``
+        deja el extremo abierto. Con ``cliente`` solo se consideran las ventas
+        de ese cliente (sin distinguir mayúsculas ni tildes). Los extremos se
+        ubican por búsqueda binaria: O(log n + k).
+        """
+        if len(cls._por_fecha) != len(cls.ventas):
+            # La lista se modificó por fuera de Venta
+            cls._reindexar()
+        if cliente is None:
+            indice = cls._por_fecha
+        else:
+            indice = cls._por_cliente.get(cls._clave_cliente(cliente))
+            if indice is None:
+                return []
+        return indice.rango(cls._limite(desde, False), cls._limite(hasta, True))
+
+    @classmethod
+    def suscribir(cls, observador):
+        """Avisar a ``observador`` de cada venta confirmada (``venta_agregada``) o anulada (``venta_quitada``).
+
+        Una modificación se avisa como la baja de la venta anterior y el alta
+        de la nueva. Cargar las ventas guardadas no genera avisos. Se guarda
+        una referencia débil, como en ``Producto.suscribir``.
+        """
+        cls._observadores.add(observador)
+
+    @classmethod
+    def _notificar(cls, evento, venta):
+        for observador in list(cls._observadores):
+            getattr(observador, evento)(venta)
+
+    def anular(self):
+        """Quitar la venta de ``ventas`` y devolver su stock al inventario.
+
+        Lanza ``ValueError`` si la venta ya no está registrada.
+        """
+        Venta.ventas.remove(self)
+        Venta._desindexar(self)
+        for producto, cantidad in self.productos_vendidos:
+            producto.set_cantidad(producto.get_cantidad() + cantidad)
+            producto.set_disponibilidad(True)
+        Venta._notificar("venta_quitada", self)
+
+    def modificar(self, cliente=None, forma_pago=None, productos_vendidos=None):
+        """Cambiar los datos indicados de la venta (sin tocar el stock).
+
+        Las líneas nuevas toman el precio actual de sus productos.
+        """
+        Venta._notificar("venta_quitada", self)
+        if cliente is not None:
+            Venta._desindexar(self)
+            self.cliente = cliente
+            Venta._indexar(self)
+        if forma_pago is not None:
+            self.forma_pago = forma_pago
+        if productos_vendidos is not None:
+            self.productos_vendidos = productos_vendidos
+            self.precios = Venta._precios_actuales(productos_vendidos)
+        Venta._notificar("venta_agregada", self)
+
     def total(self):
-        return sum(prod.get_precio() * cant for prod, cant in self.productos_vendidos)
+        return sum(precio * cant for _, cant, precio in self.lineas())
 
     def to_dict(self):
         return {
+            "id": self.id,
             "cliente": self.cliente,
             "forma_pago": self.forma_pago,
             "fecha_venta": self.fecha_venta.strftime("%Y-%m-%d %H:%M:%S"),
@@ -32,15 +234,15 @@ class Venta:
                     "codigo": p.get_codigo(),
                     "nombre": p.get_nombre(),
                     "cantidad": cantidad,
-                    "precio_unitario": p.get_precio()
+                    "precio_unitario": precio
                 }
-                for p, cantidad in self.productos_vendidos
+                for p, cantidad, precio in self.lineas()
             ]
         }
 
     def __str__(self):
         detalle = "\n".join(
-            [f"  - {prod.get_nombre()} x{cant} @ {prod.get_precio()}" for prod, cant in self.productos_vendidos]
+            [f"  - {prod.get_nombre()} x{cant} @ {precio}" for prod, cant, precio in self.lineas()]
         )
         return (
             f"Venta a: {self.cliente}\n"
@@ -51,32 +253,119 @@ class Venta:
         )
 
     @classmethod
-    def guardar_en_json(cls, archivo="db/ventas.json"):
-        with open(archivo, "w") as f:
-            json.dump([v.to_dict() for v in cls.ventas], f, indent=4)
+    def confirmar_venta(cls, inventario, cliente, productos_vendidos, forma_pago, fecha_venta=None):
+        """Registrar una venta completa como un único lote atómico.
+
+        Descuenta el stock de todas las líneas, registra sus movimientos en el
+        historial de stock y agrega la venta a la base en la misma transacción,
+        mediante ``Inventario.aplicar_movimientos``. Si alguna línea no tiene
+        stock suficiente se lanza ``ValueError`` y no se modifica nada; si no
+        se puede numerar la venta, ``SequenceError`` (también sin cambios).
+        """
+        # El id se pide antes de crear la venta: si la secuencia falla (``SequenceError``) no queda nada registrado
+        venta = cls(cliente, productos_vendidos, forma_pago, fecha_venta, descontar_stock=False, id=cls._nuevo_id())
+        try:
+            inventario.aplicar_movimientos(
+                [(producto.get_codigo(), -cantidad) for producto, cantidad in productos_vendidos],
+                "ventas",
+                al_confirmar=lambda: get_repository("ventas").append(venta.to_dict())
+            )
+        except Exception:
+            cls.ventas.remove(venta)
+            cls._desindexar(venta)
+            raise
+        cls._notificar("venta_agregada", venta)
+        return venta
 
     @classmethod
-    def cargar_desde_json(cls, archivo="db/ventas.json"):
+    def guardar_en_json(cls, archivo=None):
+        repositorio = JsonRepository(archivo) if archivo else get_repository("ventas")
+        repositorio.save_all([v.to_dict() for v in cls.ventas])
+
+    @staticmethod
+    def _parsear_fecha(texto):
+        try:
+            # fromisoformat acepta "%Y-%m-%d %H:%M:%S" y es mucho más rápido que strptime
+            return datetime.fromisoformat(texto)
+        except ValueError:
+            return datetime.strptime(texto, "%Y-%m-%d %H:%M:%S")
+
+    @classmethod
+    def desde_dict(cls, data, productos_por_codigo, id_defecto=None):
+        """Reconstruir una venta guardada sin modificar el stock (ya se descontó al venderse).
+
+        ``id_defecto`` se usa para los registros guardados antes de que las
+        ventas tuvieran id. Cada línea conserva el "precio_unitario" guardado.
+        """
+        productos = []
+        precios = []
+        for prod_data in data.get("productos", []):
+            producto = productos_por_codigo.get(prod_data["codigo"])
+            if producto:
+                productos.append((producto, prod_data["cantidad"]))
+                precios.append(prod_data.get("precio_unitario", producto.get_precio()))
+        return cls(cliente=data["cliente"], productos_vendidos=productos, forma_pago=data["forma_pago"],
+                   fecha_venta=cls._parsear_fecha(data["fecha_venta"]), descontar_stock=False,
+                   id=data.get("id", id_defecto), precios=precios)
+
+    @classmethod
+    def cargar_desde_json(cls, archivo=None, productos=None, datos=None):
+        """Cargar las ventas guardadas sin efectos sobre el inventario.
+
+        Los productos de cada línea se resuelven en O(1) por código: con el
+        registro de productos (``Producto.productos``) o, si se indica
+        ``productos``, con un índice construido una sola vez a partir de ellos.
+        La duración queda en ``estadisticas_carga``.
+
+        El recolector de basura se pausa durante la carga: crear cientos de
+        miles de objetos dispara recolecciones completas que no liberan nada.
+
+        Con ``datos`` (registros ya leídos con ``leer_ventas``, por ejemplo en
+        un hilo de fondo) no se vuelve a leer el archivo.
+
+        Los registros sin "id" (anteriores a los ids) reciben su posición en
+        el archivo: las ventas nuevas se agregan al final con ids mayores, así
+        que la numeración no cambia entre cargas, y queda guardada la próxima
+        vez que se reescriba el archivo completo.
+        """
+        inicio = time.perf_counter()
         # Limpiar la lista para evitar duplicados si se llama varias veces en la misma sesión
         cls.ventas.clear()
         
-        import json, os
+        repositorio = JsonRepository(archivo) if archivo else get_repository("ventas")
+        gc_activo = gc.isenabled()
+        gc.disable()
+        cls._indexar_al_crear = False
         try:
-            if not os.path.exists(archivo) or os.path.getsize(archivo) == 0:
-                return  # Nada que cargar
-            with open(archivo, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                for v in data:
-                    productos = []
-                    for prod_data in v.get("productos", []):
-                        producto = next((p for p in Producto.productos if p.get_codigo() == prod_data["codigo"]), None)
-                        if producto:
-                            productos.append((producto, prod_data["cantidad"]))
-                    fecha = datetime.strptime(v["fecha_venta"], "%Y-%m-%d %H:%M:%S")
-                    cls(cliente=v["cliente"], productos_vendidos=productos, forma_pago=v["forma_pago"], fecha_venta=fecha)
+            data = repositorio.load_all() if datos is None else datos
+            if productos is None:
+                productos_por_codigo = Producto.productos
+            else:
+                productos_por_codigo = {p.get_codigo(): p for p in productos}
+            for posicion, v in enumerate(data, 1):
+                cls.desde_dict(v, productos_por_codigo, posicion)
         except (FileNotFoundError, json.JSONDecodeError):
             # Si el archivo está corrupto o no es JSON válido, lo ignoramos para no interrumpir la app.
             pass
+        finally:
+            cls._indexar_al_crear = True
+            cls._reindexar()
+            if gc_activo:
+                gc.enable()
+        duracion = time.perf_counter() - inicio
+        cls.estadisticas_carga = {"ventas": len(cls.ventas), "segundos": duracion}
+        if len(cls.ventas) >= cls.REPORTE_CARGA_MINIMO:
+            print(f"{len(cls.ventas)} ventas cargadas desde {repositorio.path} en {duracion:.2f} s")
+
+    @staticmethod
+    def leer_ventas(archivo=None):
+        """Leer los registros de ventas guardados (solo E/S, apto para un hilo de fondo)."""
+        repositorio = JsonRepository(archivo) if archivo else get_repository("ventas")
+        try:
+            return repositorio.load_all()
+        except (FileNotFoundError, json.JSONDecodeError):
+            return []
+
     @classmethod
     def registrar_venta(cls):
         print("\n--- Registrar nueva venta ---")
@@ -107,7 +396,7 @@ class Venta:
             cod = input("Código del producto a vender (0 para finalizar): ")
             if cod == "0":
                 break
-            producto = next((p for p in Producto.productos if p.get_codigo() == int(cod)), None)
+            producto = Producto.productos.get(int(cod))
             if producto:
                 cantidad = int(input(f"Ingrese cantidad para {producto.get_nombre()} (disponibles: {producto.get_cantidad()}): "))
                 if 0 < cantidad <= producto.get_cantidad():
@@ -119,6 +408,7 @@ class Venta:
 
         if productos_vendidos:
             venta = Venta(cliente, productos_vendidos, forma_pago, fecha_venta)
+            cls._notificar("venta_agregada", venta)
             print("\n--- Venta registrada exitosamente ---")
             print(venta)
         else:
@@ -128,28 +418,27 @@ class Venta:
     def ver_ventas(cls):
         if not cls.ventas:
             print("No hay ventas registradas.")
-        for i, venta in enumerate(cls.ventas, 1):
-            print(f"\n--- Venta #{i} ---")
+        for venta in cls.ventas:
+            print(f"\n--- Venta #{venta.id} ---")
             print(venta)
 
     @classmethod
     def editar_venta(cls):
         cls.ver_ventas()
-        index = int(input("Número de venta a editar: ")) - 1
-        if 0 <= index < len(cls.ventas):
-            venta = cls.ventas[index]
+        venta = cls.por_id(int(input("Número de venta a editar: ")))
+        if venta is not None:
             print("Editando venta:")
             print(venta)
             opcion = input("¿Desea editar cliente (c), productos (p) o forma de pago (f)? ")
             if opcion == 'c':
                 nuevo = input("Nuevo nombre de cliente: ")
-                venta.cliente = nuevo
+                venta.modificar(cliente=nuevo)
             elif opcion == 'f':
                 nuevo = input("Nueva forma de pago: ")
-                venta.forma_pago = nuevo
+                venta.modificar(forma_pago=nuevo)
             elif opcion == 'p':
                 print("Los productos anteriores serán descartados.")
-                venta.productos_vendidos = []
+                venta.modificar(productos_vendidos=[])
                 venta.actualizar_inventario()  # Reversar cantidades (si se desea)
                 cls.registrar_venta()
             print("Venta actualizada.")
@@ -159,13 +448,10 @@ class Venta:
     @classmethod
     def anular_venta(cls):
         cls.ver_ventas()
-        index = int(input("Número de venta a anular: ")) - 1
-        if 0 <= index < len(cls.ventas):
-            venta = cls.ventas.pop(index)
+        venta = cls.por_id(int(input("Número de venta a anular: ")))
+        if venta is not None:
             # Revertir inventario
-            for producto, cantidad in venta.productos_vendidos:
-                producto.set_cantidad(producto.get_cantidad() + cantidad)
-                producto.set_disponibilidad(True)
+            venta.anular()
             print("Venta anulada correctamente.")
         else:
             print("Venta no encontrada.")
@@ -11,6 +11,8 @@ NECESIDADES = {
 }
 
 class Cliente:
+    __slots__ = ("nombre", "cedula", "direccion", "telefono")
+
     def __init__(self, nombre: str, cedula: str, direccion: str, telefono: str):
         self.nombre = nombre
         self.cedula = cedula
@@ -26,6 +28,8 @@ class Cliente:
         }
 
 class SolicitudServicio:
+    __slots__ = ("cliente", "necesidad", "cantidad")
+
     def __init__(self, cliente: Cliente, necesidad: str, cantidad: int):
         self.cliente = cliente
         self.necesidad = necesidad
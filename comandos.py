@@ -2,6 +2,7 @@ from HU.Producto import Producto
 from HU.Inventario import Inventario
 from HU.HistoriaClinica import HistoriaClinica
 from Consola.Menu_principal import MenuPrincipal
+from db import close_writer
 
 # Crear el inventario
 mi_inventario = Inventario()
@@ -53,6 +54,8 @@ def main(rol_usuario=None):
     # Guardar inventario e historiales antes de salir
     mi_inventario.guardar_en_json()
     HistoriaClinica.guardar_historiales()
+    # Escribir los cambios diferidos pendientes y detener el escritor
+    close_writer()
 
 if __name__ == "__main__":
     main()
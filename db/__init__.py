@@ -1,9 +1,27 @@
 """
 Database module for AgroVet Plus - Centralizes all JSON data file management.
+
+El motor de almacenamiento se elige con la variable de entorno
+``AGROVET_DB_BACKEND`` (``json`` por defecto, o ``sqlite``). Las clases de HU
+acceden a sus datos mediante ``get_repository``; los archivos JSON siguen
+siendo el formato de importación/exportación.
+
+Con ``AGROVET_WRITE_BEHIND=1`` los guardados completos de inventario e
+historiales se difieren a un hilo escritor (ver ``schedule_save``); la
+ventana de espera y el umbral se ajustan con ``AGROVET_WRITE_BEHIND_DELAY``
+(segundos) y ``AGROVET_WRITE_BEHIND_MAX``.
 """
 
+import atexit
 import os
-from typing import Dict, Any
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+from .repository import (SCHEMAS, Schema, JsonRepository, JsonlRepository, SQLiteEngine, SQLiteRepository,
+                         file_batch)
+from .sequences import FileSequences, SQLiteSequences, SequenceError
+from .write_behind import WriteBehindWriter
 
 # Rutas de archivos de base de datos
 DB_DIR = "db"
@@ -13,8 +31,32 @@ DB_FILES = {
     'historial_stock': os.path.join(DB_DIR, "historial_stock.json"),
     'ventas': os.path.join(DB_DIR, "ventas.json"),
     'solicitudes': os.path.join(DB_DIR, "solicitudes.json"),
+    'pedidos': os.path.join(DB_DIR, "pedidos.json"),
+    'usuarios': os.path.join(DB_DIR, "usuarios.json"),
+    'stock_thresholds': os.path.join(DB_DIR, "stock_thresholds.json"),
+    'stock_alerts': os.path.join(DB_DIR, "stock_alerts.json"),
+    'reglas_recomendacion': os.path.join(DB_DIR, "reglas_recomendacion.json"),
 }
 
+# Motor de almacenamiento: 'json' (archivos) o 'sqlite' (base única en modo WAL)
+DB_BACKEND = os.environ.get("AGROVET_DB_BACKEND", "json").strip().lower()
+SQLITE_PATH = os.path.join(DB_DIR, "agrovet.db")
+# Secuencias de ids del motor de archivos (con SQLite se guardan en la base)
+SEQUENCES_PATH = os.path.join(DB_DIR, "secuencias.json")
+# Forzar fsync en cada anexado a las bitácoras (más durable, más lento)
+DB_FSYNC = os.environ.get("AGROVET_DB_FSYNC", "0").strip() == "1"
+
+# Escritura diferida (opt-in): guardar en segundo plano tras una ventana de espera
+WRITE_BEHIND = os.environ.get("AGROVET_WRITE_BEHIND", "0").strip() == "1"
+WRITE_BEHIND_DELAY = float(os.environ.get("AGROVET_WRITE_BEHIND_DELAY", "2.0"))
+WRITE_BEHIND_MAX_PENDING = int(os.environ.get("AGROVET_WRITE_BEHIND_MAX", "20"))
+
+_engine = None
+_repositories: Dict[str, Any] = {}
+_sequences = None
+_writer = None
+_lock = threading.RLock()  # Creación de la conexión y los repositorios compartidos (hilos de fondo)
+
 def get_db_path(file_key: str) -> str:
     """
     Obtener la ruta de un archivo de base de datos.
@@ -41,6 +83,145 @@ def get_all_db_files() -> Dict[str, str]:
     """Obtener todas las rutas de archivos de base de datos."""
     return DB_FILES.copy()
 
+def get_engine() -> SQLiteEngine:
+    """Obtener (creando si hace falta) la conexión compartida a SQLite."""
+    global _engine
+    with _lock:
+        if _engine is None:
+            _engine = SQLiteEngine(SQLITE_PATH)
+    return _engine
+
+def get_journal_path(file_key: str) -> str:
+    """Ruta de la bitácora JSON Lines de una entidad de solo anexado."""
+    return os.path.splitext(get_db_path(file_key))[0] + ".jsonl"
+
+def _file_repository(file_key: str):
+    """Repositorio basado en archivos de una entidad (JSON o bitácora JSON Lines)."""
+    path = get_db_path(file_key)
+    schema = SCHEMAS.get(file_key, Schema())
+    if schema.journal:
+        return JsonlRepository(get_journal_path(file_key), schema, legacy_path=path, fsync=DB_FSYNC)
+    return JsonRepository(path, schema)
+
+def get_repository(file_key: str):
+    """
+    Obtener el repositorio de una entidad según el motor configurado.
+    
+    Args:
+        file_key: Clave del archivo ('productos', 'ventas', etc.)
+        
+    Returns:
+        JsonRepository | SQLiteRepository: Repositorio compartido de la entidad
+    """
+    with _lock:
+        if file_key not in _repositories:
+            schema = SCHEMAS.get(file_key, Schema())
+            if DB_BACKEND == "sqlite":
+                _repositories[file_key] = SQLiteRepository(file_key, schema, get_engine(),
+                                                           source=_file_repository(file_key))
+            else:
+                _repositories[file_key] = _file_repository(file_key)
+        return _repositories[file_key]
+
+def get_sequences():
+    """Obtener las secuencias de ids compartidas según el motor configurado."""
+    global _sequences
+    with _lock:
+        if _sequences is None:
+            _sequences = SQLiteSequences(get_engine()) if DB_BACKEND == "sqlite" else FileSequences(SEQUENCES_PATH)
+        return _sequences
+
+def next_id(name: str, seed: Optional[Callable[[], int]] = None) -> int:
+    """
+    Entregar el siguiente id de la secuencia ``name`` en O(1).
+    
+    Args:
+        name: Nombre de la secuencia ('clientes', 'ventas', 'pedidos', ...)
+        seed: Función que retorna el último id ya usado; se llama una sola vez,
+            cuando la secuencia aún no existe (datos anteriores a las secuencias)
+        
+    Returns:
+        int: Id no entregado antes a ningún proceso que comparta la base
+
+    Raises:
+        SequenceError: Si el archivo de secuencias está dañado
+    """
+    return get_sequences().reserve(name, 1, seed)[0]
+
+def reserve_ids(name: str, count: int, seed: Optional[Callable[[], int]] = None) -> range:
+    """Reservar de una vez ``count`` ids consecutivos de la secuencia ``name`` (importaciones masivas)."""
+    return get_sequences().reserve(name, count, seed)
+
+@contextmanager
+def transaction():
+    """
+    Agrupar escrituras de varias entidades en un único lote atómico.
+    
+    Con SQLite todo se confirma en una sola transacción (un solo commit
+    durable). Con archivos, los cambios se acumulan en memoria y al salir se
+    escriben en temporales que reemplazan a los archivos solo si todas las
+    escrituras funcionaron (ver ``file_batch``); si ocurre una excepción no
+    cambia ningún archivo.
+    """
+    if DB_BACKEND == "sqlite":
+        with get_engine().transaction():
+            yield
+    else:
+        with file_batch():
+            yield
+
+def schedule_save(key: str, save: Callable[[], None]) -> None:
+    """
+    Guardar una entidad, de inmediato o de forma diferida.
+    
+    Sin escritura diferida ``save`` se ejecuta ya. Con ``AGROVET_WRITE_BEHIND=1``
+    la entidad ``key`` se marca como sucia y el escritor en segundo plano la
+    guarda una sola vez tras la ventana de espera (o al llegar al umbral de
+    cambios pendientes).
+    """
+    global _writer
+    if not WRITE_BEHIND:
+        save()
+        return
+    with _lock:
+        # Se llama también desde hilos de fondo: un solo escritor compartido
+        if _writer is None:
+            _writer = WriteBehindWriter(WRITE_BEHIND_DELAY, WRITE_BEHIND_MAX_PENDING)
+        writer = _writer
+    # Si entretanto se cerró, ``mark_dirty`` escribe de inmediato
+    writer.mark_dirty(key, save)
+
+def flush_writes() -> None:
+    """Escribir de inmediato los cambios diferidos pendientes."""
+    writer = _writer
+    if writer is not None:
+        writer.flush()
+
+def close_writer() -> None:
+    """Escribir lo pendiente y detener el escritor en segundo plano (al cerrar la aplicación)."""
+    global _writer
+    with _lock:
+        writer, _writer = _writer, None
+    if writer is not None:
+        writer.close()
+
+def export_json() -> None:
+    """Exportar todas las entidades a sus archivos JSON (formato de intercambio)."""
+    for file_key in DB_FILES:
+        repository = get_repository(file_key)
+        if DB_BACKEND == "sqlite":
+            repository.export_json()
+        elif SCHEMAS.get(file_key, Schema()).journal:
+            # La bitácora se vuelca como lista JSON en su archivo histórico
+            JsonRepository(get_db_path(file_key)).save_all(repository.load_all())
+
+def import_json() -> None:
+    """Reemplazar el contenido de SQLite con el de los archivos JSON."""
+    if DB_BACKEND != "sqlite":
+        return
+    for file_key in DB_FILES:
+        get_repository(file_key).import_json()
+
 def initialize_db() -> None:
     """Inicializar la base de datos creando el directorio si no existe."""
     ensure_db_directory()
@@ -48,5 +229,10 @@ def initialize_db() -> None:
 
 # Inicializar automáticamente al importar
 initialize_db()
+# No perder cambios diferidos si el proceso termina sin cerrar el escritor
+atexit.register(close_writer)
 
-__all__ = ["get_db_path", "ensure_db_directory", "get_all_db_files", "initialize_db", "DB_FILES"] 
\ No newline at end of file
+__all__ = ["get_db_path", "ensure_db_directory", "get_all_db_files", "initialize_db", "DB_FILES",
+           "DB_BACKEND", "SCHEMAS", "JsonRepository", "get_repository", "get_engine",
+           "get_journal_path", "get_sequences", "SequenceError", "next_id", "reserve_ids", "transaction", "WRITE_BEHIND",
+           "schedule_save", "flush_writes", "close_writer", "export_json", "import_json"] 
\ No newline at end of file
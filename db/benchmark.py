@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Mediciones de rendimiento de AgroVet Plus sobre datos sintéticos.
+
+Uso:
+    python -m db.benchmark [cantidad_de_ventas] [cantidad_de_productos]
+
+Los datos se generan en un directorio temporal; la base real no se modifica.
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from .repository import JsonRepository
+
+
+def _productos_sinteticos(cantidad):
+    from HU.Producto import Producto
+    return [Producto(1000 + i, f"Producto {i}", f"Categoría {i % 12}", "Sintético",
+                     1000 + 10 * i, 500, "31/12/2030") for i in range(cantidad)]
+
+
+def benchmark_carga_ventas(cantidad=100_000, productos=200):
+    """Medir ``Venta.cargar_desde_json`` con ``cantidad`` ventas sintéticas."""
+    from HU.Venta import Venta
+
+    print(f"🧪 Carga de ventas: {cantidad:,} ventas, {productos} productos")
+    catalogo = _productos_sinteticos(productos)
+    rng = random.Random(42)
+    inicio = datetime(2024, 1, 1)
+    ventas = []
+    for i in range(cantidad):
+        lineas = rng.sample(catalogo, rng.randint(1, 4))
+        ventas.append({
+            "cliente": f"Cliente {rng.randint(1, 5000)}",
+            "forma_pago": rng.choice(("efectivo", "tarjeta")),
+            "fecha_venta": (inicio + timedelta(minutes=i)).strftime("%Y-%m-%d %H:%M:%S"),
+            "productos": [{"codigo": p.get_codigo(), "nombre": p.get_nombre(),
+                           "cantidad": rng.randint(1, 5), "precio_unitario": p.get_precio()}
+                          for p in lineas]
+        })
+
+    with tempfile.TemporaryDirectory() as directorio:
+        archivo = os.path.join(directorio, "ventas.json")
+        JsonRepository(archivo).save_all(ventas)
+        stock_antes = [p.get_cantidad() for p in catalogo]
+
+        t0 = time.perf_counter()
+        Venta.cargar_desde_json(archivo, productos=catalogo)
+        duracion = time.perf_counter() - t0
+
+    stock_intacto = stock_antes == [p.get_cantidad() for p in catalogo]
+    print(f"   ⏱️  {len(Venta.ventas):,} ventas cargadas en {duracion:.2f} s "
+          f"({duracion / max(len(Venta.ventas), 1) * 1e6:.1f} µs/venta)")
+    print(f"   {'✅' if stock_intacto else '❌'} Stock sin modificar tras la carga")
+
+    # Ventas de un mes: recorrido completo frente al índice por fecha
+    desde, hasta = (inicio + timedelta(days=30)).date(), (inicio + timedelta(days=60)).date()
+    t0 = time.perf_counter()
+    recorrido = [v for v in Venta.ventas if desde <= v.fecha_venta.date() <= hasta]
+    t1 = time.perf_counter()
+    indexadas = Venta.en_rango(desde, hasta)
+    t2 = time.perf_counter()
+    print(f"   Ventas de un mes ({len(indexadas):,}): recorrido {(t1 - t0) * 1000:.2f} ms, "
+          f"índice por fecha {(t2 - t1) * 1000:.3f} ms {'✅' if indexadas == recorrido else '❌'}")
+    Venta.ventas.clear()
+    return duracion
+
+
+def benchmark_busqueda(cantidad=100_000, consulta="desparasitante bov"):
+    """Medir el índice de búsqueda del inventario escribiendo ``consulta`` letra por letra."""
+    from HU.IndiceBusqueda import IndiceBusqueda
+    from HU.Producto import Producto
+
+    print(f"🧪 Búsqueda en inventario: {cantidad:,} productos")
+    rng = random.Random(7)
+    tipos = ["Desparasitante", "Vitamina", "Antibiótico", "Concentrado", "Vacuna", "Shampoo",
+             "Insecticida", "Sales", "Suplemento", "Jeringa", "Collar", "Alimento"]
+    especies = ["Bovino", "Equino", "Canino", "Felino", "Porcino", "Aves", "Ovino"]
+    catalogo = [Producto(10_000 + i, f"{rng.choice(tipos)} {rng.choice(especies)} {rng.randint(1, 999)}",
+                         rng.choice(tipos), f"Presentación {rng.choice(('10ml', '50ml', '1kg', '25kg'))}",
+                         1000, 10, "N/A") for i in range(cantidad)]
+
+    t0 = time.perf_counter()
+    indice = IndiceBusqueda(catalogo)
+    print(f"   ⏱️  Índice construido en {time.perf_counter() - t0:.2f} s")
+
+    for largo in range(3, len(consulta) + 1):
+        texto = consulta[:largo]
+        t0 = time.perf_counter()
+        resultados = indice.buscar(texto, ("nombre",), limite=50)
+        duracion = time.perf_counter() - t0
+        print(f"   '{texto}': {len(resultados)} resultados en {duracion * 1000:.3f} ms")
+    for producto in catalogo:
+        Producto.productos.eliminar(producto.get_codigo())
+
+
+def benchmark_agregados(cantidad=100_000, repeticiones=20):
+    """Medir los agregados del dashboard con la vista columnar frente al recorrido de productos."""
+    from HU.InventarioColumnar import InventarioColumnar, np
+    from HU.Producto import Producto
+
+    print(f"🧪 Agregados del inventario: {cantidad:,} productos (NumPy: {'sí' if np else 'no'})")
+    rng = random.Random(3)
+    catalogo = [Producto(20_000 + i, f"Producto {i}", "Sintético", "", rng.randint(1, 500) * 100,
+                         rng.randint(0, 40), f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2027")
+                for i in range(cantidad)]
+    columnas = InventarioColumnar()
+    for producto in catalogo:
+        columnas.agregar(producto)
+
+    def recorrido():
+        valor = sum(p.get_precio() * p.get_cantidad() for p in catalogo)
+        agotados = len([p for p in catalogo if p.get_cantidad() == 0])
+        bajos = [p for p in catalogo if 0 < p.get_cantidad() < 5]
+        return valor, agotados, bajos
+
+    def vectorizado():
+        return (columnas.valor_total(), columnas.contar_agotados(),
+                columnas.bajo_umbral(5, incluir_agotados=False))
+
+    for nombre, funcion in (("Recorrido de productos", recorrido), ("Vista columnar", vectorizado)):
+        t0 = time.perf_counter()
+        for _ in range(repeticiones):
+            funcion()
+        print(f"   {nombre}: {(time.perf_counter() - t0) / repeticiones * 1000:.2f} ms")
+    for producto in catalogo:
+        Producto.productos.eliminar(producto.get_codigo())
+
+
+def _reservar_ids(ruta, cantidad):
+    """Pedir ``cantidad`` ids de a uno desde otro proceso (ver ``benchmark_secuencias``)."""
+    from .sequences import FileSequences
+    secuencias = FileSequences(ruta)
+    return [secuencias.reserve("ventas")[0] for _ in range(cantidad)]
+
+
+def benchmark_secuencias(cantidad=2_000, procesos=4):
+    """Medir las secuencias de ids y comprobar que varios procesos no reciben ids repetidos."""
+    from concurrent.futures import ProcessPoolExecutor
+    from .sequences import FileSequences
+
+    print(f"🧪 Secuencias de ids: {cantidad:,} ids, {procesos} procesos")
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, "secuencias.json")
+        secuencias = FileSequences(ruta)
+        t0 = time.perf_counter()
+        for _ in range(cantidad):
+            secuencias.reserve("clientes")
+        duracion = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        bloque = secuencias.reserve("clientes", cantidad)
+        print(f"   De a uno: {duracion / cantidad * 1e6:.0f} µs/id; bloque de {len(bloque):,}: "
+              f"{(time.perf_counter() - t0) * 1000:.2f} ms")
+
+        with ProcessPoolExecutor(procesos) as ejecutor:
+            lotes = list(ejecutor.map(_reservar_ids, [ruta] * procesos, [cantidad // procesos] * procesos))
+        ids = [i for lote in lotes for i in lote]
+        print(f"   {len(ids):,} ids pedidos en paralelo, {len(set(ids)):,} distintos "
+              f"{'✅' if len(set(ids)) == len(ids) == secuencias.current('ventas') else '❌'}")
+
+
+def _memoria(crear):
+    """Bytes retenidos por los objetos que retorna ``crear()``."""
+    tracemalloc.start()
+    objetos = crear()
+    memoria = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objetos
+    return memoria
+
+
+def benchmark_memoria(cantidad=100_000):
+    """Comparar la memoria de los modelos con ``__slots__`` frente a objetos con ``__dict__``."""
+    from types import SimpleNamespace
+    from HU.HistoriaClinica import RegistroClinico
+    from HU.Producto import Producto
+
+    print(f"🧪 Memoria de modelos: {cantidad:,} objetos")
+    campos_producto = Producto.__slots__
+    datos = [(10_000 + i, f"Producto {i}", "Categoría", "Sintético", 1000, 10, True, "N/A")
+             for i in range(cantidad)]
+    registros = [{"fecha": "01/01/2025", "hora": "10:00:00", "fecha_iso": "2025-01-01T10:00:00",
+                  "diagnostico": f"Diagnóstico {i}", "tratamiento": "Reposo", "comentarios": ""}
+                 for i in range(cantidad)]
+
+    def productos_con_slots():
+        productos = []
+        for valores in datos:
+            producto = object.__new__(Producto)  # Sin registrar en el mapa de identidad
+            for campo, valor in zip(campos_producto, valores):
+                setattr(producto, campo, valor)
+            productos.append(producto)
+        return productos
+
+    comparaciones = [
+        ("Producto", productos_con_slots,
+         lambda: [SimpleNamespace(**dict(zip(campos_producto, v))) for v in datos]),
+        ("RegistroClinico", lambda: [RegistroClinico.desde_dict(r) for r in registros],
+         lambda: [dict(r) for r in registros]),
+    ]
+    for nombre, con_slots, con_dict in comparaciones:
+        compacto, antes = _memoria(con_slots), _memoria(con_dict)
+        print(f"   {nombre}: {compacto / cantidad:.0f} B/objeto con __slots__, "
+              f"{antes / cantidad:.0f} B/objeto con __dict__ ({1 - compacto / antes:.0%} menos)")
+
+
+if __name__ == "__main__":
+    benchmark_carga_ventas(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
+    benchmark_busqueda(int(sys.argv[2]) if len(sys.argv) > 2 else 100_000)
+    benchmark_memoria(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
+    benchmark_agregados(int(sys.argv[2]) if len(sys.argv) > 2 else 100_000)
+    benchmark_secuencias()
@@ -0,0 +1,627 @@
+"""
+Repository layer for AgroVet Plus - Motores de almacenamiento intercambiables.
+
+Cada entidad (productos, ventas, historiales, ...) se persiste a través de un
+repositorio con la misma interfaz, sin importar el motor que haya detrás:
+
+- ``JsonRepository``: un archivo JSON por entidad (formato histórico). Es
+  también el formato de importación/exportación.
+- ``JsonlRepository``: bitácora de solo anexado (JSON Lines) para entidades
+  que solo crecen, como el historial de stock; cada anexado es O(1).
+- ``SQLiteRepository``: una tabla por entidad dentro de una base SQLite en
+  modo WAL, con índices secundarios y actualizaciones por fila.
+
+Varias escrituras pueden agruparse en un lote con ``file_batch`` (archivos) o
+``SQLiteEngine.transaction`` (SQLite) para confirmarlas de una sola vez.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+
+class Schema(NamedTuple):
+    """Descripción del almacenamiento de una entidad."""
+    key: Optional[str] = None       # Campo clave para actualizaciones por fila
+    indexes: Tuple[str, ...] = ()   # Campos con índice secundario
+    document: bool = False          # La entidad es un único documento (dict/list)
+    journal: bool = False           # Entidad de solo anexado (bitácora JSON Lines)
+
+
+# Esquema de cada archivo de base de datos (claves de ``DB_FILES``)
+SCHEMAS: Dict[str, Schema] = {
+    'productos': Schema(key='codigo', indexes=('nombre', 'categoria')),
+    'historiales': Schema(key='id_cliente', indexes=('nombre_cliente', 'nombre_mascota')),
+    'historial_stock': Schema(indexes=('codigo_producto',), journal=True),
+    'ventas': Schema(indexes=('cliente', 'fecha_venta')),
+    'pedidos': Schema(indexes=('estado',)),
+    'usuarios': Schema(key='username'),
+    'solicitudes': Schema(indexes=('tipo',)),
+    'stock_thresholds': Schema(document=True),
+    'stock_alerts': Schema(document=True),
+    'reglas_recomendacion': Schema(document=True),
+}
+
+
+_batch_state = threading.local()
+
+
+def _current_batch() -> Optional[Dict]:
+    return getattr(_batch_state, "batch", None)
+
+
+@contextmanager
+def file_batch():
+    """Agrupar las escrituras a repositorios de archivos en un único lote.
+
+    Dentro del bloque, los repositorios JSON acumulan sus cambios en memoria
+    (las lecturas ven los cambios pendientes) y las bitácoras acumulan sus
+    anexados. Si ocurre una excepción en el bloque, no se escribe nada. Los
+    lotes anidados se integran al lote exterior.
+
+    Al salir, el lote se confirma en dos pasos: primero se escribe cada
+    archivo JSON en un temporal y se anexan las líneas de las bitácoras; solo
+    si todas esas escrituras funcionan se reemplazan los archivos (``os.replace``).
+    Si alguna falla (disco lleno, permisos) se borran los temporales y se
+    recortan las bitácoras a su largo anterior, así que ningún archivo cambia.
+    Lo que no cubre es una caída del proceso durante los reemplazos finales.
+    """
+    if _current_batch() is not None:
+        yield _current_batch()
+        return
+    batch: Dict[Any, Any] = {}
+    _batch_state.batch = batch
+    try:
+        yield batch
+    finally:
+        _batch_state.batch = None
+    preparados = []
+    try:
+        for repository, pending in batch.items():
+            preparados.append(repository._prepare(pending))
+    except BaseException:
+        for _, deshacer in preparados:
+            deshacer()
+        raise
+    for confirmar, _ in preparados:
+        confirmar()
+
+
+def _write_json_temp(path: str, data: Any) -> str:
+    """Escribir ``data`` en un temporal junto a ``path`` y retornar su ruta."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # Un temporal por hilo: un lote puede tener su temporal pendiente mientras otro hilo escribe el archivo
+    tmp_path = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=4, ensure_ascii=False)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return tmp_path
+
+
+def write_json_atomic(path: str, data: Any) -> None:
+    """Escribir ``data`` en ``path`` de forma atómica (archivo temporal + rename)."""
+    os.replace(_write_json_temp(path, data), path)
+
+
+class JsonRepository:
+    """Repositorio respaldado por un archivo JSON (lista de registros o documento).
+
+    Las lecturas-modificaciones-escrituras (``append``, ``upsert``, ``delete``)
+    se serializan con un candado, de modo que el repositorio compartido se
+    puede usar desde la interfaz y desde hilos de fondo a la vez.
+    """
+
+    def __init__(self, path: str, schema: Schema = Schema()):
+        self.path = path
+        self.schema = schema
+        self._lock = threading.RLock()
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def _read(self) -> Any:
+        """Leer el contenido crudo del archivo; ``None`` si no existe o está vacío."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                content = f.read().strip()
+        except FileNotFoundError:
+            return None
+        if not content:
+            return None
+        return json.loads(content)
+
+    def _pending(self) -> Tuple[Optional[Dict], Any]:
+        """Lote activo y contenido pendiente de este archivo (``None`` si no hay)."""
+        batch = _current_batch()
+        return batch, (batch.get(self) if batch is not None else None)
+
+    def _write(self, data: Any) -> None:
+        batch = _current_batch()
+        if batch is not None:
+            batch[self] = data
+        else:
+            with self._lock:
+                write_json_atomic(self.path, data)
+
+    def _prepare(self, data: Any):
+        """Primer paso de ``file_batch``: escribir el temporal; retorna ``(confirmar, deshacer)``."""
+        tmp_path = _write_json_temp(self.path, data)
+
+        def confirmar():
+            with self._lock:
+                os.replace(tmp_path, self.path)
+
+        return confirmar, lambda: os.remove(tmp_path)
+
+    # ---------- Colecciones ----------
+    def load_all(self) -> List[Dict]:
+        """Cargar todos los registros. Propaga ``json.JSONDecodeError`` si el archivo está dañado."""
+        _, pending = self._pending()
+        if pending is not None:
+            return list(pending)
+        return self._read() or []
+
+    def save_all(self, records: List[Dict]) -> None:
+        self._write(list(records))
+
+    def upsert(self, record: Dict) -> None:
+        """Insertar o reemplazar un registro según la clave del esquema."""
+        key = self.schema.key
+        if key is None:
+            raise ValueError(f"La entidad en {self.path} no tiene clave; use append() o save_all()")
+        with self._lock:
+            records = self.load_all()
+            for i, existing in enumerate(records):
+                if existing.get(key) == record.get(key):
+                    records[i] = record
+                    break
+            else:
+                records.append(record)
+            self.save_all(records)
+
+    def delete(self, key_value: Any) -> None:
+        key = self.schema.key
+        if key is None:
+            raise ValueError(f"La entidad en {self.path} no tiene clave")
+        with self._lock:
+            self.save_all([r for r in self.load_all() if r.get(key) != key_value])
+
+    def append(self, record: Dict) -> None:
+        self.append_many([record])
+
+    def append_many(self, records: List[Dict]) -> None:
+        with self._lock:
+            existing = self.load_all()
+            existing.extend(records)
+            self.save_all(existing)
+
+    def find_by(self, field: str, value: Any) -> List[Dict]:
+        return [r for r in self.load_all() if r.get(field) == value]
+
+    def iter_all(self) -> Iterator[Dict]:
+        return iter(self.load_all())
+
+    def tail(self, n: int) -> List[Dict]:
+        return self.load_all()[-n:] if n > 0 else []
+
+    # ---------- Documentos ----------
+    def load_document(self, default: Any) -> Any:
+        _, pending = self._pending()
+        if pending is not None:
+            return pending
+        try:
+            data = self._read()
+        except json.JSONDecodeError:
+            return default
+        return default if data is None else data
+
+    def save_document(self, data: Any) -> None:
+        self._write(data)
+
+
+class JsonlRepository:
+    """Bitácora de solo anexado en formato JSON Lines (un registro por línea).
+
+    ``append`` escribe una sola línea al final del archivo sin leerlo, y los
+    lectores (``iter_all``, ``tail``, ``find_by``) recorren el archivo por
+    streaming, sin cargarlo completo en memoria. Las líneas dañadas (por
+    ejemplo, una escritura interrumpida) se ignoran al leer.
+
+    Si la bitácora aún no existe y hay un archivo JSON heredado en
+    ``legacy_path`` (lista de registros), se convierte automáticamente.
+
+    Dentro de un ``file_batch`` los anexados se acumulan y se escriben juntos
+    al confirmar el lote; hasta entonces los lectores no los ven.
+    """
+
+    _BLOCK = 8192
+
+    def __init__(self, path: str, schema: Schema = Schema(), legacy_path: Optional[str] = None,
+                 fsync: bool = False):
+        self.path = path
+        self.schema = schema
+        self.legacy_path = legacy_path
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._migrated = False
+
+    def _migrate(self) -> None:
+        """Convertir una única vez el archivo JSON heredado a JSON Lines."""
+        if self._migrated:
+            return
+        self._migrated = True
+        if os.path.exists(self.path) or not self.legacy_path or not os.path.exists(self.legacy_path):
+            return
+        try:
+            records = JsonRepository(self.legacy_path).load_all()
+        except json.JSONDecodeError:
+            records = []
+        self.save_all(records)
+
+    def exists(self) -> bool:
+        self._migrate()
+        return os.path.exists(self.path)
+
+    # ---------- Escritura ----------
+    def append(self, record: Dict, fsync: Optional[bool] = None) -> None:
+        """Anexar un registro en O(1); con ``fsync`` se fuerza la escritura a disco."""
+        self.append_many([record], fsync)
+
+    def append_many(self, records: List[Dict], fsync: Optional[bool] = None) -> None:
+        """Anexar varios registros con una sola escritura."""
+        batch = _current_batch()
+        if batch is not None:
+            batch.setdefault(self, []).extend(records)
+            return
+        self._flush(records, fsync)
+
+    def _prepare(self, records: List[Dict]):
+        """Primer paso de ``file_batch``: anexar ya; ``deshacer`` recorta la bitácora a su largo anterior."""
+        self._migrate()
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            size = 0
+
+        def deshacer():
+            with self._lock:
+                if os.path.exists(self.path):
+                    with open(self.path, "r+b") as f:
+                        f.truncate(size)
+
+        try:
+            self._flush(records)
+        except BaseException:
+            deshacer()
+            raise
+        return (lambda: None), deshacer
+
+    def _flush(self, records: List[Dict], fsync: Optional[bool] = None) -> None:
+        if not records:
+            return
+        self._migrate()
+        line = b"".join(json.dumps(r, ensure_ascii=False).encode("utf-8") + b"\n" for r in records)
+        with self._lock, open(self.path, "a+b") as f:
+            # Si una escritura previa quedó truncada, empezar en una línea nueva
+            if f.seek(0, os.SEEK_END) > 0:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    line = b"\n" + line
+            f.write(line)
+            f.flush()
+            if self.fsync if fsync is None else fsync:
+                os.fsync(f.fileno())
+
+    def save_all(self, records: List[Dict]) -> None:
+        """Reescribir la bitácora completa (importación o compactación)."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with self._lock:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+
+    def upsert(self, record: Dict) -> None:
+        raise ValueError(f"La bitácora {self.path} es de solo anexado")
+
+    def delete(self, key_value: Any) -> None:
+        raise ValueError(f"La bitácora {self.path} es de solo anexado")
+
+    # ---------- Lectura ----------
+    @staticmethod
+    def _parse(line) -> Optional[Dict]:
+        line = line.strip()
+        if not line:
+            return None
+        try:
+            return json.loads(line)
+        except ValueError:
+            return None
+
+    def iter_all(self) -> Iterator[Dict]:
+        """Recorrer los registros en orden de inserción, línea por línea."""
+        self._migrate()
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    record = self._parse(line)
+                    if record is not None:
+                        yield record
+        except FileNotFoundError:
+            return
+
+    def load_all(self) -> List[Dict]:
+        return list(self.iter_all())
+
+    def tail(self, n: int) -> List[Dict]:
+        """Obtener los ``n`` registros más recientes leyendo el archivo desde el final."""
+        self._migrate()
+        if n <= 0:
+            return []
+        try:
+            with open(self.path, "rb") as f:
+                pos = f.seek(0, os.SEEK_END)
+                data = b""
+                while pos > 0 and data.count(b"\n") <= n:
+                    step = min(self._BLOCK, pos)
+                    pos -= step
+                    f.seek(pos)
+                    data = f.read(step) + data
+        except FileNotFoundError:
+            return []
+        lines = data.splitlines()
+        if pos > 0:
+            lines = lines[1:]  # La primera línea puede estar incompleta
+        records = [r for r in (self._parse(l) for l in lines) if r is not None]
+        return records[-n:]
+
+    def iter_by(self, field: str, value: Any) -> Iterator[Dict]:
+        """Filtrar por igualdad de un campo sin decodificar las líneas que no coinciden."""
+        needle = json.dumps({field: value}, ensure_ascii=False)[1:-1]
+        self._migrate()
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if needle not in line:
+                        continue
+                    record = self._parse(line)
+                    if record is not None and record.get(field) == value:
+                        yield record
+        except FileNotFoundError:
+            return
+
+    def find_by(self, field: str, value: Any) -> List[Dict]:
+        return list(self.iter_by(field, value))
+
+
+class SQLiteEngine:
+    """Conexión compartida a la base SQLite (modo WAL), segura entre hilos."""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.RLock()
+        self._depth = 0
+        # isolation_level=None: las transacciones se controlan explícitamente
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS _entidades (nombre TEXT PRIMARY KEY)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS _documentos (nombre TEXT PRIMARY KEY, datos TEXT NOT NULL)")
+
+    @contextmanager
+    def transaction(self):
+        """Agrupar operaciones en una única transacción (admite anidamiento)."""
+        with self._lock:
+            if self._depth == 0:
+                self._conn.execute("BEGIN IMMEDIATE")
+            self._depth += 1
+            try:
+                yield self._conn
+            except BaseException:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._conn.execute("ROLLBACK")
+                raise
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._conn.execute("COMMIT")
+
+    def query(self, sql: str, params: Tuple = ()) -> List[Tuple]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class SQLiteRepository:
+    """Repositorio de una entidad almacenada como tabla SQLite.
+
+    Cada fila guarda el registro completo en la columna ``datos`` (JSON) y
+    replica en columnas propias la clave y los campos indexados del esquema.
+    Si la tabla aún no existe se importa automáticamente desde ``source``
+    (el repositorio de archivos de la entidad), que también es el destino
+    de ``export_json`` (una bitácora se exporta a su JSON heredado).
+    """
+
+    def __init__(self, entity: str, schema: Schema, engine: SQLiteEngine, source=None):
+        self.entity = entity
+        self.schema = schema
+        self.engine = engine
+        self.path = f"{engine.path}#{entity}"
+        self.source = source
+        self._columns = (('clave',) if schema.key else ()) + schema.indexes
+        if not schema.document:
+            self._create_table()
+        if not self.exists() and source is not None and source.exists():
+            self.import_json()
+
+    def _create_table(self) -> None:
+        cols = ['pos INTEGER PRIMARY KEY AUTOINCREMENT']
+        if self.schema.key:
+            cols.append('clave UNIQUE')
+        cols.extend(f'"{c}"' for c in self.schema.indexes)
+        cols.append('datos TEXT NOT NULL')
+        with self.engine.transaction() as conn:
+            conn.execute(f'CREATE TABLE IF NOT EXISTS "{self.entity}" ({", ".join(cols)})')
+            for c in self.schema.indexes:
+                conn.execute(f'CREATE INDEX IF NOT EXISTS "idx_{self.entity}_{c}" ON "{self.entity}" ("{c}")')
+
+    def _mark(self, conn) -> None:
+        conn.execute("INSERT OR IGNORE INTO _entidades (nombre) VALUES (?)", (self.entity,))
+
+    def _row(self, record: Dict) -> Tuple:
+        values = []
+        if self.schema.key:
+            values.append(record.get(self.schema.key))
+        values.extend(record.get(c) for c in self.schema.indexes)
+        values.append(json.dumps(record, ensure_ascii=False))
+        return tuple(values)
+
+    def _insert_sql(self, upsert: bool = False) -> str:
+        cols = ", ".join(f'"{c}"' for c in self._columns + ('datos',))
+        marks = ", ".join("?" for _ in self._columns + ('datos',))
+        sql = f'INSERT INTO "{self.entity}" ({cols}) VALUES ({marks})'
+        if upsert:
+            updates = ", ".join(f'"{c}" = excluded."{c}"' for c in self._columns[1:] + ('datos',))
+            sql += f" ON CONFLICT(clave) DO UPDATE SET {updates}"
+        return sql
+
+    def exists(self) -> bool:
+        return bool(self.engine.query("SELECT 1 FROM _entidades WHERE nombre = ?", (self.entity,)))
+
+    # ---------- Colecciones ----------
+    def load_all(self) -> List[Dict]:
+        rows = self.engine.query(f'SELECT datos FROM "{self.entity}" ORDER BY pos')
+        return [json.loads(r[0]) for r in rows]
+
+    def save_all(self, records: List[Dict]) -> None:
+        with self.engine.transaction() as conn:
+            conn.execute(f'DELETE FROM "{self.entity}"')
+            conn.executemany(self._insert_sql(), [self._row(r) for r in records])
+            self._mark(conn)
+
+    def upsert(self, record: Dict) -> None:
+        if self.schema.key is None:
+            raise ValueError(f"La entidad '{self.entity}' no tiene clave; use append() o save_all()")
+        with self.engine.transaction() as conn:
+            conn.execute(self._insert_sql(upsert=True), self._row(record))
+            self._mark(conn)
+
+    def delete(self, key_value: Any) -> None:
+        if self.schema.key is None:
+            raise ValueError(f"La entidad '{self.entity}' no tiene clave")
+        with self.engine.transaction() as conn:
+            conn.execute(f'DELETE FROM "{self.entity}" WHERE clave = ?', (key_value,))
+
+    def append(self, record: Dict) -> None:
+        self.append_many([record])
+
+    def append_many(self, records: List[Dict]) -> None:
+        with self.engine.transaction() as conn:
+            conn.executemany(self._insert_sql(), [self._row(r) for r in records])
+            self._mark(conn)
+
+    def find_by(self, field: str, value: Any) -> List[Dict]:
+        """Búsqueda por igualdad; usa el índice si el campo es clave o está indexado."""
+        if field == self.schema.key:
+            column = 'clave'
+        elif field in self.schema.indexes:
+            column = field
+        else:
+            return [r for r in self.load_all() if r.get(field) == value]
+        rows = self.engine.query(f'SELECT datos FROM "{self.entity}" WHERE "{column}" = ? ORDER BY pos', (value,))
+        return [json.loads(r[0]) for r in rows]
+
+    def iter_by(self, field: str, value: Any) -> Iterator[Dict]:
+        return iter(self.find_by(field, value))
+
+    def iter_all(self) -> Iterator[Dict]:
+        return iter(self.load_all())
+
+    def tail(self, n: int) -> List[Dict]:
+        if n <= 0:
+            return []
+        rows = self.engine.query(f'SELECT datos FROM "{self.entity}" ORDER BY pos DESC LIMIT ?', (n,))
+        return [json.loads(r[0]) for r in reversed(rows)]
+
+    # ---------- Documentos ----------
+    def load_document(self, default: Any) -> Any:
+        rows = self.engine.query("SELECT datos FROM _documentos WHERE nombre = ?", (self.entity,))
+        return json.loads(rows[0][0]) if rows else default
+
+    def save_document(self, data: Any) -> None:
+        with self.engine.transaction() as conn:
+            conn.execute("INSERT INTO _documentos (nombre, datos) VALUES (?, ?) "
+                         "ON CONFLICT(nombre) DO UPDATE SET datos = excluded.datos",
+                         (self.entity, json.dumps(data, ensure_ascii=False)))
+            self._mark(conn)
+
+    # ---------- Importación / exportación ----------
+    def import_json(self, path: Optional[str] = None) -> None:
+        """Reemplazar el contenido de la entidad con el de un archivo JSON."""
+        source = JsonRepository(path, self.schema) if path else self.source
+        try:
+            if self.schema.document:
+                data = source.load_document(None)
+                if data is not None:
+                    self.save_document(data)
+            else:
+                self.save_all(self._first_per_key(source.load_all()))
+        except json.JSONDecodeError:
+            # Un archivo dañado no debe impedir abrir la base; se parte vacío
+            pass
+
+    def _first_per_key(self, records: List[Dict]) -> List[Dict]:
+        """Quitar los registros con clave repetida (la columna es UNIQUE), conservando el primero.
+
+        Los archivos JSON admiten claves repetidas y la aplicación usa el
+        primer registro de cada clave; los descartados se informan.
+        """
+        if not self.schema.key:
+            return records
+        seen = set()
+        unique = []
+        for record in records:
+            value = record.get(self.schema.key)
+            if value in seen:
+                print(f"⚠️ {self.entity}: se omite el registro repetido con {self.schema.key} = {value!r}")
+                continue
+            seen.add(value)
+            unique.append(record)
+        return unique
+
+    def export_json(self, path: Optional[str] = None) -> None:
+        """Volcar el contenido de la entidad a un archivo JSON."""
+        if path is None and self.schema.journal:
+            # Una bitácora se vuelca como lista JSON en su archivo histórico, igual que con archivos
+            path = self.source.legacy_path
+        target = JsonRepository(path, self.schema) if path else self.source
+        if self.schema.document:
+            target.save_document(self.load_document(None))
+        else:
+            target.save_all(self.load_all())
+
+
+__all__ = ["Schema", "SCHEMAS", "JsonRepository", "JsonlRepository", "SQLiteEngine", "SQLiteRepository",
+           "file_batch", "write_json_atomic"]
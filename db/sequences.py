@@ -0,0 +1,125 @@
+"""
+Secuencias persistentes de identificadores.
+
+Cada secuencia (clientes, ventas, pedidos, comprobantes, ...) guarda solo el
+último id entregado, así que pedir un id cuesta O(1) sin importar cuántos
+registros existan. ``reserve`` entrega un bloque de ids consecutivos con una
+sola actualización, para importaciones masivas.
+
+La lectura y actualización del contador es exclusiva entre procesos que
+comparten el directorio de la base: con archivos, bajo un bloqueo del sistema
+operativo sobre ``<archivo>.lock``; con SQLite, dentro de una transacción
+``BEGIN IMMEDIATE``. Los ids entregados no se devuelven: si la operación que
+los pidió se cancela quedan huecos en la numeración, nunca repetidos.
+"""
+
+import json
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from .repository import SQLiteEngine, write_json_atomic
+
+# Función que calcula el último id ya usado cuando la secuencia todavía no existe
+# (por ejemplo, a partir de los registros guardados antes de usar secuencias)
+Seed = Optional[Callable[[], int]]
+
+
+class SequenceError(ValueError):
+    """El archivo de secuencias está dañado: no se pueden entregar ids sin arriesgar repetidos."""
+
+
+@contextmanager
+def _file_lock(path: str):
+    """Bloqueo exclusivo entre procesos sobre ``path`` (se crea si no existe)."""
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)  # Reintenta durante unos segundos
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _check_count(count: int) -> None:
+    if count < 1:
+        raise ValueError("La cantidad de ids a reservar debe ser positiva")
+
+
+class FileSequences:
+    """Secuencias guardadas en un archivo JSON ``{nombre: último id}``."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock_path = f"{path}.lock"
+        self._lock = threading.Lock()  # El bloqueo de archivo no excluye a los hilos del mismo proceso
+
+    def _read(self) -> Dict[str, int]:
+        """Contadores guardados; lanza ``SequenceError`` si el archivo está dañado."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                values = json.load(f)
+        except FileNotFoundError:
+            # Sin archivo cada secuencia se recalcula con su ``seed``
+            return {}
+        except json.JSONDecodeError as e:
+            # Volver a empezar repetiría ids ya entregados (p. ej. comprobantes, que no tienen ``seed``)
+            raise SequenceError(f"Archivo de secuencias dañado: {self.path} ({e})") from e
+        if not isinstance(values, dict):
+            raise SequenceError(f"Archivo de secuencias dañado: {self.path} (se esperaba un objeto JSON)")
+        return values
+
+    def current(self, name: str) -> Optional[int]:
+        """Último id entregado por la secuencia, o ``None`` si aún no existe."""
+        with self._lock, _file_lock(self.lock_path):
+            return self._read().get(name)
+
+    def reserve(self, name: str, count: int = 1, seed: Seed = None) -> range:
+        """Reservar ``count`` ids consecutivos de la secuencia ``name``."""
+        _check_count(count)
+        with self._lock, _file_lock(self.lock_path):
+            values = self._read()
+            last = values.get(name)
+            if last is None:
+                last = seed() if seed else 0
+            values[name] = last + count
+            write_json_atomic(self.path, values)
+        return range(last + 1, last + count + 1)
+
+
+class SQLiteSequences:
+    """Secuencias guardadas en la tabla ``_secuencias`` de la base SQLite."""
+
+    def __init__(self, engine: SQLiteEngine):
+        self.engine = engine
+        with engine.transaction() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS _secuencias (nombre TEXT PRIMARY KEY, ultimo INTEGER NOT NULL)")
+
+    def current(self, name: str) -> Optional[int]:
+        """Último id entregado por la secuencia, o ``None`` si aún no existe."""
+        rows = self.engine.query("SELECT ultimo FROM _secuencias WHERE nombre = ?", (name,))
+        return rows[0][0] if rows else None
+
+    def reserve(self, name: str, count: int = 1, seed: Seed = None) -> range:
+        """Reservar ``count`` ids consecutivos de la secuencia ``name``."""
+        _check_count(count)
+        # BEGIN IMMEDIATE toma el bloqueo de escritura antes de leer el contador
+        with self.engine.transaction() as conn:
+            row = conn.execute("SELECT ultimo FROM _secuencias WHERE nombre = ?", (name,)).fetchone()
+            last = row[0] if row else (seed() if seed else 0)
+            conn.execute("INSERT INTO _secuencias (nombre, ultimo) VALUES (?, ?) "
+                         "ON CONFLICT(nombre) DO UPDATE SET ultimo = excluded.ultimo", (name, last + count))
+        return range(last + 1, last + count + 1)
@@ -0,0 +1,97 @@
+"""
+Escritura diferida (write-behind) para AgroVet Plus.
+
+En lugar de escribir a disco después de cada edición, las entidades se
+marcan como "sucias" y un hilo escritor en segundo plano las guarda cuando
+pasa la ventana de espera sin nuevos cambios, o antes si se acumulan
+demasiados cambios pendientes. Varias marcas de la misma entidad se agrupan
+en una sola escritura con el estado más reciente.
+"""
+
+import threading
+import time
+from typing import Callable, Dict, Hashable
+
+
+class WriteBehindWriter:
+    """Hilo escritor que agrupa y difiere las escrituras de entidades sucias.
+
+    Args:
+        delay: Segundos sin nuevos cambios antes de escribir (ventana de espera).
+        max_pending: Cantidad de marcas acumuladas que fuerza una escritura inmediata.
+    """
+
+    def __init__(self, delay: float = 2.0, max_pending: int = 20):
+        self.delay = delay
+        self.max_pending = max_pending
+        self._pending: Dict[Hashable, Callable[[], None]] = {}
+        self._marks = 0
+        self._last_mark = 0.0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="agrovet-write-behind", daemon=True)
+        self._thread.start()
+
+    @property
+    def pending(self) -> int:
+        """Cantidad de entidades con cambios aún sin escribir."""
+        with self._cond:
+            return len(self._pending)
+
+    def mark_dirty(self, key: Hashable, save: Callable[[], None]) -> None:
+        """Marcar una entidad como sucia; ``save`` la escribirá con su estado al momento de escribir."""
+        with self._cond:
+            if self._closed:
+                closed = True
+            else:
+                closed = False
+                self._pending[key] = save
+                self._marks += 1
+                self._last_mark = time.monotonic()
+                self._cond.notify()
+        if closed:
+            # El escritor ya se cerró: escribir de inmediato
+            save()
+
+    def flush(self) -> None:
+        """Escribir ya todas las entidades pendientes (en el hilo que llama)."""
+        with self._flush_lock:
+            with self._cond:
+                pending, self._pending = self._pending, {}
+                self._marks = 0
+            for key, save in pending.items():
+                try:
+                    save()
+                except Exception as e:
+                    print(f"Error en escritura diferida de '{key}': {e}")
+                    # Reintentar en la próxima ventana, salvo que ya haya una marca más reciente
+                    with self._cond:
+                        self._pending.setdefault(key, save)
+                        self._last_mark = time.monotonic()
+
+    def close(self) -> None:
+        """Detener el hilo escritor y escribir lo pendiente."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        self.flush()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                # Esperar a que termine la ráfaga de cambios o se alcance el umbral
+                while not self._closed and self._marks < self.max_pending:
+                    remaining = self._last_mark + self.delay - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                if self._closed:
+                    return
+            self.flush()
+
+
+__all__ = ["WriteBehindWriter"]